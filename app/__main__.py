@@ -1,124 +1,255 @@
-from flask import Flask, render_template, jsonify, request, Response
-from dotenv import load_dotenv
+from flask import Flask, render_template, jsonify, request
 import os
-import requests  # For Grok API in spoken report
 import json
-import websocket
 import threading
+import time
 from datetime import datetime
 
-from .utils import fetch_firewall_drops, parse_firewall_drops, generate_ai_summary
+from .utils import generate_ai_summary
+from .data_access import DropDataAccess, SketchedHistory
+from .stats import compute_stats, site_stats
+from .sources import drop_fetcher
+from .parallel_parse import default_workers
+from .event_store import DropEventStore
 from .ara_prompt import get_ara_voice_prompt
+from .snapshot import SnapshotRefresher
+from .timeline import timeline_labels as batch_timeline
+from .rollups import parse_range
+from .log_writer import BufferedJsonLog
+from .voice_cache import VoiceBriefingCache, briefing_key
+from .realtime_pool import RealtimeSessionPool
+from .live_feed import LiveDropFeed
+from .metrics import REGISTRY, CONTENT_TYPE, STAGE_SECONDS, stage
+
+# The voice server's dependencies (asyncio, websockets, base64) are imported inside
+# the functions that use them, so the dashboard does not pay for them at start-up.
 
-import pandas as pd
-from datetime import datetime, timedelta
-import random  # Only for fallback
-import base64
+app = Flask(__name__)
 
-import asyncio
-import websockets
+# Every ingested drop is also kept on disk (30 days): long ranges are served locally
+# and a restart during a Graylog outage still has data.
+drop_store = DropEventStore(os.getenv('DROP_STORE_PATH', 'drop_events.db'), retention_days=30)
+
+# Shared fetch+parse for every caller: incremental 24h Graylog window (paged, so scan
+# storms are not truncated at 2000), single-flight coalescing and a 15s result cache.
+# GRAYLOG_SOURCES lists several sites (see app/sources.py), fetched concurrently.
+# Large deltas (the first full window) are parsed by PARSE_WORKERS processes.
+drop_data = DropDataAccess(ttl=15, limit=2000, paged=True, store=drop_store, fetcher_factory=drop_fetcher,
+                           parse_workers=int(os.getenv('PARSE_WORKERS', default_workers())))
+
+LIVE_RANGE = 86400
+DASHBOARD_RANGES = {'24h': LIVE_RANGE, '7d': 7 * 86400, '30d': 30 * 86400}
+
+
+def build_dashboard_data(range_seconds=LIVE_RANGE, site=None):
+    """
+    Fetch, parse and aggregate the last `range_seconds` into the dashboard dict
+    (only `site`'s events if given). Raises on failure.
+    """
+    print("Starting build_dashboard_data - attempting real Graylog fetch")
+
+    # Feature 1 + 2: Fetch from Graylog and parse into structured list + basic stats
+    if range_seconds > LIVE_RANGE:
+        events, parsed_stats = drop_data.history(range_seconds)  # local event store only
+    else:
+        events, parsed_stats = drop_data.get_drops(range_seconds=range_seconds)  # columnar DropEventBatch
+    print(f"Parsed {len(events)} valid drop events")
+
+    # Per-site view: same dashboard over one site's events
+    sketched = isinstance(events, SketchedHistory)  # a huge history, summarized while streamed from disk
+    sites = (events.site_stats() if sketched else site_stats(events)) if len(events.site_values) > 1 else {}
+    if site is not None:
+        events = events.for_site(site)
+        parsed_stats = events.stats() if sketched else compute_stats(events)
+
+    if not len(events):
+        raise ValueError("No valid drops parsed from logs")
+
+    total_blocks = parsed_stats['total_blocks']
+    daily_blocks = total_blocks * LIVE_RANGE / max(range_seconds, LIVE_RANGE)
+
+    # Status logic (thresholds are per 24h)
+    if daily_blocks < 50:
+        status = {'level': 'Low Activity', 'color': '#00FF00'}
+    elif daily_blocks <= 300:
+        status = {'level': 'Moderate Threats', 'color': '#FFFF00'}
+    else:
+        status = {'level': 'High Threat Level', 'color': '#FF0000'}
+    print("Status calculated")
+
+    # Use parsed stats directly where possible
+    top_subnets = [
+        {'subnet': subnet, 'count': count}
+        for subnet, count in parsed_stats['top_src_subnets'].items()
+    ]  # already sorted most_common(5)
+
+    top_ports = parsed_stats['top_dst_ports']  # dict {port: count}
+
+    # Timeline from real timestamps: hourly counts kept up to date at ingest (local timezone)
+    with stage('timeline'):
+        if range_seconds > LIVE_RANGE or site is not None:
+            since_ms = int((datetime.now().timestamp() - range_seconds) * 1000)
+            daily = range_seconds > 7 * 86400
+            fmt = '%m-%d' if daily else '%m-%d %H:%M' if range_seconds > LIVE_RANGE else '%H:%M'
+            if sketched:
+                timeline_labels, timeline_data = events.timeline(86400 if daily else 3600, since_ms, fmt=fmt)
+            else:
+                timeline_labels, timeline_data = batch_timeline(events.timestamp, 86400 if daily else 3600,
+                                                                since_ms, fmt=fmt)
+        else:
+            timeline_labels, timeline_data = drop_data.timeline(range_seconds=range_seconds, resolution='hour')
+    print("Timeline prepared from real data (local timezone)")
+
+    # AI summary will be generated on demand
+    ai_summary = "Click 'Generate AI Summary' to analyze current data."
+    tokens = {'input': 0, 'output': 0}
+
+    return {
+        'status': status,
+        'total_blocks': total_blocks,
+        'top_subnets': top_subnets,
+        'top_ports': top_ports,
+        'timeline_labels': timeline_labels,
+        'timeline_data': timeline_data,
+        'ai_summary': ai_summary,
+        'tokens': tokens,
+        'site': site,
+        'sites': [
+            {'site': label, 'total_blocks': s['total_blocks'],
+             'top_subnet': next(iter(s['top_src_subnets']), None), 'top_port': next(iter(s['top_dst_ports']), None)}
+            for label, s in sites.items()
+        ],
+        'error': None
+    }
+
+
+def error_dashboard_data(e):
+    """Minimal error view shown when no real data could be built."""
+    return {
+        'status': {'level': 'Error Loading Real Data', 'color': '#FF0000'},
+        'total_blocks': 0,
+        'top_subnets': [],
+        'top_ports': {},
+        'timeline_labels': [],
+        'timeline_data': [],
+        'ai_summary': f"Failed to load real data: {str(e)}. Check terminal logs, .env, Graylog connection.",
+        'tokens': {'input': 0, 'output': 0},
+        'site': None,
+        'sites': [],
+        'error': str(e)
+    }
 
-app = Flask(__name__)
 
 def get_dashboard_data():
+    """Synchronous build (used until the background refresher has published a snapshot)."""
     try:
-        print("Starting get_dashboard_data - attempting real Graylog fetch")
-
-        # Feature 1: Fetch raw logs from Graylog
-        raw_logs = fetch_firewall_drops(range_seconds=86400, limit=2000)  # 24h, generous limit
-        print(f"Fetched {len(raw_logs)} raw logs from Graylog")
-
-        if not raw_logs:
-            raise ValueError("No logs returned from Graylog")
+        return build_dashboard_data()
+    except Exception as e:
+        import traceback
+        print("ERROR in get_dashboard_data:", str(e))
+        print(traceback.format_exc())
 
-        # Feature 2: Parse into structured list + basic stats
-        parsed_logs, parsed_stats = parse_firewall_drops(raw_logs)
-        print(f"Parsed {len(parsed_logs)} valid drop events")
+        # Fallback to minimal error view
+        return error_dashboard_data(e)
 
-        if not parsed_logs:
-            raise ValueError("No valid drops parsed from logs")
 
-        total_blocks = parsed_stats['total_blocks']
+# Background refresher: pages serve the latest snapshot instead of hitting Graylog
+dashboard_snapshots = SnapshotRefresher(build_dashboard_data, interval=60, fallback_fn=error_dashboard_data)
 
-        # Status logic
-        if total_blocks < 50:
-            status = {'level': 'Low Activity', 'color': '#00FF00'}
-        elif total_blocks <= 300:
-            status = {'level': 'Moderate Threats', 'color': '#FFFF00'}
-        else:
-            status = {'level': 'High Threat Level', 'color': '#FF0000'}
-        print("Status calculated")
 
-        # Use parsed stats directly where possible
-        top_subnets = [
-            {'subnet': subnet, 'count': count}
-            for subnet, count in parsed_stats['top_src_subnets'].items()
-        ]  # already sorted most_common(5)
+def current_dashboard_payload():
+    snapshot = dashboard_snapshots.latest()
+    if snapshot is None:
+        return get_dashboard_data()
+    return snapshot.payload()
 
-        top_ports = parsed_stats['top_dst_ports']  # dict {port: count}
 
-        # Timeline from real timestamps
-        df = pd.DataFrame(parsed_logs)
-        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)  # ensure UTC datetime
-        # Convert to local timezone
-        local_tz = datetime.now().astimezone().tzinfo
-        df['timestamp'] = df['timestamp'].dt.tz_convert(local_tz)
-        df['hour'] = df['timestamp'].dt.floor('h')
+def live_drop_state():
+    """The parts of the 24h dashboard that change as drops arrive (polls Graylog now)."""
+    events, parsed_stats = drop_data.refresh(range_seconds=LIVE_RANGE)
+    timeline_labels, timeline_data = drop_data.timeline(range_seconds=LIVE_RANGE, resolution='hour')
+    return {
+        'total_blocks': parsed_stats['total_blocks'],
+        'top_subnets': [{'subnet': subnet, 'count': count} for subnet, count in parsed_stats['top_src_subnets'].items()],
+        'top_ports': parsed_stats['top_dst_ports'],
+        'timeline_labels': timeline_labels,
+        'timeline_data': timeline_data,
+    }
 
-        min_time = df['timestamp'].min().floor('h')
-        max_time = df['timestamp'].max().ceil('h')
-        timeline_range = pd.date_range(min_time, max_time, freq='h')
 
-        timeline = df.groupby('hour').size().reindex(timeline_range, fill_value=0).to_dict()
-        timeline_labels = [dt.strftime('%H:%M') for dt in timeline.keys()]
-        timeline_data = list(timeline.values())
-        print("Timeline prepared from real data (local timezone)")
+# One producer for every open dashboard: polls while at least one stream is connected
+live_feed = LiveDropFeed(live_drop_state, interval=float(os.getenv('LIVE_POLL_INTERVAL', '5')))
 
-        # AI summary will be generated on demand
-        ai_summary = "Click 'Generate AI Summary' to analyze current data."
-        tokens = {'input': 0, 'output': 0}
-
-        return {
-            'status': status,
-            'total_blocks': total_blocks,
-            'top_subnets': top_subnets,
-            'top_ports': top_ports,
-            'timeline_labels': timeline_labels,
-            'timeline_data': timeline_data,
-            'ai_summary': ai_summary,
-            'tokens': tokens,
-            'error': None
-        }
-
-    except Exception as e:
-        import traceback
-        print("ERROR in get_dashboard_data:", str(e))
-        print(traceback.format_exc())
-
-        # Fallback to minimal error view
-        return {
-            'status': {'level': 'Error Loading Real Data', 'color': '#FF0000'},
-            'total_blocks': 0,
-            'top_subnets': [],
-            'top_ports': {},
-            'timeline_labels': [],
-            'timeline_data': [],
-            'ai_summary': f"Failed to load real data: {str(e)}. Check terminal logs, .env, Graylog connection.",
-            'tokens': {'input': 0, 'output': 0},
-            'error': str(e)
-        }
 
 @app.route('/')
 def dashboard():
-    data = get_dashboard_data()
-    return render_template('index.html', data=data)
+    data = current_dashboard_payload()
+    with stage('render'):
+        return render_template('index.html', data=data)
+
+
+@app.route('/api/dashboard')
+def dashboard_json():
+    range_name = request.args.get('range', '24h')
+    site = request.args.get('site') or None
+    if range_name not in DASHBOARD_RANGES:
+        return jsonify({'error': f"Unknown range {range_name!r}; use one of {', '.join(DASHBOARD_RANGES)}"}), 400
+    if DASHBOARD_RANGES[range_name] == LIVE_RANGE and site is None:
+        snapshot = dashboard_snapshots.latest()
+        if snapshot is None:
+            return jsonify(get_dashboard_data())
+        # Conditional GET: an unchanged snapshot costs a header exchange
+        if request.if_none_match.contains(snapshot.etag):
+            response = app.response_class(status=304)
+        else:
+            since = request.args.get('since', type=int)
+            delta = dashboard_snapshots.delta_since(since) if since is not None else None
+            response = jsonify(delta if delta is not None else snapshot.payload())
+        response.set_etag(snapshot.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    try:
+        return jsonify(build_dashboard_data(DASHBOARD_RANGES[range_name], site))
+    except Exception as e:
+        print(f"History / site dashboard error: {e}")
+        return jsonify(error_dashboard_data(e))
+
+@app.route('/api/timeline')
+def timeline_json():
+    """Counts per minute/hour/day from the rollups, e.g. ?range=30d&bucket=day&group_by=dst_port&top=5."""
+    try:
+        range_seconds = parse_range(request.args.get('range', '24h'))
+        top = int(request.args.get('top', 5))
+        result = drop_data.rollup_timeline(range_seconds, request.args.get('bucket', 'auto'),
+                                           request.args.get('group_by') or None, top)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape: per-stage latency histograms, parse and token counters."""
+    return app.response_class(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/live')
+def live_stream():
+    """Server-Sent Events: a 'state' event, then a 'delta' whenever new drops change the 24h view."""
+    return app.response_class(live_feed.subscribe(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/ai-summary', methods=['POST'])
 def generate_ai_summary_endpoint():
     try:
-        # Fetch current data
-        raw_logs = fetch_firewall_drops(range_seconds=86400, limit=2000)
-        parsed_logs, parsed_stats = parse_firewall_drops(raw_logs)
+        # Fetch current data (?range=7d / 30d: from the local event store)
+        range_seconds = DASHBOARD_RANGES.get(request.args.get('range', '24h'))
+        if range_seconds is None:
+            return jsonify({'error': f"Unknown range; use one of {', '.join(DASHBOARD_RANGES)}"}), 400
+        if range_seconds > LIVE_RANGE:
+            parsed_logs, parsed_stats = drop_data.history(range_seconds)
+            if isinstance(parsed_logs, SketchedHistory):
+                parsed_logs = parsed_logs.sketch()  # per-port subnets from DropSketch.breakdown
+        else:
+            parsed_logs, parsed_stats = drop_data.get_drops(range_seconds=range_seconds)
 
         if not parsed_logs:
             return jsonify({'error': 'No data available for analysis'})
@@ -133,22 +264,40 @@ def generate_ai_summary_endpoint():
 
         return jsonify({
             'summary': summary,
-            'tokens': tokens
+            'tokens': tokens,
+            'cached': ai_result.get('cached', False)
         })
     except Exception as e:
         print(f"AI summary error: {e}")
         return jsonify({'error': str(e)})
 
-async def ara_voice_handler(websocket):
-    print("New Ara voice client connected")
-    with open("ara_voice_log.txt", "a") as f:
-        f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] New Ara voice client connected\n")
+# Voice session events: JSON lines, queued in memory and written by a background
+# thread, so the event loop never touches the file
+VOICE_LOG = "ara_voice_log.jsonl"
+voice_events = BufferedJsonLog(VOICE_LOG)
+
+# Finished briefings, replayed when the prompt (i.e. the stats it speaks) is unchanged
+voice_cache = VoiceBriefingCache(os.getenv('VOICE_CACHE_DIR', 'voice_cache'), max_bytes=100 * 1024 * 1024)
+
+VOICE_SESSION = {
+    "modalities": ["text", "audio"],
+    "voice": "ara",
+    "turn_detection": {"type": "server_vad"},
+    "model": "grok-4-1-fast-reasoning",
+    "instructions": "Always respond with spoken audio. Use voice modality for all outputs."
+}
+
+# Connected, configured xAI realtime sessions waiting for the next voice client
+voice_pool = RealtimeSessionPool("wss://api.x.ai/v1/realtime", VOICE_SESSION, lambda: os.getenv('GROK_API_KEY'),
+                                 size=int(os.getenv('VOICE_POOL_SIZE', '2')))
 
+
+def voice_briefing_data():
+    """Stats for the spoken briefing (no AI summary, to save tokens). Blocking: may hit Graylog."""
     # Only fetch the stats we need for voice — skip full AI summary to save tokens
     # (we can reuse dashboard logic but override/avoid the AI part)
     try:
-        raw_logs = fetch_firewall_drops(range_seconds=86400, limit=2000)
-        parsed_logs, parsed_stats = parse_firewall_drops(raw_logs)
+        parsed_logs, parsed_stats = drop_data.get_drops(range_seconds=86400)
         
         total_blocks = parsed_stats['total_blocks']
         
@@ -170,7 +319,7 @@ async def ara_voice_handler(websocket):
         # Optional: add top ports if you want to mention in prompt
         top_ports = parsed_stats['top_dst_ports']
         
-        data = {
+        return {
             'status': {'level': status_level, 'color': status_color},
             'total_blocks': total_blocks,
             'top_subnets': top_subnets,
@@ -179,7 +328,7 @@ async def ara_voice_handler(websocket):
         }
     except Exception as e:
         print(f"Voice data fetch error: {e}")
-        data = {
+        return {
             'status': {'level': 'Error', 'color': '#FF0000'},
             'total_blocks': 0,
             'top_subnets': [],
@@ -187,6 +336,41 @@ async def ara_voice_handler(websocket):
             'ai_summary': f"Failed to load data: {str(e)}"
         }
 
+
+async def replay_briefing(websocket, frames, on_audio=None):
+    """Send cached (offset_s, payload) frames with their original spacing; on_audio() after each audio frame."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for offset, payload in frames:
+        delay = started + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await websocket.send(payload)
+        if on_audio is not None and isinstance(payload, bytes):
+            on_audio()
+
+
+async def ara_voice_handler(websocket):
+    import asyncio
+    import base64
+
+    print("New Ara voice client connected")
+    voice_events.log("client_connected")
+    connected = time.perf_counter()
+    first_audio = []
+
+    def audio_sent():
+        # Time to first audio: what the listener waits for, live or replayed
+        if not first_audio:
+            first_audio.append(True)
+            STAGE_SECONDS.observe(time.perf_counter() - connected, stage='voice_first_audio')
+
+    # Graylog fetch + parse run in a worker thread: a slow fetch for one client
+    # must not freeze the other voice sessions sharing this event loop
+    data = await asyncio.to_thread(voice_briefing_data)
+
     prompt = get_ara_voice_prompt(data)
 
     grok_key = os.getenv('GROK_API_KEY')
@@ -194,33 +378,22 @@ async def ara_voice_handler(websocket):
         await websocket.send(json.dumps({'error': 'No GROK_API_KEY in .env'}))
         return
 
-    with open("ara_voice_log.txt", "a") as f:
-        f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Prompt: {prompt[:200]}...\n")
+    voice_events.log("prompt", prompt=prompt[:200])
+    key = briefing_key(prompt, VOICE_SESSION)
 
     try:
-        async with websockets.connect(
-            "wss://api.x.ai/v1/realtime",
-            additional_headers={"Authorization": f"Bearer {grok_key}"}
-        ) as xai_ws:
+        frames = await asyncio.to_thread(voice_cache.load, key)
+        if frames is not None:
+            voice_events.log("replay", key=key[:12], frames=len(frames))
+            await replay_briefing(websocket, frames, audio_sent)
+            return
+
+        recorder = voice_cache.recorder(key)
+        # Pre-connected session with session.update already sent, when the pool has one
+        xai_ws = await voice_pool.acquire()
+        try:
             print("Connected to xAI realtime")
-            with open("ara_voice_log.txt", "a") as f:
-                f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Connected to xAI realtime\n")
-
-            # Session update
-            session_update = {
-                "type": "session.update",
-                "session": {
-                    "modalities": ["text", "audio"],
-                    "voice": "ara",
-                    "turn_detection": {"type": "server_vad"},
-                    "model": "grok-4-1-fast-reasoning",
-                    "instructions": "Always respond with spoken audio. Use voice modality for all outputs."
-                }
-            }
-            await xai_ws.send(json.dumps(session_update))
-            print("Sent session.update to xAI")
-            with open("ara_voice_log.txt", "a") as f:
-                f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sent session.update\n")
+            voice_events.log("xai_connected", pool=dict(voice_pool.stats))
 
             # Create conversation item with prompt
             item_create = {
@@ -233,22 +406,17 @@ async def ara_voice_handler(websocket):
             }
             await xai_ws.send(json.dumps(item_create))
             print("Sent conversation.item.create with prompt")
-            with open("ara_voice_log.txt", "a") as f:
-                f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sent conversation.item.create\n")
+            voice_events.log("sent", type="conversation.item.create")
 
             # Trigger response generation
             response_create = {"type": "response.create"}
             await xai_ws.send(json.dumps(response_create))
             print("Sent response.create — Ara should start speaking")
-            with open("ara_voice_log.txt", "a") as f:
-                f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sent response.create\n")
+            voice_events.log("sent", type="response.create")
 
             async for msg in xai_ws:
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 if isinstance(msg, str):
-                    print(f"xAI JSON: {msg[:200]}...")
-                    with open("ara_voice_log.txt", "a") as f:
-                        f.write(f"[{timestamp}] xAI JSON: {msg}\n")
+                    voice_events.log("xai_json", message=msg)
 
                     try:
                         data = json.loads(msg)
@@ -256,47 +424,76 @@ async def ara_voice_handler(websocket):
                             delta_b64 = data.get('delta', '')
                             if delta_b64:
                                 audio_bytes = base64.b64decode(delta_b64)
-                                print(f"xAI audio delta decoded ({len(audio_bytes)} bytes)")
                                 await websocket.send(audio_bytes)  # Send as binary
-                                with open("ara_voice_log.txt", "a") as f:
-                                    f.write(f"[{timestamp}] xAI audio delta decoded ({len(audio_bytes)} bytes)\n")
+                                audio_sent()
+                                recorder.add(audio_bytes)
+                                voice_events.log("audio_delta", bytes=len(audio_bytes))
                         else:
                             await websocket.send(msg)  # Forward non-audio JSON (e.g., transcripts, done)
+                            recorder.add(msg)
+                            if data.get('type') == 'response.done' and await asyncio.to_thread(recorder.save):
+                                voice_events.log("briefing_cached", key=key[:12], frames=len(recorder.frames))
                     except json.JSONDecodeError:
                         print("Invalid JSON from xAI")
                         await websocket.send(json.dumps({'error': 'Invalid JSON from xAI'}))
                 elif isinstance(msg, bytes):
                     # Unlikely for xAI, but forward if happens
-                    print(f"xAI raw binary ({len(msg)} bytes)")
                     await websocket.send(msg)
-                    with open("ara_voice_log.txt", "a") as f:
-                        f.write(f"[{timestamp}] xAI raw binary ({len(msg)} bytes)\n")
+                    recorder.add(msg)
+                    voice_events.log("xai_binary", bytes=len(msg))
+        finally:
+            await xai_ws.close()
 
     except Exception as e:
         print(f"xAI error: {e}")
-        with open("ara_voice_log.txt", "a") as f:
-            f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}\n")
+        voice_events.log("error", error=str(e))
         await websocket.send(json.dumps({'error': str(e)}))
     finally:
         print("Ara voice client disconnected")
-        with open("ara_voice_log.txt", "a") as f:
-            f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Ara voice client disconnected\n")
+        voice_events.log("client_disconnected")
 
 async def start_ara_voice_server():
+    import asyncio
+    import websockets
+
+    if os.getenv('GROK_API_KEY') and voice_pool.size:
+        voice_pool.start()
     async with websockets.serve(ara_voice_handler, "0.0.0.0", 5002):
         await asyncio.Future()  # Run forever
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Firewall drop dashboard + Ara voice server")
+    parser.add_argument('--startup-profile', nargs='?', const='/api/dashboard', metavar='PATH',
+                        help="report import times and time-to-first-response for PATH, then exit")
+    parser.add_argument('--profile-json', metavar='FILE', help="also write the startup profile to FILE")
+    args = parser.parse_args()
+
+    if args.startup_profile:
+        from .startup_profile import profile_startup, print_report
+
+        profile = profile_startup(args.startup_profile)
+        print_report(profile)
+        if args.profile_json:
+            with open(args.profile_json, 'w') as f:
+                json.dump(profile, f, indent=2)
+        raise SystemExit(0)
+
     # Clear log file
-    open("ara_voice_log.txt", "w").close()
+    voice_events.truncate()
 
     # Start async WS server in a thread
     def run_ws_server():
+        import asyncio
         asyncio.run(start_ara_voice_server())
 
     ws_thread = threading.Thread(target=run_ws_server, daemon=True)
     ws_thread.start()
 
+    # Rebuild the dashboard snapshot every 60s off the request path
+    dashboard_snapshots.start()
+
     # Start Flask with gevent
     from gevent import pywsgi
     from geventwebsocket.handler import WebSocketHandler
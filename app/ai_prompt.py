@@ -1,4 +1,9 @@
 # ai_prompts.py (new file)
+
+# Bump whenever the template below changes: it is part of the AI summary cache key
+SUMMARY_PROMPT_VERSION = 1
+
+
 def get_summary_prompt(batch_text: str) -> str:
     """
     Returns the structured prompt for AI summary generation.
@@ -0,0 +1,310 @@
+# app/data_access.py
+"""
+Shared data-access layer for parsed firewall drops.
+The dashboard, the AI summary endpoint and the Ara voice server all go through
+one DropDataAccess: concurrent callers asking for the same (range, query) join a
+single in-flight fetch+parse, and results are kept for a short TTL.
+Only new Graylog messages are parsed on each refresh; they are merged into a
+rolling DropWindow whose minute/hour timelines are updated as they arrive.
+"""
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.cache import SingleFlight, TTLCache
+from app.events import DropEventBatch
+from app.metrics import count_parsed, stage
+from app.sketch import DropSketch
+from app.rollups import DropRollups
+from app.stats import compute_stats
+from app.timeline import TimelineRing
+from app.parallel_parse import SERIAL_BELOW, build_drop_batch_parallel
+from app.utils import DROP_QUERY, IncrementalDropFetcher
+
+
+class DropWindow:
+    """
+    Parsed events of one rolling window (newest first) plus its timelines.
+    ingest() merges a freshly parsed delta and evicts what fell out of the window.
+    """
+
+    RESOLUTIONS = {'minute': 60, 'hour': 3600}
+
+    def __init__(self, range_seconds, tz=None):
+        self.batch = DropEventBatch.empty()
+        self.cutoff_ms = None
+        self.timelines = {
+            name: TimelineRing(seconds, math.ceil(range_seconds / seconds) + 2, tz)
+            for name, seconds in self.RESOLUTIONS.items()
+        }
+
+    def ingest(self, new_batch, cutoff_ms=None):
+        batch = self.batch
+        if len(new_batch):
+            for ring in self.timelines.values():
+                ring.add(new_batch.timestamp)
+            merged = DropEventBatch.concat([new_batch, batch])
+            if len(batch) and new_batch.timestamp.min() < batch.timestamp.max():
+                # Late arrivals: restore newest-first order (stable, so ties keep fetch order)
+                merged = merged[np.argsort(-merged.timestamp, kind='stable')]
+            batch = merged
+        if cutoff_ms is not None:
+            keep = batch.timestamp >= cutoff_ms
+            if not keep.all():
+                # Evicted events leave the timelines too (the bucket at the cutoff is partial)
+                for ring in self.timelines.values():
+                    ring.remove(batch.timestamp[~keep])
+                batch = batch[keep]
+        self.batch, self.cutoff_ms = batch, cutoff_ms
+        return batch
+
+    def timeline(self, resolution='hour'):
+        """(['HH:MM', ...], [count, ...]) over the window; O(buckets)."""
+        return self.timelines[resolution].labels(since_ms=self.cutoff_ms)
+
+
+class SketchedHistory:
+    """
+    A long range with too many events to hold (DropDataAccess.sketch_threshold),
+    streamed from the store one segment at a time into, per site, a DropSketch and
+    hourly/daily timelines: memory is fixed whatever the range holds. Stands in
+    for the history batch: len(), site_values, for_site(), stats(), site_stats(),
+    timeline(); sketch() merges the sites' sketches for normalize_logs.
+    """
+
+    BUCKETS = (3600, 86400)
+
+    def __init__(self, range_seconds, tz=None, sites=None):
+        self.range_seconds = range_seconds
+        self.tz = tz
+        self.sites = {} if sites is None else sites  # site -> (DropSketch, {bucket seconds: TimelineRing})
+
+    def update(self, batch):
+        codes = np.unique(batch.site).tolist()
+        for code in codes:
+            site = batch.site_values[code]
+            if site not in self.sites:
+                self.sites[site] = (DropSketch(), {
+                    seconds: TimelineRing(seconds, math.ceil(self.range_seconds / seconds) + 2, self.tz)
+                    for seconds in self.BUCKETS})
+            part = batch if len(codes) == 1 else batch[batch.site == code]
+            sketch, rings = self.sites[site]
+            sketch.update(part)
+            for ring in rings.values():
+                ring.add(part.timestamp)
+        return self
+
+    def __len__(self):
+        return sum(sketch.events for sketch, _ in self.sites.values())
+
+    @property
+    def site_values(self):
+        return tuple(self.sites)
+
+    def for_site(self, site):
+        return SketchedHistory(self.range_seconds, self.tz, {site: self.sites[site]} if site in self.sites else {})
+
+    def sketch(self):
+        sketches = [sketch for sketch, _ in self.sites.values()]
+        if len(sketches) == 1:
+            return sketches[0]
+        merged = DropSketch()
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def stats(self):
+        return self.sketch().stats()
+
+    def site_stats(self):
+        """Same as app.stats.site_stats, busiest site first."""
+        busiest = sorted(self.sites, key=lambda site: -self.sites[site][0].events)
+        return {site: self.sites[site][0].stats() for site in busiest}
+
+    def timeline(self, bucket_seconds=3600, since_ms=None, fmt='%H:%M'):
+        """Same as app.timeline.timeline_labels over the range's timestamps (hourly or daily)."""
+        series = [rings[bucket_seconds].series(since_ms) for _, rings in self.sites.values()]
+        series = [(starts, counts) for starts, counts in series if len(starts)]
+        if not series:
+            return [], []
+        first = min(int(starts[0]) for starts, _ in series)
+        bucket_ms = bucket_seconds * 1000
+        totals = np.zeros((max(int(starts[-1]) for starts, _ in series) - first) // bucket_ms + 1, dtype=np.int64)
+        for starts, counts in series:
+            totals[(starts - first) // bucket_ms] += counts
+        starts = first + np.arange(len(totals), dtype=np.int64) * bucket_ms
+        return ([datetime.fromtimestamp(s / 1000, timezone.utc).strftime(fmt) for s in starts.tolist()],
+                totals.tolist())
+
+
+class DropDataAccess:
+    """
+    get_drops(range, query) -> (DropEventBatch, stats), shared by all callers.
+    Each (range, query) keeps its own incremental Graylog feed and DropWindow;
+    results are cached for `ttl` seconds and must be treated as read-only by callers.
+
+    With a `store` (DropEventStore), events of `store_query` are also persisted:
+    a new window is seeded from disk and its feed resumes after the newest stored
+    event, per site for a feed with `sites` (so a restart during a Graylog outage
+    still has data), and history() serves ranges longer than the live window from disk. Those events also keep
+    the minute/hour/day rollups current (seeded from disk once, then each event
+    is counted when first stored); rollup_timeline() queries them.
+
+    Deltas of at least `parse_serial_below` messages are parsed by
+    `parse_workers` processes (app.parallel_parse), e.g. the first full window.
+    """
+
+    def __init__(self, ttl=15, limit=2000, paged=True, fetcher_factory=IncrementalDropFetcher,
+                 store=None, store_query=DROP_QUERY, sketch_threshold=1_000_000, parse_workers=1,
+                 parse_serial_below=SERIAL_BELOW):
+        self.limit = limit
+        self.paged = paged
+        self.fetcher_factory = fetcher_factory
+        self.store = store
+        self.store_query = store_query
+        self.sketch_threshold = sketch_threshold
+        self.parse_workers = parse_workers
+        self.parse_serial_below = parse_serial_below
+        self.rollups = DropRollups()
+        self._rollups_seeded = False
+        self.cache = TTLCache(ttl)
+        self._flight = SingleFlight()
+        self._feeds = {}    # (range, query) -> (feed, DropWindow)
+        self._feeds_lock = threading.Lock()
+
+    def _persisted(self, query):
+        return self.store is not None and query == self.store_query
+
+    def _seed_rollups(self):
+        """Caller holds _feeds_lock. Runs before the first feed, so no event is counted twice."""
+        if self.store is None or self._rollups_seeded:
+            return
+        self._rollups_seeded = True
+        since_ms = int((time.time() - max(cube.retention * cube.bucket_ms // 1000
+                                          for cube in self.rollups.tiers.values())) * 1000)
+        try:
+            self.rollups.add(self.store.query(since_ms))
+        except sqlite3.Error as e:
+            print(f"Event store unavailable, rollups start empty: {e}")
+
+    def _feed(self, range_seconds, query):
+        with self._feeds_lock:
+            key = (range_seconds, query)
+            if key not in self._feeds:
+                self._seed_rollups()
+                feed = self.fetcher_factory(
+                    range_seconds=range_seconds, limit=self.limit, query=query, paged=self.paged
+                )
+                window = DropWindow(range_seconds)
+                if self._persisted(query):
+                    self._seed(feed, window, range_seconds)
+                self._feeds[key] = (feed, window)
+            return self._feeds[key]
+
+    def _seed(self, feed, window, range_seconds):
+        since_ms = int((time.time() - range_seconds) * 1000)
+        sites = getattr(feed, 'sites', None)
+        try:
+            seeded = self.store.query(since_ms)
+            if sites is None:
+                latest = {None: self.store.latest_ts()}
+            else:  # one cursor per site: a site that was behind catches up from its own newest event
+                latest = {site: self.store.latest_ts(site) for site in sites}
+        except sqlite3.Error as e:
+            print(f"Event store unavailable, starting from Graylog only: {e}")
+            return
+        window.ingest(seeded, since_ms)
+        cursors = {site: ts / 1000 for site, ts in latest.items() if ts is not None and ts >= since_ms}
+        if cursors:
+            feed.resume(cursors if sites is not None else cursors[None])
+        print(f"Seeded {len(seeded)} events from the local event store")
+
+    def _load(self, range_seconds, query, fresh=False):
+        cached = None if fresh else self.cache.get((range_seconds, query))
+        if cached is not None:  # filled by a flight that finished just before ours started
+            return cached
+        feed, window = self._feed(range_seconds, query)
+        new_logs = feed.poll()
+        print(f"Fetched {len(new_logs)} new raw logs from Graylog")
+
+        keys = [] if self._persisted(query) else None
+        with stage('parse'):
+            new_batch = build_drop_batch_parallel(new_logs, self.parse_workers, keys=keys,
+                                                  serial_below=self.parse_serial_below)
+        count_parsed(len(new_logs), len(new_batch))
+        if keys:
+            try:
+                new_batch = new_batch[self.store.add(new_batch, keys)]  # drop what disk already had
+            except sqlite3.Error as e:
+                print(f"Event store write failed: {e}")
+            self.rollups.add(new_batch)
+
+        cutoff_ms = feed.cutoff * 1000 if feed.cutoff is not None else None
+        batch = window.ingest(new_batch, cutoff_ms)
+        with stage('stats'):
+            result = (batch, compute_stats(batch))
+        self.cache.set((range_seconds, query), result)
+        return result
+
+    def get_drops(self, range_seconds=86400, query=DROP_QUERY):
+        key = (range_seconds, query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._flight.do(key, lambda: self._load(range_seconds, query))
+
+    def refresh(self, range_seconds=86400, query=DROP_QUERY):
+        """Like get_drops but polls Graylog now instead of serving the TTL cache (the live feed)."""
+        return self._flight.do((range_seconds, query), lambda: self._load(range_seconds, query, fresh=True))
+
+    def timeline(self, range_seconds=86400, resolution='hour', query=DROP_QUERY):
+        """Event counts per local minute/hour over the window: (labels, counts)."""
+        self.get_drops(range_seconds, query)
+        _, window = self._feed(range_seconds, query)
+        return window.timeline(resolution)
+
+    def rollup_timeline(self, range_seconds, bucket='auto', group_by=None, top=5):
+        """Counts per bucket (optionally split by a field) from the rollups; no raw events read."""
+        try:
+            self.get_drops()  # picks up the latest delta (and seeds the rollups on first use)
+        except Exception as e:
+            print(f"Rollups not refreshed, serving what they hold: {e}")
+        return self.rollups.timeline(range_seconds, bucket, group_by, top)
+
+    def _load_history(self, range_seconds):
+        key = ('history', range_seconds)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        since_ms = int((time.time() - range_seconds) * 1000)
+        if self.store.count(since_ms) > self.sketch_threshold:
+            # Millions of mostly one-off scanners: stream the segments into fixed-memory
+            # heavy hitters instead of loading every event (counts become upper bounds)
+            history = SketchedHistory(range_seconds)
+            for segment in self.store.scan(since_ms):
+                history.update(segment)
+            result = (history, history.stats())
+        else:
+            batch = self.store.query(since_ms)
+            result = (batch, compute_stats(batch))
+        self.cache.set(key, result)
+        return result
+
+    def history(self, range_seconds):
+        """
+        (batch, stats) for a long range (e.g. 7d/30d) read from the local store,
+        without touching Graylog; a SketchedHistory instead of the batch when the
+        range holds more than `sketch_threshold` events. Without a store this is
+        get_drops(range_seconds).
+        """
+        if self.store is None:
+            return self.get_drops(range_seconds)
+        key = ('history', range_seconds)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._flight.do(key, lambda: self._load_history(range_seconds))
@@ -0,0 +1,321 @@
+# app/event_store.py
+"""
+Persistent local store of parsed drop events: columnar segments in SQLite.
+
+Each ingested delta is written as one segment: the DropEventBatch columns as
+raw little-endian arrays in a BLOB, its dictionaries as JSON, plus an 8-byte
+hash of every Graylog message id (for dedupe). Indexes:
+  - segments (max_ts, min_ts)     time-range pruning
+  - segment_terms (field, value)  which segments hold a given src /24 or dst_port
+Reading 7d/30d is one indexed SELECT plus np.frombuffer per segment, i.e.
+milliseconds instead of a Graylog round trip, and it works with Graylog down.
+
+Compaction (compact(), run from add() at most every `compact_interval` s):
+  - deletes segments older than `retention_days`, trims those straddling the cutoff
+  - merges runs of small segments older than `merge_after` seconds into
+    segments of up to `segment_events` events
+  - returns freed pages to the OS (auto_vacuum=INCREMENTAL)
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.events import COLUMNS, DEFAULT_SITE, DICTIONARY_COLUMNS, DropEventBatch, _code_dtype
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id       INTEGER PRIMARY KEY,
+    min_ts   INTEGER NOT NULL,      -- epoch ms
+    max_ts   INTEGER NOT NULL,
+    events   INTEGER NOT NULL,
+    vocab    TEXT NOT NULL,         -- {"proto": [...], "rule_id": [...], "descr": [...], "site": [...]}
+    columns  BLOB NOT NULL,         -- _STORED_DTYPES arrays back to back
+    key_hash BLOB NOT NULL          -- uint64 per event
+);
+CREATE INDEX IF NOT EXISTS segments_ts ON segments (max_ts, min_ts);
+CREATE TABLE IF NOT EXISTS segment_terms (
+    field      INTEGER NOT NULL,    -- 0 = src /24, 1 = dst_port
+    value      INTEGER NOT NULL,
+    segment_id INTEGER NOT NULL,
+    PRIMARY KEY (field, value, segment_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS segment_terms_segment ON segment_terms (segment_id);
+"""
+
+SRC24, DST_PORT = 0, 1
+
+# Fixed on-disk dtypes (dictionary codes are widened to uint32)
+_STORED_DTYPES = {
+    'timestamp': '<i8', 'src_ip': '<u4', 'dst_ip': '<u4', 'src_port': '<u2', 'dst_port': '<u2',
+    'has_src_port': '?', 'has_dst_port': '?', 'proto': '<u4', 'rule_id': '<u4', 'descr': '<u4',
+    'raw_len': '<u4', 'site': '<u4', 'has_src_ip': '?',
+}
+
+
+def key_hashes(keys):
+    """Graylog ids (or fetcher fallback keys) -> uint64 array used for dedupe."""
+    digests = b''.join(
+        hashlib.blake2b((k if isinstance(k, str) else repr(k)).encode('utf-8'), digest_size=8).digest()
+        for k in keys)
+    return np.frombuffer(digests, dtype='<u8').astype(np.uint64)
+
+
+def _encode(batch):
+    columns = b''.join(np.ascontiguousarray(getattr(batch, name), dtype=_STORED_DTYPES[name]).tobytes()
+                       for name in COLUMNS)
+    vocab = json.dumps({name: list(getattr(batch, name + '_values')) for name in DICTIONARY_COLUMNS})
+    return columns, vocab
+
+
+def _decode(blob, vocab, events):
+    vocab = json.loads(vocab)
+    columns = {}
+    offset = 0
+    for name in COLUMNS:
+        if name == 'site' and name not in vocab:
+            continue  # segment written before sites existed: DropEventBatch fills in DEFAULT_SITE
+        dtype = np.dtype(_STORED_DTYPES[name])
+        if name == 'has_src_ip' and offset + dtype.itemsize * events > len(blob):
+            columns[name] = columns['src_ip'] != 0  # written before the mask: 0 was "not IPv4"
+            continue
+        column = np.frombuffer(blob, dtype=dtype, count=events, offset=offset)
+        offset += dtype.itemsize * events
+        if name in DICTIONARY_COLUMNS:
+            column = column.astype(_code_dtype(len(vocab[name])))
+        else:
+            column = column.astype(dtype.newbyteorder('='), copy=False)
+        columns[name] = column
+    return DropEventBatch(columns, vocab['proto'], vocab['rule_id'], vocab['descr'], vocab.get('site', (DEFAULT_SITE,)))
+
+
+def _newest_first(batch, hashes=None):
+    """Stable sort by timestamp, newest first (no-op when already ordered)."""
+    if len(batch) > 1 and (np.diff(batch.timestamp) > 0).any():
+        order = np.argsort(-batch.timestamp, kind='stable')
+        return batch[order], (hashes[order] if hashes is not None else None)
+    return batch, hashes
+
+
+class DropEventStore:
+    """
+    add(batch, keys) persists the events not stored yet; query(since_ms, ...) returns
+    a DropEventBatch, newest first (same order as the live window). Thread-safe; the
+    database file is opened on first use.
+    """
+
+    def __init__(self, path='drop_events.db', retention_days=30, segment_events=50000,
+                 merge_after=3600, compact_interval=3600, clock=time.time):
+        self.path = path
+        self.retention_days = retention_days
+        self.segment_events = segment_events
+        self.merge_after = merge_after
+        self.compact_interval = compact_interval
+        self.clock = clock
+        self._conn = None
+        self._lock = threading.RLock()
+        self._last_compact = None
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # only takes effect on a new file
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert(self, db, batch, hashes):
+        columns, vocab = _encode(batch)
+        segment_id = db.execute(
+            "INSERT INTO segments (min_ts, max_ts, events, vocab, columns, key_hash) VALUES (?, ?, ?, ?, ?, ?)",
+            (int(batch.timestamp.min()), int(batch.timestamp.max()), len(batch), vocab, columns,
+             hashes.astype('<u8').tobytes())).lastrowid
+        terms = [(SRC24, v, segment_id) for v in np.unique(batch.src_subnet24).tolist()]
+        terms += [(DST_PORT, v, segment_id) for v in np.unique(batch.dst_port[batch.has_dst_port]).tolist()]
+        db.executemany("INSERT INTO segment_terms (field, value, segment_id) VALUES (?, ?, ?)", terms)
+
+    def _delete(self, db, segment_ids):
+        for i in range(0, len(segment_ids), 500):  # stay under SQLite's bound-parameter limit
+            chunk = segment_ids[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            db.execute(f"DELETE FROM segment_terms WHERE segment_id IN ({marks})", chunk)
+            db.execute(f"DELETE FROM segments WHERE id IN ({marks})", chunk)
+
+    def add(self, batch, keys):
+        """
+        Store the events of `batch` (keys[i] is event i's Graylog id) that are not
+        stored yet, as one segment. Returns a bool mask of the rows that were new.
+        """
+        if len(keys) != len(batch):
+            raise ValueError(f"{len(keys)} keys for {len(batch)} events")
+        if not len(batch):
+            return np.zeros(0, dtype=bool)
+        hashes = key_hashes(keys)
+
+        with self._lock:
+            db = self._db()
+            # Duplicates can only sit in segments overlapping this batch in time
+            stored = [np.frombuffer(blob, dtype='<u8') for (blob,) in db.execute(
+                "SELECT key_hash FROM segments WHERE max_ts >= ? AND min_ts <= ?",
+                (int(batch.timestamp.min()), int(batch.timestamp.max())))]
+            new = ~np.isin(hashes, np.concatenate(stored)) if stored else np.ones(len(batch), dtype=bool)
+            _, first = np.unique(hashes, return_index=True)  # and within the batch itself
+            unique = np.zeros(len(batch), dtype=bool)
+            unique[first] = True
+            new &= unique
+            if new.any():
+                with db:
+                    self._insert(db, batch[new], hashes[new])
+
+            now = self.clock()
+            if self._last_compact is None or now - self._last_compact >= self.compact_interval:
+                self.compact(now)
+        return new
+
+    def latest_ts(self, site=None):
+        """Epoch ms of the newest stored event (of `site`, when given), or None."""
+        if site is None:
+            with self._lock:
+                return self._db().execute("SELECT MAX(max_ts) FROM segments").fetchone()[0]
+        latest = None
+        with self._lock:
+            rows = self._db().execute("SELECT max_ts, events, vocab, columns FROM segments ORDER BY max_ts DESC")
+            for max_ts, events, vocab, blob in rows:
+                if latest is not None and latest >= max_ts:
+                    break  # no older segment can hold anything newer
+                if site not in json.loads(vocab).get('site', (DEFAULT_SITE,)):
+                    continue
+                stamps = _decode(blob, vocab, events).for_site(site).timestamp
+                if len(stamps) and (latest is None or stamps.max() > latest):
+                    latest = int(stamps.max())
+        return latest
+
+    def _segments(self, since_ms, until_ms=None, src24=None, dst_port=None, with_hashes=False):
+        sql = "SELECT events, vocab, columns" + (", key_hash" if with_hashes else "") + \
+              " FROM segments WHERE max_ts >= ?"
+        params = [since_ms]
+        if until_ms is not None:
+            sql += " AND min_ts < ?"
+            params.append(until_ms)
+        for field, value in ((SRC24, src24), (DST_PORT, dst_port)):
+            if value is not None:
+                sql += " AND id IN (SELECT segment_id FROM segment_terms WHERE field = ? AND value = ?)"
+                params += [field, value]
+        sql += " ORDER BY id DESC"  # newer segments first: ties keep fetch order after the sort
+        with self._lock:
+            return self._db().execute(sql, params).fetchall()
+
+    def count(self, since_ms, until_ms=None):
+        """Events in the segments overlapping the range: an upper bound on len(query(...)), from the index only."""
+        sql, params = "SELECT COALESCE(SUM(events), 0) FROM segments WHERE max_ts >= ?", [since_ms]
+        if until_ms is not None:
+            sql += " AND min_ts < ?"
+            params.append(until_ms)
+        with self._lock:
+            return self._db().execute(sql, params).fetchone()[0]
+
+    def scan(self, since_ms, until_ms=None):
+        """
+        The events of query(since_ms, until_ms) one segment at a time (DropEventBatches,
+        newest segment first), holding one segment in memory: for streaming a 7d/30d
+        range into a sketch. A segment merged by compaction mid-scan is skipped.
+        """
+        sql, params = "SELECT id FROM segments WHERE max_ts >= ?", [since_ms]
+        if until_ms is not None:
+            sql += " AND min_ts < ?"
+            params.append(until_ms)
+        with self._lock:
+            segment_ids = [row[0] for row in self._db().execute(sql + " ORDER BY id DESC", params)]
+        for segment_id in segment_ids:
+            with self._lock:
+                row = self._db().execute("SELECT events, vocab, columns FROM segments WHERE id = ?",
+                                         (segment_id,)).fetchone()
+            if row is None:
+                continue
+            batch = _decode(row[2], row[1], row[0])
+            mask = batch.timestamp >= since_ms
+            if until_ms is not None:
+                mask &= batch.timestamp < until_ms
+            yield batch if mask.all() else batch[mask]
+
+    def query(self, since_ms, until_ms=None, src24=None, dst_port=None):
+        """
+        Events with since_ms <= ts (< until_ms), optionally only from one source /24
+        (uint32 network address) or to one dst_port, as a DropEventBatch, newest first.
+        """
+        rows = self._segments(since_ms, until_ms, src24, dst_port)
+        if not rows:
+            return DropEventBatch.empty()
+        batch = DropEventBatch.concat([_decode(blob, vocab, events) for events, vocab, blob in rows])
+
+        mask = batch.timestamp >= since_ms
+        if until_ms is not None:
+            mask &= batch.timestamp < until_ms
+        if src24 is not None:
+            mask &= batch.src_subnet24 == src24
+        if dst_port is not None:
+            mask &= batch.has_dst_port & (batch.dst_port == dst_port)
+        if not mask.all():
+            batch = batch[mask]
+        return _newest_first(batch)[0]
+
+    def compact(self, now=None):
+        """Apply retention and merge small segments. Returns the number of events deleted."""
+        now = now if now is not None else self.clock()
+        cutoff_ms = int((now - self.retention_days * 86400) * 1000)
+        merge_before_ms = int((now - self.merge_after) * 1000)
+
+        with self._lock:
+            db = self._db()
+            with db:
+                expired = db.execute("SELECT id, events FROM segments WHERE max_ts < ?", (cutoff_ms,)).fetchall()
+                self._delete(db, [segment_id for segment_id, _ in expired])
+                deleted = sum(events for _, events in expired)
+
+                # Merge runs of small segments (and trim those straddling the cutoff)
+                candidates = db.execute(
+                    "SELECT id, events, min_ts < ? FROM segments WHERE max_ts < ? ORDER BY min_ts, id",
+                    (cutoff_ms, merge_before_ms)).fetchall()
+                groups, group, size, trim = [], [], 0, False
+                for segment_id, events, straddles in candidates + [(None, self.segment_events, False)]:
+                    if segment_id is None or size + events > self.segment_events:
+                        if len(group) > 1 or trim:
+                            groups.append(group)
+                        group, size, trim = [], 0, False
+                    if segment_id is not None and (events < self.segment_events or straddles):
+                        group.append(segment_id)
+                        size += events
+                        trim = trim or bool(straddles)
+                for group in groups:
+                    deleted += self._merge(db, group, cutoff_ms)
+
+            if deleted or groups:
+                db.execute("PRAGMA incremental_vacuum")
+            self._last_compact = now
+        if deleted:
+            print(f"Event store compaction: {deleted} expired events removed")
+        return deleted
+
+    def _merge(self, db, segment_ids, cutoff_ms):
+        marks = ','.join('?' * len(segment_ids))
+        rows = db.execute(f"SELECT events, vocab, columns, key_hash FROM segments WHERE id IN ({marks})"
+                          " ORDER BY id DESC", segment_ids).fetchall()
+        batch = DropEventBatch.concat([_decode(blob, vocab, events) for events, vocab, blob, _ in rows])
+        hashes = np.concatenate([np.frombuffer(h, dtype='<u8') for *_, h in rows])
+        keep = batch.timestamp >= cutoff_ms
+        batch, hashes = _newest_first(batch[keep], hashes[keep])
+        self._delete(db, segment_ids)
+        if len(batch):
+            self._insert(db, batch, hashes)
+        return int((~keep).sum())
@@ -0,0 +1,340 @@
+# app/events.py
+"""
+Columnar container for parsed drop events.
+
+A list of 9-key dicts (plus a full copy of raw_message) costs ~1 KB per event.
+DropEventBatch keeps the same information in NumPy columns, ~32 bytes per event:
+  timestamp          int64   epoch milliseconds (MISSING_TS when absent/unparseable)
+  src_ip, dst_ip     uint32  IPv4 (WAN_LOCAL rules are IPv4-only; anything else -> 0)
+  has_src_ip         bool    src_ip was IPv4: other sources count under the 'unknown' subnet
+  src_port, dst_port uint16  with has_src_port / has_dst_port bool masks
+  proto, rule_id, descr      dictionary codes into proto_values / rule_id_values / descr_values
+  raw_len            uint32  length of the raw message (for token estimates)
+  site                       dictionary code into site_values (the Graylog source's label)
+Slicing returns views; concat() merges the dictionaries.
+"""
+import socket
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+MISSING_TS = np.iinfo(np.int64).min
+
+COLUMNS = ('timestamp', 'src_ip', 'dst_ip', 'src_port', 'dst_port',
+           'has_src_port', 'has_dst_port', 'proto', 'rule_id', 'descr', 'raw_len', 'site', 'has_src_ip')
+DICTIONARY_COLUMNS = ('proto', 'rule_id', 'descr', 'site')
+
+# Site of events fetched without a configured source (single GRAYLOG_URL)
+DEFAULT_SITE = 'default'
+
+# Source "subnet" of events whose SRC is not IPv4 (IPv6, junk): a key no real /24 can have
+UNKNOWN_SUBNET = 0xFFFFFFFF
+UNKNOWN_SUBNET_LABEL = 'unknown'
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MS = timedelta(milliseconds=1)
+
+
+def iso_to_epoch_ms(ts):
+    """Graylog ISO timestamp ('2026-01-22T21:44:47.000Z') -> epoch ms, or MISSING_TS."""
+    if not ts:
+        return MISSING_TS
+    try:
+        dt = datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return MISSING_TS
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // _MS  # exact integer ms (no float rounding)
+
+
+# Graylog's canonical form, parsed column-wise by iso_to_epoch_ms_array
+_ISO_TEMPLATE = '0000-00-00T00:00:00.000Z'
+_ISO_DIGITS = np.array([i for i, c in enumerate(_ISO_TEMPLATE) if c == '0'])
+_ISO_SEPS = np.array([i for i, c in enumerate(_ISO_TEMPLATE) if c != '0'])
+_ISO_SEP_BYTES = np.frombuffer(''.join(_ISO_TEMPLATE[i] for i in _ISO_SEPS).encode(), dtype=np.uint8)
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def iso_to_epoch_ms_array(values):
+    """
+    Timestamps (ISO strings, ints already in epoch ms, or None) -> int64 epoch ms.
+    Canonical 'YYYY-MM-DDTHH:MM:SS.mmmZ' strings are decoded in one vectorized pass
+    (about half the cost of datetime per value); anything else goes through
+    iso_to_epoch_ms, so the result is identical either way.
+    """
+    out = np.full(len(values), MISSING_TS, dtype=np.int64)
+    decoded = np.zeros(len(values), dtype=bool)
+    try:  # common case: every value is a 24-char string
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+        raw = ''.join(values) if (lengths == 24).all() else None
+    except TypeError:  # None / ints in the column
+        raw = None
+    if raw is not None:
+        canonical = np.arange(len(values))
+    else:
+        canonical = np.array([i for i, v in enumerate(values) if type(v) is str and len(v) == 24], dtype=np.int64)
+        raw = ''.join([values[i] for i in canonical.tolist()])
+    if len(canonical):
+        chars = np.frombuffer(raw.encode('ascii', 'replace'), dtype=np.uint8).reshape(len(canonical), 24)
+        d = chars[:, _ISO_DIGITS] - np.uint8(48)  # non-digits wrap to > 9
+        ok = (d <= 9).all(axis=1) & (chars[:, _ISO_SEPS] == _ISO_SEP_BYTES).all(axis=1)
+        d = d.astype(np.int64)
+        year = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+        month = d[:, 4] * 10 + d[:, 5]
+        day = d[:, 6] * 10 + d[:, 7]
+        hour = d[:, 8] * 10 + d[:, 9]
+        minute = d[:, 10] * 10 + d[:, 11]
+        second = d[:, 12] * 10 + d[:, 13]
+        millis = d[:, 14] * 100 + d[:, 15] * 10 + d[:, 16]
+
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        valid_month = (month >= 1) & (month <= 12)
+        month_days = _DAYS_IN_MONTH[np.where(valid_month, month, 0)] + (leap & (month == 2))
+        ok &= (valid_month & (day >= 1) & (day <= month_days) & (year >= 1)
+               & (hour < 24) & (minute < 60) & (second < 60))
+
+        # Days since 1970-01-01 from the civil date (proleptic Gregorian)
+        y = year - (month <= 2)
+        era = y // 400
+        yoe = y - era * 400
+        doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+        days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+        ms = ((days * 24 + hour) * 60 + minute) * 60000 + second * 1000 + millis
+        out[canonical[ok]] = ms[ok]
+        decoded[canonical[ok]] = True
+
+    for i in np.flatnonzero(~decoded).tolist():
+        v = values[i]
+        out[i] = v if isinstance(v, int) else iso_to_epoch_ms(v)
+    return out
+
+
+def epoch_ms_to_iso(ms):
+    if ms == MISSING_TS:
+        return None
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def ip_to_str(ip):
+    ip = int(ip)
+    return f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}"
+
+
+def subnet24_to_str(ip):
+    """uint32 address (or already-masked /24) -> '173.249.19.0/24'; UNKNOWN_SUBNET -> 'unknown'."""
+    ip = int(ip)
+    if ip == UNKNOWN_SUBNET:
+        return UNKNOWN_SUBNET_LABEL
+    return f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.0/24"
+
+
+def subnet24_label(ip):
+    """Source /24 label of a parsed dict's src_ip, the same one the batch path gives."""
+    try:
+        socket.inet_pton(socket.AF_INET, ip)
+    except (OSError, TypeError):
+        return UNKNOWN_SUBNET_LABEL
+    return ip[:ip.rfind('.')] + '.0/24'
+
+
+def _code_dtype(size):
+    return np.uint8 if size <= 0xFF else np.uint16 if size <= 0xFFFF else np.uint32
+
+
+class DropEventBatch:
+    """Immutable-by-convention columnar batch of drop events (see module docstring)."""
+
+    __slots__ = COLUMNS + ('proto_values', 'rule_id_values', 'descr_values', 'site_values')
+
+    def __init__(self, columns, proto_values=(), rule_id_values=(), descr_values=(), site_values=(DEFAULT_SITE,)):
+        if 'site' not in columns:  # every event from one site
+            columns = {**columns, 'site': np.zeros(len(columns['timestamp']), dtype=np.uint8)}
+        if 'has_src_ip' not in columns:  # every src_ip is an address
+            columns = {**columns, 'has_src_ip': np.ones(len(columns['timestamp']), dtype=np.bool_)}
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        self.proto_values = tuple(proto_values)
+        self.rule_id_values = tuple(rule_id_values)
+        self.descr_values = tuple(descr_values)
+        self.site_values = tuple(site_values)
+
+    @classmethod
+    def empty(cls):
+        return DropEventBatchBuilder().build()
+
+    @classmethod
+    def from_events(cls, events):
+        """Build from parse_firewall_drops-style dicts."""
+        builder = DropEventBatchBuilder()
+        for e in events:
+            builder.append(
+                e.get('timestamp'), e.get('rule_id'), e.get('descr'), e.get('src_ip'), e.get('dst_ip'),
+                e.get('proto', 'UNKNOWN'), e.get('src_port'), e.get('dst_port'),
+                len(e.get('raw_message') or ''),
+            )
+        return builder.build()
+
+    @classmethod
+    def concat(cls, batches):
+        """Concatenate batches in order, merging their dictionaries."""
+        batches = [b for b in batches if b is not None]
+        if not batches:
+            return cls.empty()
+        # Empty batches would only add unused dictionary entries
+        batches = [b for b in batches if len(b)] or batches[:1]
+        if len(batches) == 1:
+            return batches[0]
+
+        columns = {}
+        values = {}
+        for name in DICTIONARY_COLUMNS:
+            merged = {}
+            for b in batches:
+                for v in getattr(b, name + '_values'):
+                    merged.setdefault(v, len(merged))
+            dtype = _code_dtype(len(merged))
+            parts = []
+            for b in batches:
+                remap = np.array([merged[v] for v in getattr(b, name + '_values')] or [0], dtype=dtype)
+                parts.append(remap[getattr(b, name)])
+            columns[name] = np.concatenate(parts)
+            values[name] = tuple(merged)
+        for name in COLUMNS:
+            if name not in columns:
+                columns[name] = np.concatenate([getattr(b, name) for b in batches])
+        return cls(columns, values['proto'], values['rule_id'], values['descr'], values['site'])
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, index):
+        """Slice (views), boolean mask or index array -> new batch sharing the dictionaries."""
+        if isinstance(index, (int, np.integer)):
+            index = slice(index, index + 1 or None)
+        columns = {name: getattr(self, name)[index] for name in COLUMNS}
+        return DropEventBatch(columns, self.proto_values, self.rule_id_values, self.descr_values, self.site_values)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    @property
+    def src_subnet24(self):
+        """Source /24 network as uint32 (ip & 0xFFFFFF00), UNKNOWN_SUBNET where src_ip was not IPv4."""
+        return np.where(self.has_src_ip, self.src_ip & np.uint32(0xFFFFFF00), np.uint32(UNKNOWN_SUBNET))
+
+    def for_site(self, site):
+        """Events of one site (empty batch if the site has none)."""
+        if site not in self.site_values:
+            return self[:0]
+        return self[self.site == self.site_values.index(site)]
+
+    def proto_names(self):
+        return [self.proto_values[c] for c in self.proto.tolist()]
+
+    def iter_events(self):
+        """Yield parse_firewall_drops-style dicts (without raw_message)."""
+        proto_values, rule_values, descr_values = self.proto_values, self.rule_id_values, self.descr_values
+        rows = zip(self.timestamp.tolist(), self.rule_id.tolist(), self.descr.tolist(),
+                   self.src_ip.tolist(), self.dst_ip.tolist(), self.proto.tolist(),
+                   self.src_port.tolist(), self.has_src_port.tolist(),
+                   self.dst_port.tolist(), self.has_dst_port.tolist(), self.has_src_ip.tolist())
+        for ts, rule, descr, src, dst, proto, sport, has_sport, dport, has_dport, has_src in rows:
+            yield {
+                'timestamp': epoch_ms_to_iso(ts),
+                'rule_id': rule_values[rule],
+                'descr': descr_values[descr],
+                'src_ip': ip_to_str(src) if has_src else None,
+                'dst_ip': ip_to_str(dst),
+                'proto': proto_values[proto],
+                'src_port': sport if has_sport else None,
+                'dst_port': dport if has_dport else None,
+            }
+
+    def to_events(self):
+        return list(self.iter_events())
+
+
+class DropEventBatchBuilder:
+    """
+    Appended events turned into a DropEventBatch by build(). append() only keeps
+    the raw values (one list per field); build() converts each column in one pass:
+    dictionary codes for the string fields, IPs packed once per distinct address.
+    """
+
+    def __init__(self):
+        self._timestamp = []            # ISO strings / epoch ms, decoded in build()
+        self._src_ip = []
+        self._dst_ip = []
+        self._src_port = []             # int or None
+        self._dst_port = []
+        self._raw_len = []
+        self._proto = []
+        self._rule_id = []
+        self._descr = []
+        self._site = []
+
+    def __len__(self):
+        return len(self._timestamp)
+
+    @staticmethod
+    def _packed_ip(ip):
+        try:
+            return socket.inet_pton(socket.AF_INET, ip)
+        except (OSError, TypeError):
+            return None
+
+    @staticmethod
+    def _dictionary_column(values):
+        """(codes, distinct values in first-seen order)."""
+        if values and values.count(values[0]) == len(values):  # e.g. one site, one rule, the WAN address
+            return np.zeros(len(values), dtype=np.uint8), (values[0],)
+        vocab = {}
+        codes = [vocab.setdefault(value, len(vocab)) for value in values]
+        return np.array(codes, dtype=_code_dtype(len(vocab))), tuple(vocab)
+
+    @classmethod
+    def _ip_column(cls, ips):
+        """(uint32 addresses, IPv4 mask): what inet_pton rejects (IPv6, junk) is 0 and False."""
+        # Scanners repeat and dst is mostly the WAN address: pack each distinct string once
+        codes, distinct = cls._dictionary_column(ips)
+        packed = [cls._packed_ip(ip) for ip in distinct]
+        valid = np.array([p is not None for p in packed], dtype=np.bool_)
+        addresses = np.frombuffer(b''.join(p or b'\x00\x00\x00\x00' for p in packed), dtype='>u4')
+        return addresses.astype(np.uint32)[codes], valid[codes]
+
+    @staticmethod
+    def _port_columns(ports):
+        ports = np.array(ports, dtype=object)
+        present = ports != None  # noqa: E711 (elementwise)
+        return np.where(present, ports, 0).astype(np.uint16), present.astype(np.bool_)
+
+    def append(self, timestamp, rule_id, descr, src_ip, dst_ip, proto, src_port, dst_port, raw_len=0,
+               site=DEFAULT_SITE):
+        self._timestamp.append(timestamp)
+        self._src_ip.append(src_ip)
+        self._dst_ip.append(dst_ip)
+        self._src_port.append(src_port)
+        self._dst_port.append(dst_port)
+        self._raw_len.append(raw_len)
+        self._proto.append(proto)
+        self._rule_id.append(rule_id)
+        self._descr.append(descr)
+        self._site.append(site)
+
+    def build(self):
+        columns = {
+            'timestamp': iso_to_epoch_ms_array(self._timestamp),
+            'dst_ip': self._ip_column(self._dst_ip)[0],
+            'raw_len': np.array(self._raw_len, dtype=np.uint32),
+        }
+        columns['src_ip'], columns['has_src_ip'] = self._ip_column(self._src_ip)
+        columns['src_port'], columns['has_src_port'] = self._port_columns(self._src_port)
+        columns['dst_port'], columns['has_dst_port'] = self._port_columns(self._dst_port)
+        values = {}
+        for name in DICTIONARY_COLUMNS:
+            columns[name], values[name] = self._dictionary_column(getattr(self, '_' + name))
+        return DropEventBatch(columns, values['proto'], values['rule_id'], values['descr'],
+                              values['site'] or (DEFAULT_SITE,))
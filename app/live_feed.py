@@ -0,0 +1,206 @@
+# app/live_feed.py
+"""
+Server-Sent Events push of new drops to every open dashboard.
+
+One producer thread polls `poll_fn()` (the live 24h state: total, top subnets /
+ports, hourly timeline) every `interval` seconds while anyone is listening. Each
+tick is diffed against the previous one with snapshot.payload_delta and encoded
+once; the same bytes are appended to every subscriber's queue, so a tick costs
+one Graylog poll and one json.dumps however many viewers there are.
+
+    event: state   full state (on connect, and to resync a slow client)
+    event: delta   {'seq', 'since', 'ts', 'changed': {...}, 'timeline': {drop, keep, labels, data}}
+
+Queues are bounded: when a client falls `max_queue` messages behind, its backlog
+is replaced by the current state (coalesced into one message). A client that has
+not read anything for `stall_timeout` seconds is dropped. Comment lines every
+`heartbeat` seconds keep proxies from closing idle streams and surface
+disconnects.
+"""
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+from app.snapshot import payload_delta
+
+_HEARTBEAT = b': keepalive\n\n'
+
+
+def sse_message(event, seq, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def set(self):
+        self._event.set()
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def close(self):
+        pass
+
+
+class _GeventWaiter:
+    """The gevent server runs requests as greenlets of one thread; the producer wakes them via a thread-safe async watcher."""
+
+    def __init__(self, gevent):
+        from gevent.event import Event
+
+        self._event = Event()
+        self._async = gevent.get_hub().loop.async_()
+        self._async.start(self._event.set)
+
+    def set(self):
+        if self._async is not None:
+            self._async.send()
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def close(self):
+        if self._async is not None:
+            self._async.close()
+            self._async = None
+
+
+def _waiter():
+    gevent = sys.modules.get('gevent')
+    if gevent is not None and gevent.getcurrent().parent is not None:
+        return _GeventWaiter(gevent)
+    return _ThreadWaiter()
+
+
+class Subscription:
+    def __init__(self, feed, clock):
+        self.feed = feed
+        self.queue = deque()
+        self.closed = False
+        self.last_read = clock()
+        self._clock = clock
+        self._waiter = _waiter()
+
+    def _push(self, message):
+        self.queue.append(message)
+        self._waiter.set()
+
+    def next(self, timeout):
+        """The next message, or None after `timeout` s without one (or once closed)."""
+        if not self.queue and not self.closed:
+            self._waiter.wait(timeout)
+        self.last_read = self._clock()
+        return self.queue.popleft() if self.queue else None
+
+    def __iter__(self):
+        try:
+            while not self.closed:
+                message = self.next(self.feed.heartbeat)
+                yield message if message is not None else _HEARTBEAT
+        finally:
+            self.close()
+
+    def close(self):
+        self.closed = True
+        self.feed._unsubscribe(self)
+        self._waiter.close()
+
+
+class LiveDropFeed:
+    def __init__(self, poll_fn, interval=5, max_queue=16, heartbeat=15, stall_timeout=60,
+                 clock=time.monotonic):
+        self.poll_fn = poll_fn
+        self.interval = interval
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self.stall_timeout = stall_timeout
+        self.clock = clock
+        self.stats = {'polls': 0, 'errors': 0, 'published': 0, 'coalesced': 0, 'dropped': 0}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._state = None
+        self._state_message = None
+        self._seq = 0
+        self._thread = None
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, start=True):
+        """A new subscriber, primed with the current state; starts the producer if it is idle."""
+        subscription = Subscription(self, self.clock)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._state is not None:
+                subscription._push(self._current_state_message())
+            if start and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="live-drop-feed", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _current_state_message(self):
+        """Caller holds _lock. Encoded at most once per tick, and only if someone needs it."""
+        if self._state_message is None:
+            self._state_message = sse_message('state', self._seq, {'seq': self._seq, **self._state})
+        return self._state_message
+
+    def publish(self, state):
+        """Diff `state` against the previous one and fan the increment out. Returns the delta (or None)."""
+        with self._lock:
+            previous, since = self._state, self._seq
+            delta = payload_delta(previous, state) if previous is not None else None
+            if delta is not None and not delta['changed'] and 'timeline' not in delta:
+                return None  # nothing new this tick
+            self._seq += 1
+            self._state, self._state_message = state, None
+            message = None
+            if delta is not None:
+                delta = {'seq': self._seq, 'since': since, 'ts': int(time.time() * 1000), **delta}
+                message = sse_message('delta', self._seq, delta)
+            self.stats['published'] += 1
+
+            now = self.clock()
+            for subscription in list(self._subscribers):
+                if message is not None and len(subscription.queue) < self.max_queue:
+                    subscription._push(message)
+                elif now - subscription.last_read > self.stall_timeout:
+                    self.stats['dropped'] += 1
+                    self._subscribers.discard(subscription)
+                    subscription.closed = True
+                    subscription._waiter.set()
+                else:
+                    # Too far behind (or no base yet): one full state replaces the backlog
+                    self.stats['coalesced'] += bool(subscription.queue)
+                    subscription.queue.clear()
+                    subscription._push(self._current_state_message())
+            return delta
+
+    def poll_once(self):
+        self.stats['polls'] += 1
+        try:
+            state = self.poll_fn()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Live feed poll failed: {e}")
+            return None
+        return self.publish(state)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            started = time.monotonic()
+            self.poll_once()
+            time.sleep(max(0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,109 @@
+# app/log_writer.py
+"""
+Buffered JSON-lines logging.
+
+log(event, **fields) only appends a tuple to an in-memory deque (about a
+microsecond, no syscalls), so it is safe to call from the voice server's event
+loop for every audio delta. A daemon thread wakes every `flush_interval`
+seconds, formats everything pending and writes it with one open/write/close.
+
+  - one JSON object per line: {"ts": "<local ISO time>", "event": ..., **fields}
+  - size-based rotation: path -> path.1 -> ... -> path.<backups>
+  - bounded backlog: beyond `max_pending` queued records new ones are counted
+    in `dropped` instead of growing memory while the disk is stuck
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class BufferedJsonLog:
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backups=3, flush_interval=0.5,
+                 max_pending=100000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = deque()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def log(self, event, **fields):
+        """Queue one record; never blocks on I/O."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), event, fields))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"log-writer:{self.path}", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Write everything queued so far (called by the writer thread, tests and close())."""
+        with self._write_lock:
+            records = []
+            while self._pending:
+                records.append(self._pending.popleft())
+            if not records:
+                return 0
+            data = ''.join(
+                json.dumps({'ts': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+                            'event': event, **fields}, default=str) + '\n'
+                for ts, event, fields in records)
+            try:
+                self._rotate_if_needed(len(data.encode('utf-8')))
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Warning: could not write {self.path}: {e}")
+            return len(records)
+
+    def _rotate_if_needed(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if not size or size + incoming <= self.max_bytes:
+            return
+        if self.backups < 1:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def truncate(self):
+        """Drop queued records and empty the current file (server start-up)."""
+        with self._write_lock:
+            self._pending.clear()
+            open(self.path, 'w').close()
+
+    def close(self):
+        """Stop the writer thread after a final flush."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout=5)
+            self._thread = None
+        self.flush()
@@ -0,0 +1,192 @@
+# app/metrics.py
+"""
+In-process counters and latency histograms, exposed at /metrics in the
+Prometheus text format (version 0.0.4).
+
+Recording is a dict lookup, a bisect and a few adds under a lock: a timed
+block costs a few microseconds, against stages that take milliseconds and run
+a handful of times per request. The exposition text is only built when
+/metrics is scraped.
+
+    with stage('parse'):
+        batch = build_drop_batch(logs)
+
+dashboard_stage_seconds{stage=...} covers fetch, json_decode, parse, stats,
+timeline, normalize, ai_call, render and voice_first_audio.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}   # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(labels[name] for name in self.labelnames)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+
+    def _samples(self):
+        """[(suffix, label pairs, value)] for render()."""
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: [str(v) for v in item[0]])
+        return [('', list(zip(self.labelnames, key)), value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}"
+                  for suffix, pairs, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    """Per label set: a count per bucket (non-cumulative until rendered), the sum and the count."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)  # le is inclusive
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(((key, ([*counts], total, n)) for key, (counts, total, n) in self._values.items()),
+                           key=lambda item: [str(v) for v in item[0]])
+        samples = []
+        for key, (counts, total, n) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append(('_bucket', pairs + [('le', _format_value(float(bound)))], cumulative))
+            samples.append(('_sum', pairs, total))
+            samples.append(('_count', pairs, n))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram('dashboard_stage_seconds', "Wall-clock seconds per pipeline stage", ['stage'])
+GRAYLOG_MESSAGES = REGISTRY.counter('drop_parse_messages_total', "Graylog messages given to the drop parser")
+DROP_EVENTS = REGISTRY.counter('drop_parse_events_total', "Messages that parsed as drop events")
+MATCH_RATIO = REGISTRY.gauge('drop_parse_match_ratio', "Share of the last parsed delta that matched the drop pattern")
+AI_TOKENS = REGISTRY.counter('ai_tokens_total', "Tokens spent on AI summaries", ['kind'])
+AI_COST = REGISTRY.counter('ai_cost_dollars_total', "Estimated AI summary spend in US dollars")
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@contextmanager
+def stage(name):
+    """Time the block into dashboard_stage_seconds{stage=name} (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def count_parsed(messages, events):
+    """Record one parse: `messages` Graylog messages in, `events` drops out."""
+    GRAYLOG_MESSAGES.inc(messages)
+    DROP_EVENTS.inc(events)
+    if messages:
+        MATCH_RATIO.set(events / messages)
@@ -1,64 +1,224 @@
 # normalizer.py (final, as proposed with minor empty handling)
-from collections import defaultdict, Counter
+from collections import Counter
+
+import numpy as np
+
+from app.events import DropEventBatch, subnet24_label, subnet24_to_str
+from app.sketch import DropSketch
+from app.stats import port_subnet_breakdown, threat_score
+from app.tokens import estimate_tokens
+
+
+DEFAULT_THREAT_PORTS = {22: 5, 23: 5, 3389: 10, 445: 8, 1433: 8, 3306: 6}
+
+
+class StreamingNormalizer:
+    """
+    Incremental form of normalize_logs: nested counts instead of per-event lists.
+
+        n = StreamingNormalizer()
+        for chunk in chunks:          # lists of dicts, generators or DropEventBatch
+            n.update(chunk)
+        n.merge(later_partial)        # e.g. another worker's / the next hour's result
+        text = n.render(max_groups=30)
+
+    Memory is O(distinct (port, proto, /24)), not O(events). Counts are kept in
+    first-seen order, so the output equals normalize_logs over the concatenated
+    events (Counter.most_common tie-breaks) as long as partials are merged in
+    stream order: merge(other) treats `other` as coming after `self`.
+    """
+
+    def __init__(self, exclude_ports={51413}, threat_ports=None):
+        self.exclude_ports = set(exclude_ports)
+        self.threat_ports = DEFAULT_THREAT_PORTS if threat_ports is None else threat_ports
+        self.raw = 0                # every event seen, like len(parsed_logs)
+        self.group_counts = {}      # (dst_port, proto) -> count
+        self.subnet_counts = {}     # (dst_port, proto) -> Counter(subnet -> count)
+        self.threat_score = 0
+
+    def update(self, events):
+        if isinstance(events, DropEventBatch):
+            self._update_batch(events)
+            return self
+
+        group_counts, subnet_counts = self.group_counts, self.subnet_counts
+        for p in events:
+            self.raw += 1
+            dst_port = p.get('dst_port')
+            if dst_port is None or dst_port in self.exclude_ports:
+                continue
+
+            port_key = (dst_port, p.get('proto', 'UNKNOWN'))
+            subnet = subnet24_label(p.get('src_ip'))
+            if port_key in group_counts:
+                group_counts[port_key] += 1
+                subnet_counts[port_key][subnet] += 1
+            else:
+                group_counts[port_key] = 1
+                subnet_counts[port_key] = Counter({subnet: 1})
+            self.threat_score += self.threat_ports.get(dst_port, 1)
+        return self
+
+    def _update_batch(self, batch):
+        self.raw += len(batch)
+        mask = batch.has_dst_port
+        if self.exclude_ports:
+            mask = mask & ~np.isin(batch.dst_port, np.fromiter(self.exclude_ports, dtype=np.int64))
+        ports = batch.dst_port[mask].astype(np.int64)
+        if not len(ports):
+            return
+        protos = batch.proto[mask].astype(np.int64)
+        subnets = batch.src_subnet24[mask].astype(np.int64)
+
+        # Distinct (port, proto, subnet) triples in first-occurrence order
+        group_keys = (ports << 32) | protos
+        _, group_of_event = np.unique(group_keys, return_inverse=True)
+        pair_keys, first, counts = np.unique((group_of_event.astype(np.int64) << 32) | subnets,
+                                             return_index=True, return_counts=True)
+        order = np.argsort(first, kind='stable')
+        for first_event, key, count in zip(first[order].tolist(), pair_keys[order].tolist(), counts[order].tolist()):
+            group_key = int(group_keys[first_event])
+            port_key = (group_key >> 32, batch.proto_values[group_key & 0xFFFFFFFF])
+            self._add(port_key, subnet24_to_str(key & 0xFFFFFFFF), count)
+        self.threat_score += threat_score(batch, self.threat_ports, self.exclude_ports)
+
+    def _add(self, port_key, subnet, count):
+        if port_key in self.group_counts:
+            self.group_counts[port_key] += count
+            self.subnet_counts[port_key][subnet] += count
+        else:
+            self.group_counts[port_key] = count
+            self.subnet_counts[port_key] = Counter({subnet: count})
+
+    def merge(self, other):
+        """Add another partial (covering later events) into this one."""
+        self.raw += other.raw
+        self.threat_score += other.threat_score
+        for port_key, subnets in other.subnet_counts.items():
+            for subnet, count in subnets.items():
+                self._add(port_key, subnet, count)
+        return self
+
+    def groups(self, max_groups=None):
+        """[(dst_port, proto, count, [(subnet, count), ...top 3]), ...], biggest groups first."""
+        ordered = sorted(self.group_counts.items(), key=lambda x: x[1], reverse=True)
+        return [(dst_port, proto, count, self.subnet_counts[(dst_port, proto)].most_common(3))
+                for (dst_port, proto), count in ordered[:max_groups]]
+
+    @property
+    def normalized_total(self):
+        return sum(self.group_counts.values())
+
+    def render(self, max_groups=30, token_budget=None):
+        """The condensed text normalize_logs returns for the same events."""
+        if not self.raw:
+            return _EMPTY
+        return _render(self.groups(max_groups if token_budget is None else None), self.normalized_total, self.raw,
+                       self.threat_score, self.threat_ports, max_groups, token_budget)[0]
+
+
+_EMPTY = "\nTotal normalized events: 0 (from 0 raw)\nThreat score total: 0"
+
+
+def _group_lines(dst_port, proto, count, top_subnets, threat_ports):
+    threat_level = "HIGH" if dst_port in threat_ports and threat_ports[dst_port] >= 8 else \
+                   "MEDIUM" if dst_port in threat_ports else "LOW"
+    return ([f"{count} {proto} probes on DPT={dst_port} ({threat_level})"]
+            + [f"  └─ {sub_count} from {subnet}" for subnet, sub_count in top_subnets])
+
+
+def _rollup_line(ports, probes, score):
+    return f"{ports} other ports: {probes} probes (threat score {score})"
+
+
+def _pack(groups, normalized_total, threat_score_total, threat_ports, max_groups, budget):
+    """
+    Lines for at most `budget` tokens. Groups are ranked by threat-weighted
+    signal (count x port weight) and added greedily, each port line followed
+    by its subnet lines, until the next line would not fit (or `max_groups`
+    groups are shown); the rest fold into one "N other ports" line, whose
+    worst-case size is reserved up front.
+    """
+    ranked = sorted(groups, key=lambda g: g[2] * threat_ports.get(g[0], 1), reverse=True)
+    reserve = estimate_tokens(_rollup_line(len(groups), normalized_total, threat_score_total)) + 1
+    remaining = budget - reserve
+    lines, shown, full = [], 0, False
+    for dst_port, proto, count, top_subnets in ranked[:max_groups]:
+        for i, line in enumerate(_group_lines(dst_port, proto, count, top_subnets, threat_ports)):
+            cost = estimate_tokens(line) + 1  # + the newline
+            if cost > remaining:
+                full = True
+                break
+            lines.append(line)
+            remaining -= cost
+            shown += i == 0
+        if full:
+            break
+
+    folded = ranked[shown:]
+    if folded and reserve <= budget:
+        lines.append(_rollup_line(len(folded), sum(g[2] for g in folded),
+                                  sum(g[2] * threat_ports.get(g[0], 1) for g in folded)))
+    return lines
+
+
+def _render(groups, normalized_total, raw, threat_score_total, threat_ports, max_groups=None, token_budget=None):
+    summary_stats = f"\nTotal normalized events: {normalized_total} (from {raw} raw)"
+    if threat_score_total > 0:
+        summary_stats += f"\nThreat score total: {threat_score_total}"
+
+    if token_budget is None:
+        # Port aggregates, biggest first
+        lines = [line for group in groups for line in _group_lines(*group, threat_ports)]
+    else:
+        lines = _pack(groups, normalized_total, threat_score_total, threat_ports, max_groups,
+                      token_budget - estimate_tokens(summary_stats))
+
+    condensed = '\n'.join(lines)
+    return condensed + summary_stats, lines, summary_stats
 
 
 def normalize_logs(
     parsed_logs,
     max_groups=30,
     exclude_ports={51413},  # default empty - include all ports
-    threat_ports=None
+    threat_ports=None,
+    token_budget=None
 ):
+    """
+    Condense parsed drops (dicts, DropEventBatch or a long window's DropSketch) into
+    per-port lines with the top 3 source /24s each, plus totals. Without `token_budget`
+    the `max_groups` biggest groups are listed; with one the output stays within that
+    many tokens (app.tokens.estimate_tokens), most threatening groups first, the rest
+    folded into an "N other ports" line (`max_groups=None` lets the budget alone decide).
+    """
     if threat_ports is None:
-        threat_ports = {
-            22: 5, 23: 5, 3389: 10, 445: 8, 1433: 8, 3306: 6
-        }
+        threat_ports = DEFAULT_THREAT_PORTS
 
     if not parsed_logs:
-        return "\nTotal normalized events: 0 (from 0 raw)\nThreat score total: 0"
-
-    # Primary grouping: port + proto (preserves volume)
-    port_groups = defaultdict(int)
-    # Subnet details per port
-    subnet_details = defaultdict(list)
-
-    threat_score_total = 0
-
-    for p in parsed_logs:
-        dst_port = p.get('dst_port')
-        if dst_port is None or dst_port in exclude_ports:
-            continue
-
-        proto = p.get('proto', 'UNKNOWN')
-        port_key = (dst_port, proto)
-        port_groups[port_key] += 1
-
-        subnet = '.'.join(p['src_ip'].split('.')[:3]) + '.0/24' if p.get('src_ip') else 'unknown'
-        subnet_details[port_key].append(subnet)
-
-        score = threat_ports.get(dst_port, 1)
-        threat_score_total += score
-
-    lines = []
-
-    # Port aggregates
-    sorted_ports = sorted(port_groups.items(), key=lambda x: x[1], reverse=True)
-    for (dst_port, proto), count in sorted_ports[:max_groups]:
-        threat_level = "HIGH" if dst_port in threat_ports and threat_ports[dst_port] >= 8 else \
-                       "MEDIUM" if dst_port in threat_ports else "LOW"
-        lines.append(f"{count} {proto} probes on DPT={dst_port} ({threat_level})")
-
-        # Top 3 subnets for this port
-        subnet_counts = Counter(subnet_details[(dst_port, proto)])  # ← FIXED: Use current (dst_port, proto) as key, not stale 'port_key'
-        for subnet, sub_count in subnet_counts.most_common(3):
-            lines.append(f"  └─ {sub_count} from {subnet}")
-
-    condensed = '\n'.join(lines)
-
-    summary_stats = f"\nTotal normalized events: {sum(port_groups.values())} (from {len(parsed_logs)} raw)"
-    if threat_score_total > 0:
-        summary_stats += f"\nThreat score total: {threat_score_total}"
-
-    print(f"[Normalizer] Condensed {len(parsed_logs)} logs → {len(lines)} lines")
+        return _EMPTY
+
+    if isinstance(parsed_logs, DropEventBatch):
+        # Vectorized grouping on the integer columns (same output as the dict loop)
+        groups, normalized_total = port_subnet_breakdown(parsed_logs, exclude_ports,
+                                                         max_groups if token_budget is None else None)
+        threat_score_total = threat_score(parsed_logs, threat_ports, exclude_ports)
+    elif isinstance(parsed_logs, DropSketch):
+        # Long windows: the same groups from fixed-memory heavy hitters (counts are upper bounds)
+        groups, normalized_total = parsed_logs.breakdown(exclude_ports,
+                                                         max_groups if token_budget is None else None)
+        threat_score_total = parsed_logs.threat_score(threat_ports, exclude_ports)
+    else:
+        normalizer = StreamingNormalizer(exclude_ports, threat_ports).update(parsed_logs)
+        groups, normalized_total, threat_score_total = (
+            normalizer.groups(max_groups if token_budget is None else None), normalizer.normalized_total,
+            normalizer.threat_score)
+
+    text, lines, summary_stats = _render(groups, normalized_total, len(parsed_logs), threat_score_total,
+                                         threat_ports, max_groups, token_budget)
+
+    print(f"[Normalizer] Condensed {len(parsed_logs)} logs → {len(lines)} lines"
+          + (f" (~{estimate_tokens(text)} of {token_budget} tokens)" if token_budget is not None else ""))
     print(summary_stats)
 
-    return condensed + summary_stats
\ No newline at end of file
+    return text
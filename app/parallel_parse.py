@@ -0,0 +1,152 @@
+# app/parallel_parse.py
+"""
+Multi-process parsing of large Graylog windows (100k+ messages).
+
+build_drop_batch is pure-Python matching per message, so a first full 24h window
+parses on one core. Here the raw logs are split into `chunk_size` chunks parsed
+by a ProcessPoolExecutor; each worker returns its chunk as a compact columnar
+DropEventBatch (~32 bytes per event instead of the message text). The parent
+concatenates the chunks in order, so the result is identical to the serial
+path. Stats are left to the caller: DropDataAccess computes them over the
+whole window after merging and eviction, not per delta.
+
+Below `serial_below` messages (or with workers <= 1) everything runs serially in
+the caller: shipping messages to another process costs more than it saves.
+Pools are created on first use per worker count and reused; they use the
+forkserver start method, so workers are not forked from a threaded server.
+multiprocessing is imported on first use (the dashboard imports this module at
+start-up).
+
+Run `python -m app.parallel_parse corpus.json --workers 1 2 4 8` (or
+`--synthetic 200000`, lines from benchmarks/generator.py) to measure the
+speedup on this machine.
+"""
+import os
+import threading
+
+from app.events import DropEventBatch
+from app.stats import compute_stats
+from app.utils import build_drop_batch
+
+SERIAL_BELOW = 50_000
+CHUNK_SIZE = 20_000
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def default_workers():
+    return min(4, os.cpu_count() or 1)
+
+
+def _pool(workers):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            if context.get_start_method() == 'forkserver':
+                # Workers fork from a server that already imported NumPy and the parser
+                context.set_forkserver_preload(['app.utils'])
+            pool = _pools[workers] = ProcessPoolExecutor(workers, mp_context=context)
+        return pool
+
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+def _parse_chunk(logs, engine, with_keys):
+    keys = [] if with_keys else None
+    return build_drop_batch(logs, engine, keys=keys), keys
+
+
+def _parse_chunks(logs, workers, engine, keys, chunk_size):
+    """[(batch, keys)] per chunk, in order; None if the pool is unusable."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    chunks = [logs[i:i + chunk_size] for i in range(0, len(logs), chunk_size)]
+    pool = _pool(workers)
+    try:
+        return list(pool.map(_parse_chunk, chunks, [engine] * len(chunks), [keys is not None] * len(chunks)))
+    except BrokenProcessPool as e:
+        print(f"Parse workers died ({e}); parsing serially")
+        with _pools_lock:
+            _pools.pop(workers, None)
+        return None
+
+
+def build_drop_batch_parallel(raw_logs, workers=None, engine='fast', keys=None,
+                              chunk_size=CHUNK_SIZE, serial_below=SERIAL_BELOW):
+    """build_drop_batch over `workers` processes (serial below `serial_below` messages)."""
+    logs = raw_logs if isinstance(raw_logs, list) else list(raw_logs)
+    workers = default_workers() if workers is None else workers
+    results = None
+    if workers > 1 and len(logs) >= serial_below:
+        results = _parse_chunks(logs, workers, engine, keys, chunk_size)
+    if results is None:
+        return build_drop_batch(logs, engine, keys=keys)
+
+    if keys is not None:
+        for _, chunk_keys in results:
+            keys.extend(chunk_keys)
+    return DropEventBatch.concat([chunk for chunk, _ in results])
+
+
+def parse_drop_batch_parallel(raw_logs, workers=None, engine='fast', keys=None,
+                              chunk_size=CHUNK_SIZE, serial_below=SERIAL_BELOW):
+    """parse_drop_batch over `workers` processes. Returns (batch, stats)."""
+    batch = build_drop_batch_parallel(raw_logs, workers, engine, keys, chunk_size, serial_below)
+    return batch, compute_stats(batch)
+
+
+def benchmark(logs, worker_counts=(1, 2, 4, 8), repeat=3, chunk_size=CHUNK_SIZE):
+    """Best-of-`repeat` seconds per worker count for build_drop_batch_parallel (pools warmed first)."""
+    import time
+
+    results = {}
+    for workers in worker_counts:
+        if workers > 1:
+            build_drop_batch_parallel(logs[:chunk_size * workers], workers, chunk_size=chunk_size, serial_below=0)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build_drop_batch_parallel(logs, workers, chunk_size=chunk_size, serial_below=0)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[workers] = best
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Serial vs process-pool parsing speedup")
+    parser.add_argument('corpus', nargs='?', help="JSON list of Graylog messages (see app.drop_parser --record)")
+    parser.add_argument('--synthetic', type=int, metavar='N', help="use N generated messages instead of a corpus")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            logs = json.load(f)
+    else:
+        from benchmarks.generator import generate_logs
+
+        logs = generate_logs(args.synthetic or 200_000)
+
+    timings = benchmark(logs, args.workers, args.repeat, args.chunk_size)
+    print(f"{len(logs)} messages, chunks of {args.chunk_size}, {os.cpu_count()} CPUs")
+    for workers, seconds in timings.items():
+        print(f"  {workers} worker(s): {seconds * 1000:8.0f} ms  {len(logs) / seconds:>12,.0f} msg/s  "
+              f"speedup {timings[args.workers[0]] / seconds:.2f}x")
+    shutdown_pools()
@@ -0,0 +1,130 @@
+# app/realtime_pool.py
+"""
+Warm pool of xAI realtime sessions for the voice server.
+
+Opening `wss://api.x.ai/v1/realtime` costs a TLS + WebSocket handshake plus the
+session.update round before a prompt can be sent. The pool keeps `size`
+sessions connected and already configured. acquire() hands one out at once
+(a session is single-use: it is closed after the briefing), and the
+maintenance task opens a replacement straight away.
+
+Health: every `health_interval` s idle sessions are pinged. Sessions that fail
+the ping, or that are older than `max_age` (the server expires them), are
+closed and replaced. With an empty pool acquire() falls back to a fresh
+connection, so the pool only ever saves time.
+
+asyncio and websockets are imported on use: the dashboard imports this module
+at start-up but only the voice server thread runs it.
+"""
+import json
+import time
+from collections import deque
+
+
+class RealtimeSessionPool:
+    def __init__(self, url, session, get_api_key, size=2, max_age=600, health_interval=20,
+                 ping_timeout=5, clock=time.monotonic):
+        self.url = url
+        self.session = session
+        self.get_api_key = get_api_key
+        self.size = size
+        self.max_age = max_age
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.clock = clock
+        self.stats = {'warm': 0, 'cold': 0, 'replaced': 0, 'connect_errors': 0}
+        self._idle = deque()        # (connection, opened_at), oldest first
+        self._task = None
+        self._wake = None
+
+    async def _open(self):
+        import websockets
+
+        ws = await websockets.connect(self.url, additional_headers={"Authorization": f"Bearer {self.get_api_key()}"})
+        await ws.send(json.dumps({"type": "session.update", "session": self.session}))
+        return ws
+
+    async def acquire(self):
+        """A connected session with session.update already sent; the caller closes it."""
+        while self._idle:
+            ws, opened_at = self._idle.popleft()
+            if self._wake is not None:
+                self._wake.set()  # refill
+            if self.clock() - opened_at < self.max_age:
+                self.stats['warm'] += 1
+                return ws
+            self.stats['replaced'] += 1
+            await _close(ws)
+        self.stats['cold'] += 1
+        return await self._open()
+
+    def start(self):
+        """Start filling and health-checking the pool (call from the server's event loop)."""
+        import asyncio
+
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._maintain())
+
+    async def _maintain(self):
+        import asyncio
+
+        while True:
+            await self.check()
+            await self._fill()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fill(self):
+        while len(self._idle) < self.size:
+            try:
+                ws = await self._open()
+            except Exception as e:
+                self.stats['connect_errors'] += 1
+                print(f"Realtime pool: connect failed ({e}); retrying in {self.health_interval}s")
+                return
+            self._idle.append((ws, self.clock()))
+
+    async def check(self):
+        """Drop idle sessions that are too old or do not answer a ping."""
+        import asyncio
+
+        for entry in list(self._idle):
+            ws, opened_at = entry
+            healthy = self.clock() - opened_at < self.max_age
+            if healthy:
+                try:
+                    pong = await ws.ping()
+                    await asyncio.wait_for(pong, self.ping_timeout)
+                except Exception:
+                    healthy = False
+            if not healthy and entry in self._idle:
+                self._idle.remove(entry)
+                self.stats['replaced'] += 1
+                await _close(ws)
+
+    def __len__(self):
+        return len(self._idle)
+
+    async def close(self):
+        import asyncio
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            await _close(self._idle.popleft()[0])
+
+
+async def _close(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
@@ -0,0 +1,210 @@
+# app/rollups.py
+"""
+Pre-aggregated drop counts per minute / hour / day ("rollup cubes").
+
+Each tier maps a local wall-clock bucket to the counts of every distinct
+(dst_port, proto, src /24, rule_id) seen in it, packed into one uint64 key:
+
+    bits 47..63  dst_port + 1 (0 = no port)
+    bits 39..46  proto id      (DropRollups vocabulary)
+    bits 24..38  rule_id id    (DropRollups vocabulary)
+    bits  0..23  src /24       (src_ip >> 8; all ones when SRC was not IPv4)
+
+Per bucket the keys are a sorted array with a parallel count array, so adding a
+delta is np.unique + a sorted merge, and a query touches only the buckets in
+range (31 for "30 days by day") instead of raw events. Buckets older than a
+tier's retention are dropped as newer ones arrive.
+"""
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.events import UNKNOWN_SUBNET, subnet24_to_str
+from app.timeline import utc_offsets_ms
+
+GROUP_FIELDS = {
+    # field: (shift, mask)
+    'dst_port': (47, 0x1FFFF),
+    'proto': (39, 0xFF),
+    'rule_id': (24, 0x7FFF),
+    'src24': (0, 0xFFFFFF),
+}
+
+# name: (bucket seconds, buckets kept, label format)
+TIERS = {
+    'minute': (60, 25 * 60, '%H:%M'),
+    'hour': (3600, 8 * 24 + 2, '%m-%d %H:%M'),
+    'day': (86400, 32, '%m-%d'),
+}
+
+_RANGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_range(text):
+    """'90m' / '24h' / '30d' / '3600' -> seconds; ValueError otherwise."""
+    match = re.fullmatch(r'(\d+)([smhd]?)', (text or '').strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid range {text!r}; use e.g. 90m, 24h, 30d")
+    return int(match.group(1)) * _RANGE_UNITS[match.group(2) or 's']
+
+
+class RollupCube:
+    """One tier: bucket id (local ms // bucket_ms) -> (sorted uint64 keys, int64 counts)."""
+
+    def __init__(self, bucket_seconds, retention):
+        self.bucket_ms = bucket_seconds * 1000
+        self.retention = retention
+        self.buckets = {}
+        self.head = None
+
+    def add(self, local_ms, keys):
+        bucket_ids = local_ms // self.bucket_ms
+        order = np.lexsort((keys, bucket_ids))
+        bucket_ids, keys = bucket_ids[order], keys[order]
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        head = int(bucket_ids[-1]) if self.head is None else max(self.head, int(bucket_ids[-1]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            bucket = int(bucket_ids[start])
+            if bucket <= head - self.retention:
+                continue
+            new_keys, new_counts = np.unique(keys[start:end], return_counts=True)
+            if bucket in self.buckets:
+                old_keys, old_counts = self.buckets[bucket]
+                merged = np.union1d(old_keys, new_keys)
+                counts = np.zeros(len(merged), dtype=np.int64)
+                counts[np.searchsorted(merged, old_keys)] += old_counts
+                counts[np.searchsorted(merged, new_keys)] += new_counts
+                self.buckets[bucket] = (merged, counts)
+            else:
+                self.buckets[bucket] = (new_keys, new_counts.astype(np.int64))
+        self.head = head
+        for bucket in [b for b in self.buckets if b <= head - self.retention]:
+            del self.buckets[bucket]
+
+
+class DropRollups:
+    """
+    The three tiers plus the proto / rule_id vocabularies. add(batch) is called with
+    each batch of events not seen before; timeline() answers range queries.
+    """
+
+    def __init__(self, tz=None, tiers=TIERS, vocab_limits=(0xFF, 0x7FFF)):
+        self.tz = tz
+        self.tiers = {name: RollupCube(seconds, retention) for name, (seconds, retention, _) in tiers.items()}
+        self.formats = {name: fmt for name, (_, _, fmt) in tiers.items()}
+        self.protos = {}    # name -> id
+        self.proto_limit, self.rule_limit = vocab_limits
+        self.rules = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ids(values, vocab, limit):
+        # Ids 0..limit-1 are named; once they are used up, new values share id `limit` ("other")
+        ids = []
+        for v in values:
+            i = vocab.get(v)
+            if i is None:
+                i = len(vocab)
+                if i < limit:
+                    vocab[v] = i
+                else:
+                    i = limit
+            ids.append(i)
+        return np.array(ids or [0], dtype=np.uint64)
+
+    def add(self, batch):
+        if not len(batch):
+            return
+        with self._lock:
+            local_ms = batch.timestamp + utc_offsets_ms(batch.timestamp, self.tz)
+            ports = np.where(batch.has_dst_port, batch.dst_port.astype(np.uint64) + np.uint64(1), np.uint64(0))
+            keys = ((ports << np.uint64(47))
+                    | (self._ids(batch.proto_values, self.protos, self.proto_limit)[batch.proto] << np.uint64(39))
+                    | (self._ids(batch.rule_id_values, self.rules, self.rule_limit)[batch.rule_id] << np.uint64(24))
+                    | (batch.src_subnet24.astype(np.uint64) >> np.uint64(8)))
+            for cube in self.tiers.values():
+                cube.add(local_ms, keys)
+
+    def pick_tier(self, range_seconds, bucket='auto'):
+        """The coarsest tier for `bucket` ('auto': by range) that still holds the whole range."""
+        if bucket == 'auto':
+            bucket = 'minute' if range_seconds <= 3 * 3600 else 'hour' if range_seconds <= 7 * 86400 else 'day'
+        if bucket not in self.tiers:
+            raise ValueError(f"Unknown bucket {bucket!r}; use one of auto, {', '.join(self.tiers)}")
+        cube = self.tiers[bucket]
+        if range_seconds * 1000 > (cube.retention - 1) * cube.bucket_ms:
+            raise ValueError(f"{bucket} buckets only cover the last {(cube.retention - 1) * cube.bucket_ms // 1000}s")
+        return bucket
+
+    def _label(self, field, value):
+        if field == 'dst_port':
+            return str(value - 1) if value else 'none'
+        if field == 'src24':
+            return subnet24_to_str(UNKNOWN_SUBNET if value == UNKNOWN_SUBNET >> 8 else value << 8)
+        vocab = self.protos if field == 'proto' else self.rules
+        return next((name for name, i in vocab.items() if i == value), f"other {field}")
+
+    def timeline(self, range_seconds, bucket='auto', group_by=None, top=5, now_ms=None):
+        """
+        {'bucket', 'labels', 'bucket_start_ms', 'total', 'series': [{'key', 'data'}, ...]} for the
+        last `range_seconds`, zero-filled. With group_by, the `top` groups by count
+        over the range get a series each and everything else is summed into 'other'.
+        """
+        if group_by is not None and group_by not in GROUP_FIELDS:
+            raise ValueError(f"Unknown group_by {group_by!r}; use one of {', '.join(GROUP_FIELDS)}")
+        if top < 1:
+            raise ValueError(f"top must be at least 1, got {top}")
+        bucket = self.pick_tier(range_seconds, bucket)
+        cube = self.tiers[bucket]
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        since_ms = now_ms - range_seconds * 1000
+        first, last = (int(ms + utc_offsets_ms([ms], self.tz)[0]) // cube.bucket_ms for ms in (since_ms, now_ms))
+        ids = list(range(first, last + 1))
+
+        with self._lock:
+            rows = [cube.buckets.get(b) for b in ids]
+        total = [int(row[1].sum()) if row is not None else 0 for row in rows]
+
+        series = []
+        if group_by is not None:
+            shift, mask = GROUP_FIELDS[group_by]
+            per_bucket = []
+            for row in rows:
+                if row is None:
+                    per_bucket.append((np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)))
+                    continue
+                values = (row[0] >> np.uint64(shift)) & np.uint64(mask)
+                groups, inverse = np.unique(values, return_inverse=True)
+                per_bucket.append((groups, np.bincount(inverse.reshape(-1), weights=row[1]).astype(np.int64)))
+            all_groups = np.concatenate([g for g, _ in per_bucket])
+            all_counts = np.concatenate([c for _, c in per_bucket])
+            if len(all_groups):
+                groups, inverse = np.unique(all_groups, return_inverse=True)
+                sums = np.bincount(inverse.reshape(-1), weights=all_counts)
+                chosen = groups[np.lexsort((groups, -sums))[:top]]
+            else:
+                chosen = np.zeros(0, dtype=np.uint64)
+            for value in chosen.tolist():
+                data = []
+                for groups, counts in per_bucket:
+                    pos = np.searchsorted(groups, value)
+                    data.append(int(counts[pos]) if pos < len(groups) and groups[pos] == value else 0)
+                series.append({'key': self._label(group_by, value), 'data': data})
+            other = [t - sum(s['data'][i] for s in series) for i, t in enumerate(total)]
+            if any(other):
+                series.append({'key': 'other', 'data': other})
+
+        fmt = self.formats[bucket]
+        return {
+            'range': range_seconds,
+            'bucket': bucket,
+            'group_by': group_by,
+            'bucket_start_ms': [b * cube.bucket_ms for b in ids],  # local wall-clock ms
+            'labels': [datetime.fromtimestamp(b * cube.bucket_ms / 1000, timezone.utc).strftime(fmt) for b in ids],
+            'total': total,
+            'series': series,
+        }
@@ -0,0 +1,240 @@
+# app/sketch.py
+"""
+Fixed-memory heavy-hitter sketches for long windows (7d/30d, millions of scanners).
+
+SpaceSaving(capacity)
+    Keeps at most `capacity` (key, count, error) counters. Counts over-estimate:
+    true <= count <= true + error, with error <= N / capacity (N = events seen),
+    and every key with true count > N / capacity is monitored.
+    from_error(epsilon) picks capacity = ceil(1 / epsilon).
+CountMinSketch(width, depth)
+    depth x width table of counters with multiply-shift hashes. Point estimates
+    over-estimate by at most epsilon * N with probability 1 - delta
+    (from_error(epsilon, delta): width = e / epsilon, depth = ln(1 / delta)).
+
+Both are mergeable: merge(other) gives the summary of the union of both streams
+with the same bounds, so per-hour / per-segment / per-worker sketches can be
+combined. Updates are vectorized: a batch is reduced with np.unique first.
+
+DropSketch bundles them for a DropEventBatch stream and answers the same
+questions as app.stats: top source /24s, top dst ports, the per-(port, proto)
+subnet breakdown and the threat score, so normalize_logs can condense a 7d/30d
+history from it. Ties are ordered by key, not first occurrence.
+"""
+import math
+import zlib
+
+import numpy as np
+
+from app.events import subnet24_to_str
+
+
+def _aggregate(values, counts=None):
+    values = np.asarray(values)
+    if counts is None:
+        return np.unique(values, return_counts=True)
+    keys, inverse = np.unique(values, return_inverse=True)
+    return keys, np.bincount(inverse.reshape(-1), weights=counts, minlength=len(keys)).astype(np.int64)
+
+
+class SpaceSaving:
+    def __init__(self, capacity=256, dtype=np.int64):
+        self.capacity = capacity
+        self.keys = np.zeros(0, dtype=dtype)    # sorted
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon, dtype=np.int64):
+        return cls(math.ceil(1 / epsilon), dtype)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def floor(self):
+        """Upper bound on the count of any key not monitored."""
+        return int(self.counts.min()) if len(self.keys) >= self.capacity else 0
+
+    def update(self, values, counts=None):
+        keys, counts = _aggregate(values, counts)
+        if len(keys):
+            self._combine(keys.astype(self.keys.dtype), counts, np.zeros(len(keys), dtype=np.int64), 0)
+            self.total += int(counts.sum())
+        return self
+
+    def merge(self, other):
+        if len(other):
+            self._combine(other.keys, other.counts, other.errors, other.floor)
+        self.total += other.total
+        return self
+
+    def _combine(self, keys, counts, errors, other_floor):
+        own_floor = self.floor
+        merged = np.union1d(self.keys, keys)
+        # A key missing from a full summary may still have up to its floor there
+        new_counts = np.full(len(merged), own_floor + other_floor, dtype=np.int64)
+        new_errors = new_counts.copy()
+        own = np.searchsorted(merged, self.keys)
+        new_counts[own] += self.counts - own_floor
+        new_errors[own] += self.errors - own_floor
+        theirs = np.searchsorted(merged, keys)
+        new_counts[theirs] += counts - other_floor
+        new_errors[theirs] += errors - other_floor
+
+        if len(merged) > self.capacity:
+            keep = np.sort(np.argpartition(-new_counts, self.capacity - 1)[:self.capacity])
+            merged, new_counts, new_errors = merged[keep], new_counts[keep], new_errors[keep]
+        self.keys, self.counts, self.errors = merged, new_counts, new_errors
+
+    def top(self, k=None, mask=None):
+        """(keys, counts) of the k largest counters (optionally only where mask), count desc, key asc."""
+        keys, counts = (self.keys, self.counts) if mask is None else (self.keys[mask], self.counts[mask])
+        order = np.lexsort((keys, -counts))
+        return keys[order[:k]], counts[order[:k]]
+
+    def estimate(self, values):
+        values = np.asarray(values, dtype=self.keys.dtype)
+        pos = np.minimum(np.searchsorted(self.keys, values), max(len(self.keys) - 1, 0))
+        hit = (self.keys[pos] == values) if len(self.keys) else np.zeros(len(values), dtype=bool)
+        return np.where(hit, self.counts[pos] if len(self.keys) else 0, self.floor)
+
+
+class CountMinSketch:
+    def __init__(self, width=2048, depth=5, seed=0):
+        self.bits = max(1, math.ceil(math.log2(width)))
+        self.width = 1 << self.bits
+        self.depth = depth
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+        self._b = rng.integers(0, 2 ** 63, depth, dtype=np.uint64)
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    def _cells(self, values):
+        values = np.asarray(values).astype(np.uint64)
+        return (self._a[:, None] * values[None, :] + self._b[:, None]) >> np.uint64(64 - self.bits)
+
+    def update(self, values, counts=None):
+        keys, counts = _aggregate(values, counts)
+        if not len(keys):
+            return self
+        for row, cells in enumerate(self._cells(keys)):
+            self.table[row] += np.bincount(cells.astype(np.int64), weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+        return self
+
+    def estimate(self, values):
+        cells = self._cells(values).astype(np.int64)
+        return self.table[np.arange(self.depth)[:, None], cells].min(axis=0)
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Count-Min sketches must share width, depth and seed to merge")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+def proto_id(name):
+    """Stable 16-bit id of a protocol name (same in every process, so sketches merge)."""
+    return zlib.crc32(name.encode('utf-8')) & 0xFFFF
+
+
+class DropSketch:
+    """
+    Top subnets / ports / per-port subnets of a drop stream in fixed memory.
+
+    Keys: source /24 (uint32), dst_port, group = port << 16 | proto_id, and
+    pair = group << 32 | /24. Pair counts are min(Space-Saving, Count-Min):
+    both over-estimate, so the smaller is the tighter bound.
+    """
+
+    def __init__(self, capacity=512, epsilon=0.001, delta=0.01):
+        self.subnets = SpaceSaving(capacity)
+        self.ports = SpaceSaving(capacity)
+        self.groups = SpaceSaving(capacity)
+        self.pairs = SpaceSaving(capacity * 4, dtype=np.uint64)
+        self.pair_counts = CountMinSketch.from_error(epsilon, delta)
+        self.proto_names = {}
+        self.events = 0
+
+    def __len__(self):
+        return self.events
+
+    def update(self, batch):
+        self.events += len(batch)
+        if not len(batch):
+            return self
+        self.subnets.update(batch.src_subnet24.astype(np.int64))
+
+        mask = batch.has_dst_port
+        ports = batch.dst_port[mask].astype(np.uint64)
+        self.ports.update(ports.astype(np.int64))
+        ids = np.array([proto_id(name) for name in batch.proto_values] or [0], dtype=np.uint64)
+        for name in batch.proto_values:
+            self._name(proto_id(name), name)
+        groups = (ports << np.uint64(16)) | ids[batch.proto[mask]]
+        self.groups.update(groups.astype(np.int64))
+        pairs = (groups << np.uint64(32)) | batch.src_subnet24[mask].astype(np.uint64)
+        self.pairs.update(pairs)
+        self.pair_counts.update(pairs)
+        return self
+
+    def _name(self, pid, name):
+        if self.proto_names.setdefault(pid, name) != name:
+            raise ValueError(f"Protocol id collision: {name!r} vs {self.proto_names[pid]!r}")
+
+    def merge(self, other):
+        for pid, name in other.proto_names.items():
+            self._name(pid, name)
+        self.subnets.merge(other.subnets)
+        self.ports.merge(other.ports)
+        self.groups.merge(other.groups)
+        self.pairs.merge(other.pairs)
+        self.pair_counts.merge(other.pair_counts)
+        self.events += other.events
+        return self
+
+    def stats(self, top_subnets=5, top_ports=10):
+        """Same shape as app.stats.compute_stats (counts are upper bounds)."""
+        subnets, subnet_counts = self.subnets.top(top_subnets)
+        ports, port_counts = self.ports.top(top_ports)
+        return {
+            'total_blocks': self.events,
+            'top_src_subnets': {subnet24_to_str(s): c for s, c in zip(subnets.tolist(), subnet_counts.tolist())},
+            'top_dst_ports': dict(zip(ports.tolist(), port_counts.tolist()))
+        }
+
+    def breakdown(self, exclude_ports=(), max_groups=None, per_group=3):
+        """Same shape as app.stats.port_subnet_breakdown: ([(port, proto, count, [(subnet, count)])], considered)."""
+        group_ports = self.groups.keys >> 16
+        mask = ~np.isin(group_ports, np.fromiter(exclude_ports, dtype=np.int64)) if exclude_ports else None
+        groups, group_counts = self.groups.top(max_groups, mask)
+
+        pair_groups = (self.pairs.keys >> np.uint64(32)).astype(np.int64)
+        pair_counts = np.minimum(self.pairs.counts, self.pair_counts.estimate(self.pairs.keys))
+        result = []
+        for group, count in zip(groups.tolist(), group_counts.tolist()):
+            in_group = pair_groups == group
+            keys, counts = self.pairs.keys[in_group], pair_counts[in_group]
+            order = np.lexsort((keys, -counts))[:per_group]
+            subnets = [(subnet24_to_str(int(k) & 0xFFFFFFFF), int(c)) for k, c in zip(keys[order], counts[order])]
+            result.append((group >> 16, self.proto_names.get(group & 0xFFFF, 'UNKNOWN'), count, subnets))
+
+        considered = self.ports.total
+        if exclude_ports:
+            considered -= int(self.ports.estimate(np.fromiter(exclude_ports, dtype=np.int64)).sum())
+        return result, max(considered, 0)
+
+    def threat_score(self, threat_ports, exclude_ports=()):
+        """Same as app.stats.threat_score, from the port counters (ports not monitored weigh 1)."""
+        ports, counts = self.ports.keys.tolist(), self.ports.counts.tolist()
+        score = sum(threat_ports.get(p, 1) * c for p, c in zip(ports, counts) if p not in exclude_ports)
+        return score + max(self.ports.total - sum(counts), 0)
@@ -0,0 +1,176 @@
+# app/snapshot.py
+"""
+Background dashboard snapshots.
+A refresher thread rebuilds the dashboard data on a schedule and publishes it as
+an immutable Snapshot, so `/` and `/api/dashboard` serve the latest one in O(1)
+instead of doing a Graylog round trip per page load.
+
+The version only moves when the data changes, so it doubles as the ETag of
+`/api/dashboard`, and the last few snapshots are kept to answer
+`?since=<version>` with a delta (payload_delta).
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+_TIMELINE = ('timeline_labels', 'timeline_data')
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published dashboard build. `data` is never mutated after publish."""
+    version: int
+    built_at: float                 # epoch seconds of the build that produced `data`
+    data: dict
+    stale_since: float = None       # epoch seconds of the first failed refresh since built_at
+    error: str = None               # last refresh error while stale
+
+    def payload(self):
+        """Dashboard dict for the template / JSON, plus snapshot metadata."""
+        return {
+            **self.data,
+            'version': self.version,
+            'built_at': _iso(self.built_at),
+            'stale_since': _iso(self.stale_since),
+        }
+
+    @property
+    def etag(self):
+        """Changes whenever payload() does (new data, or the stale flag)."""
+        return f"v{self.version}-stale" if self.stale_since else f"v{self.version}"
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch).astimezone().isoformat(timespec='seconds') if epoch else None
+
+
+def _timeline_delta(old_labels, old_data, new_labels, new_data):
+    """
+    {'drop': d, 'keep': k, 'labels': [...], 'data': [...]} such that the new timeline is
+    old[d:d + k] + the given tail (buckets that slid out, unchanged ones, new or
+    updated ones); None when the two timelines do not line up.
+    """
+    for drop in range(len(old_labels)):
+        overlap = min(len(old_labels) - drop, len(new_labels))
+        if old_labels[drop:drop + overlap] != new_labels[:overlap]:
+            continue
+        keep = 0
+        while keep < overlap and old_data[drop + keep] == new_data[keep]:
+            keep += 1
+        return {'drop': drop, 'keep': keep, 'labels': new_labels[keep:], 'data': new_data[keep:]}
+    return None
+
+
+def payload_delta(old, new):
+    """
+    What a client holding payload `old` needs to get to `new`:
+    {'changed': {field: value, ...}, 'timeline': {...}} (timeline only if it moved).
+    """
+    changed = {k: v for k, v in new.items() if k not in _TIMELINE and old.get(k) != v}
+    delta = {'changed': changed}
+    if old.get('timeline_labels') != new.get('timeline_labels') or old.get('timeline_data') != new.get('timeline_data'):
+        timeline = _timeline_delta(old.get('timeline_labels', []), old.get('timeline_data', []),
+                                   new.get('timeline_labels', []), new.get('timeline_data', []))
+        if timeline is None:
+            changed.update({k: new.get(k) for k in _TIMELINE})
+        else:
+            delta['timeline'] = timeline
+    return delta
+
+
+class SnapshotRefresher:
+    """
+    Rebuilds the dashboard every `interval` seconds on a daemon thread.
+
+    build_fn() returns the dashboard dict or raises. On failure the previous
+    snapshot stays published and is marked stale; if nothing was ever built,
+    fallback_fn(exc) provides the error view so pages still answer instantly.
+    """
+
+    def __init__(self, build_fn, interval=60, fallback_fn=None, history=16):
+        self.build_fn = build_fn
+        self.interval = interval
+        self.fallback_fn = fallback_fn
+        self.history = history
+        self._published = OrderedDict()   # version -> first snapshot of that version
+        self._snapshot = None
+        self._version = 0
+        self._first_build = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def latest(self):
+        """Most recent snapshot, or None before the first refresh finished."""
+        return self._snapshot
+
+    def wait_first(self, timeout=None):
+        """Block until the first refresh finished (or timeout); returns latest()."""
+        self._first_build.wait(timeout)
+        return self._snapshot
+
+    def refresh_once(self):
+        """Run one build and publish the result. Returns the published snapshot."""
+        try:
+            data = self.build_fn()
+        except Exception as e:
+            print(f"Snapshot refresh failed: {e}")
+            now = time.time()
+            current = self._snapshot
+            if current is not None and current.built_at:
+                # Keep serving the last good data, flagged as stale
+                snapshot = replace(current, stale_since=current.stale_since or now, error=str(e))
+            elif self.fallback_fn is not None:
+                # Nothing good built yet: publish the error view
+                self._version += 1
+                stale_since = (current.stale_since if current else None) or now
+                snapshot = Snapshot(self._version, 0, self.fallback_fn(e), stale_since=stale_since, error=str(e))
+            else:
+                snapshot = current
+        else:
+            current = self._snapshot
+            if current is not None and current.built_at and not current.stale_since and current.data == data:
+                snapshot = current  # nothing changed: same version, clients keep getting 304s
+            else:
+                self._version += 1
+                snapshot = Snapshot(self._version, time.time(), data)
+
+        if snapshot is not None and snapshot.version not in self._published:
+            # The first snapshot of a version is what clients saw with that version's ETag
+            self._published[snapshot.version] = snapshot
+            while len(self._published) > self.history:
+                self._published.popitem(last=False)
+        self._snapshot = snapshot  # single reference swap: readers never see a half-built snapshot
+        self._first_build.set()
+        return snapshot
+
+    def delta_since(self, version):
+        """
+        {'version', 'since', 'changed', ['timeline']} from snapshot `version` to the
+        latest, or None when that version is unknown (too old): send everything.
+        """
+        current = self._snapshot
+        base = self._published.get(version)
+        if current is None or base is None:
+            return None
+        return {'version': current.version, 'since': version,
+                **payload_delta(base.payload(), current.payload())}
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.refresh_once()
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,159 @@
+# app/sources.py
+"""
+Several Graylog servers / streams (one per UXG site) feeding one dashboard.
+
+GRAYLOG_SOURCES is a JSON list, inline or the path of a JSON file:
+
+    [{"label": "hq", "url": "https://graylog-hq:9000", "token_env": "GRAYLOG_HQ_TOKEN",
+      "stream_id": "65a1...", "query": "message:WAN_LOCAL-D"},
+     {"label": "lab", "url": "https://graylog-lab:9000", "token": "..."}]
+
+`token_env` names an environment variable holding the token (keeps secrets out
+of the file); `stream_id` and `query` are optional (default: all streams,
+DROP_QUERY). Without GRAYLOG_SOURCES the single GRAYLOG_URL setup is used.
+
+MultiSourceFetcher has the IncrementalDropFetcher interface (poll / cutoff /
+resume / window), so DropDataAccess takes it as its fetcher; `sites` lets a
+restart resume each source from its own newest stored event. Each source keeps
+its own incremental fetcher; poll() runs them in a bounded thread pool and tags
+every log with its source's label (the DropEventBatch site column). A source
+that has not answered within `shard_wait` seconds keeps fetching in the
+background and its events join a later poll, so one slow site only delays
+its own events.
+"""
+import heapq
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+from app.utils import DROP_QUERY, IncrementalDropFetcher
+
+
+@dataclass(frozen=True)
+class GraylogSource:
+    label: str
+    url: str
+    token: str = field(repr=False)
+    stream_id: str = None
+    query: str = DROP_QUERY
+
+
+def parse_sources(entries):
+    """GRAYLOG_SOURCES entries (dicts) -> [GraylogSource]; ValueError on bad config."""
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("GRAYLOG_SOURCES must be a non-empty JSON list")
+    sources = []
+    for i, entry in enumerate(entries):
+        label, url = entry.get('label'), entry.get('url')
+        if not label or not url:
+            raise ValueError(f"GRAYLOG_SOURCES[{i}] needs a label and a url")
+        token = entry.get('token') or os.getenv(entry.get('token_env') or '', '')
+        if not token:
+            raise ValueError(f"GRAYLOG_SOURCES[{i}] ({label}): no token (set token or token_env)")
+        sources.append(GraylogSource(label, url, token, entry.get('stream_id'), entry.get('query') or DROP_QUERY))
+    labels = [s.label for s in sources]
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"GRAYLOG_SOURCES labels must be unique: {labels}")
+    return sources
+
+
+def load_sources():
+    """Configured sources, or None for the single GRAYLOG_URL setup."""
+    load_dotenv()
+    spec = (os.getenv('GRAYLOG_SOURCES') or '').strip()
+    if not spec:
+        return None
+    if not spec.startswith('['):
+        with open(spec, encoding='utf-8') as f:
+            spec = f.read()
+    return parse_sources(json.loads(spec))
+
+
+def _newest_first_key(log):
+    return log.get('timestamp') or ''  # Graylog's UTC ISO timestamps sort as strings
+
+
+class MultiSourceFetcher:
+    def __init__(self, sources, range_seconds=86400, limit=2000, query=DROP_QUERY, paged=False,
+                 max_workers=4, shard_wait=10, fetcher_factory=IncrementalDropFetcher, keep_logs=False):
+        self.fetchers = {
+            # A query passed by the caller overrides the per-source ones
+            s.label: fetcher_factory(range_seconds=range_seconds, limit=limit, paged=paged, source=s,
+                                     query=s.query if query == DROP_QUERY else query, keep_logs=keep_logs)
+            for s in sources
+        }
+        self.shard_wait = shard_wait
+        self.lagging = set()        # labels still fetching after the last poll
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="graylog-source")
+        self._pending = {}          # label -> Future of that source's poll()
+        self._lock = threading.Lock()
+
+    @property
+    def cutoff(self):
+        # The oldest per-source cutoff: nothing a lagging source still holds is evicted
+        cutoffs = [f.cutoff for f in self.fetchers.values() if f.cutoff is not None]
+        return min(cutoffs) if cutoffs else None
+
+    def poll(self, now=None):
+        """New logs of every source that answered within shard_wait, tagged with 'site', newest first."""
+        with self._lock:
+            for label, fetcher in self.fetchers.items():
+                if label not in self._pending:
+                    self._pending[label] = self._pool.submit(fetcher.poll, now)
+            wait(list(self._pending.values()), timeout=self.shard_wait)
+
+            shards = []
+            for label, future in list(self._pending.items()):
+                if not future.done():
+                    continue
+                del self._pending[label]
+                try:
+                    logs = future.result()
+                except Exception as e:
+                    print(f"Source {label}: fetch failed: {e}")
+                    continue
+                for log in logs:
+                    log['site'] = label
+                shards.append(logs)
+
+            self.lagging = set(self._pending)
+            if self.lagging:
+                print(f"Sources still fetching: {', '.join(sorted(self.lagging))}; their events join a later poll")
+            return list(heapq.merge(*shards, key=_newest_first_key, reverse=True))
+
+    @property
+    def sites(self):
+        return list(self.fetchers)
+
+    def resume(self, cursor):
+        """`cursor`: epoch seconds for every source, or {label: epoch seconds} (sources left out start fresh)."""
+        cursors = cursor if isinstance(cursor, dict) else dict.fromkeys(self.fetchers, cursor)
+        for label, fetcher in self.fetchers.items():
+            if cursors.get(label) is not None:
+                fetcher.resume(cursors[label])
+
+    def window(self):
+        windows = []
+        for label, fetcher in self.fetchers.items():
+            logs = fetcher.window()
+            for log in logs:
+                log['site'] = label
+            windows.append(logs)
+        return list(heapq.merge(*windows, key=_newest_first_key, reverse=True))
+
+    def refresh(self, now=None):
+        self.poll(now)
+        return self.window()
+
+
+def drop_fetcher(**kwargs):
+    """DropDataAccess fetcher_factory: a MultiSourceFetcher when GRAYLOG_SOURCES is set."""
+    sources = load_sources()
+    if sources is None:
+        return IncrementalDropFetcher(**kwargs)
+    print(f"Fetching from {len(sources)} Graylog sources: {', '.join(s.label for s in sources)}")
+    return MultiSourceFetcher(sources, **kwargs)
@@ -0,0 +1,85 @@
+# app/startup_profile.py
+"""
+Cold-start profile of the dashboard server: `python -m app --startup-profile`.
+
+A fresh interpreter is started with `-X importtime`. It imports app.__main__ and
+serves one request through the Flask test client. The report shows:
+  - time to first response, measured from process spawn
+  - the part of it spent importing the app vs answering the request
+  - the slowest imports, top-level and one level down (cumulative ms)
+  - which known-heavy modules were already loaded before the first request
+"""
+import json
+import subprocess
+import sys
+import time
+
+# Should only load on first use (see app/__main__.py and app/utils.py)
+HEAVY_MODULES = ('pandas', 'requests', 'websockets', 'websocket', 'asyncio')
+
+_CHILD = """
+import json, sys, time
+started = time.time()
+import app.__main__ as server
+imported = time.time()
+loaded = [m for m in json.loads(sys.argv[2]) if m in sys.modules]
+response = server.app.test_client().get(sys.argv[1])
+print(json.dumps({'started': started, 'imported': imported, 'responded': time.time(),
+                  'status': response.status_code, 'loaded_at_import': loaded}))
+"""
+
+
+def parse_importtime(stderr, max_depth=1):
+    """
+    `-X importtime` output -> [(module, depth, cumulative_ms)], slowest first.
+    depth 0 is a top-level import (e.g. app.__main__), depth 1 what it imported directly.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth <= max_depth:
+            modules.append((name.strip(), depth, cumulative_us / 1000))
+    return sorted(modules, key=lambda item: item[2], reverse=True)
+
+
+def profile_startup(path='/api/dashboard', env=None):
+    """Run the cold start once; returns a dict of timings (ms) and the import breakdown."""
+    spawned = time.time()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD, path, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup profile run failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    return {
+        'path': path,
+        'status': result['status'],
+        'time_to_first_response_ms': (result['responded'] - spawned) * 1000,
+        'interpreter_start_ms': (result['started'] - spawned) * 1000,
+        'app_import_ms': (result['imported'] - result['started']) * 1000,
+        'first_request_ms': (result['responded'] - result['imported']) * 1000,
+        'heavy_modules_loaded_at_import': result['loaded_at_import'],
+        'imports': parse_importtime(proc.stderr),
+    }
+
+
+def print_report(profile, top=15):
+    print(f"Startup profile ({profile['path']} -> HTTP {profile['status']})")
+    print(f"  time to first response: {profile['time_to_first_response_ms']:8.1f} ms")
+    print(f"    interpreter start:    {profile['interpreter_start_ms']:8.1f} ms")
+    print(f"    import app.__main__:  {profile['app_import_ms']:8.1f} ms")
+    print(f"    first request:        {profile['first_request_ms']:8.1f} ms")
+    loaded = profile['heavy_modules_loaded_at_import']
+    print(f"  heavy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+    print("  slowest imports (cumulative; indented = imported by a top-level module):")
+    for name, depth, ms in profile['imports'][:top]:
+        print(f"    {ms:8.1f} ms  {'  ' * depth}{name}")
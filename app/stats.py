@@ -0,0 +1,109 @@
+# app/stats.py
+"""
+Vectorized statistics over a DropEventBatch.
+
+Everything works on the integer columns: /24 subnets are `src_ip & 0xFFFFFF00`,
+counting is np.unique, top-k is np.argpartition. Ordering reproduces
+Counter.most_common exactly: by count descending, ties by first occurrence,
+so the output matches the old dict-based stats and normalizer byte for byte.
+"""
+import numpy as np
+
+from app.events import subnet24_to_str
+
+
+def empty_stats():
+    return {'total_blocks': 0, 'top_src_subnets': {}, 'top_dst_ports': {}}
+
+
+def _most_common_order(counts, first_index, k=None):
+    """Indices ordering (counts desc, first_index asc), cut to k; like Counter.most_common(k)."""
+    if k is not None and len(counts) > k:
+        # argpartition finds the k-th largest count; keep every tie of it so the
+        # first-occurrence tie-break below still sees all candidates
+        kth = counts[np.argpartition(counts, len(counts) - k)[len(counts) - k]]
+        candidates = np.flatnonzero(counts >= kth)
+    else:
+        candidates = np.arange(len(counts))
+    order = candidates[np.lexsort((first_index[candidates], -counts[candidates]))]
+    return order if k is None else order[:k]
+
+
+def top_counts(values, k=None):
+    """(values, counts) of the k most common entries of a 1-D array, Counter.most_common order."""
+    if not len(values):
+        return values[:0], np.zeros(0, dtype=np.int64)
+    uniques, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+    order = _most_common_order(counts, first_index, k)
+    return uniques[order], counts[order]
+
+
+def compute_stats(batch, top_subnets=5, top_ports=10):
+    if not len(batch):
+        return empty_stats()
+
+    subnets, subnet_counts = top_counts(batch.src_subnet24, top_subnets)
+    ports, port_counts = top_counts(batch.dst_port[batch.has_dst_port], top_ports)
+
+    return {
+        'total_blocks': len(batch),
+        'top_src_subnets': {subnet24_to_str(s): c for s, c in zip(subnets.tolist(), subnet_counts.tolist())},
+        'top_dst_ports': dict(zip(ports.tolist(), port_counts.tolist()))
+    }
+
+
+def site_stats(batch, top_subnets=5, top_ports=10):
+    """compute_stats per site that has events: {site: stats}, busiest site first."""
+    codes, counts = np.unique(batch.site, return_counts=True)
+    return {batch.site_values[code]: compute_stats(batch[batch.site == code], top_subnets, top_ports)
+            for code in codes[np.argsort(-counts, kind='stable')].tolist()}
+
+
+def port_subnet_breakdown(batch, exclude_ports=(), max_groups=None, per_group=3):
+    """
+    Group events by (dst_port, proto) and return, for the biggest groups,
+    [(dst_port, proto, count, [(subnet_str, count), ...top per_group]), ...]
+    plus the number of events considered (dst_port present and not excluded).
+    Group and subnet order follow the normalizer's Counter semantics.
+    """
+    mask = batch.has_dst_port
+    if exclude_ports:
+        mask = mask & ~np.isin(batch.dst_port, np.fromiter(exclude_ports, dtype=np.int64))
+    ports = batch.dst_port[mask].astype(np.int64)
+    protos = batch.proto[mask].astype(np.int64)
+    subnets = batch.src_subnet24[mask].astype(np.int64)
+    if not len(ports):
+        return [], 0
+
+    # One int64 key per (port, proto), then per (group, subnet)
+    group_keys, group_first, group_of_event, group_counts = np.unique(
+        (ports << 32) | protos, return_index=True, return_inverse=True, return_counts=True)
+    top_groups = _most_common_order(group_counts, group_first, max_groups)
+
+    pair_keys, pair_first, pair_counts = np.unique(
+        (group_of_event.astype(np.int64) << 32) | subnets, return_index=True, return_counts=True)
+    pair_group = pair_keys >> 32
+    # Sort pairs by group, then count desc, then first occurrence; rank within group
+    order = np.lexsort((pair_first, -pair_counts, pair_group))
+    sorted_group = pair_group[order]
+    group_start = np.searchsorted(sorted_group, sorted_group, side='left')
+    keep = order[(np.arange(len(order)) - group_start) < per_group]
+
+    top_subnets = {}
+    for g, key, c in zip(pair_group[keep].tolist(), pair_keys[keep].tolist(), pair_counts[keep].tolist()):
+        top_subnets.setdefault(g, []).append((subnet24_to_str(key & 0xFFFFFFFF), c))
+
+    groups = []
+    for g in top_groups.tolist():
+        key = int(group_keys[g])
+        groups.append((key >> 32, batch.proto_values[key & 0xFFFFFFFF], int(group_counts[g]), top_subnets[g]))
+    return groups, len(ports)
+
+
+def threat_score(batch, threat_ports, exclude_ports=()):
+    """Sum of per-event port weights (threat_ports.get(port, 1)) over non-excluded events."""
+    mask = batch.has_dst_port
+    if exclude_ports:
+        mask = mask & ~np.isin(batch.dst_port, np.fromiter(exclude_ports, dtype=np.int64))
+    ports, counts = top_counts(batch.dst_port[mask])
+    return sum(threat_ports.get(p, 1) * c for p, c in zip(ports.tolist(), counts.tolist()))
@@ -0,0 +1,134 @@
+# app/timeline.py
+"""
+Incremental event timelines.
+A TimelineRing holds per-bucket counts for the most recent `size` buckets
+(e.g. 1440 minutes or 26 hours). Events are added as they are ingested, so
+building the dashboard timeline costs O(buckets) instead of a pandas
+groupby over every event in the window.
+
+Buckets are local wall-clock intervals: each timestamp is shifted by its own
+UTC offset (DST-aware) before flooring, like pandas' tz_convert + floor('h').
+"""
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.events import MISSING_TS
+
+_NO_BUCKET = np.iinfo(np.int64).min
+_OFFSET_STEP_MS = 15 * 60 * 1000  # UTC offsets only change on quarter-hour boundaries
+
+
+def utc_offsets_ms(epoch_ms, tz=None):
+    """UTC offset (ms) in effect at each epoch-ms timestamp; tz=None is the system timezone."""
+    steps, inverse = np.unique(np.asarray(epoch_ms, dtype=np.int64) // _OFFSET_STEP_MS, return_inverse=True)
+    offsets = []
+    for step in steps.tolist():
+        moment = datetime.fromtimestamp(step * _OFFSET_STEP_MS / 1000, tz)
+        offset = (moment if tz is not None else moment.astimezone()).utcoffset()
+        offsets.append(int(offset.total_seconds() * 1000))
+    return np.array(offsets, dtype=np.int64)[inverse.reshape(-1)]
+
+
+class TimelineRing:
+    """
+    Fixed-size ring of per-bucket event counts.
+    Slot i holds the absolute bucket number `buckets[i]` (local ms // bucket_ms)
+    and its count; a slot is reused once a bucket `size` newer arrives.
+    """
+
+    def __init__(self, bucket_seconds, size, tz=None):
+        self.bucket_ms = bucket_seconds * 1000
+        self.size = size
+        self.tz = tz
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.buckets = np.full(size, _NO_BUCKET, dtype=np.int64)
+        self.head = None            # newest bucket seen
+        self.max_local_ms = None    # newest event, local wall-clock ms
+        self._lock = threading.Lock()
+
+    def local_ms(self, epoch_ms):
+        epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+        return epoch_ms + utc_offsets_ms(epoch_ms, self.tz)
+
+    def add(self, epoch_ms):
+        """Count a batch of epoch-ms timestamps (MISSING_TS and too-old events are ignored)."""
+        epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+        epoch_ms = epoch_ms[epoch_ms != MISSING_TS]
+        if not len(epoch_ms):
+            return
+        local = self.local_ms(epoch_ms)
+        buckets, counts = np.unique(local // self.bucket_ms, return_counts=True)
+
+        with self._lock:
+            head = int(buckets[-1]) if self.head is None else max(self.head, int(buckets[-1]))
+            keep = buckets > head - self.size
+            buckets, counts = buckets[keep], counts[keep]
+            slots = buckets % self.size
+            stale = self.buckets[slots] != buckets
+            self.counts[slots[stale]] = 0
+            self.buckets[slots] = buckets
+            self.counts[slots] += counts
+            self.head = head
+            newest = int(local.max())
+            self.max_local_ms = newest if self.max_local_ms is None else max(self.max_local_ms, newest)
+
+    def remove(self, epoch_ms):
+        """Uncount timestamps added earlier (events evicted from the window)."""
+        epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+        epoch_ms = epoch_ms[epoch_ms != MISSING_TS]
+        if not len(epoch_ms):
+            return
+        buckets, counts = np.unique(self.local_ms(epoch_ms) // self.bucket_ms, return_counts=True)
+
+        with self._lock:
+            slots = buckets % self.size
+            held = self.buckets[slots] == buckets  # buckets already rotated out need nothing
+            np.subtract.at(self.counts, slots[held], counts[held])
+
+    def series(self, since_ms=None):
+        """
+        (bucket_starts, counts) from the first non-empty bucket (at or after the
+        bucket holding `since_ms`) through the ceiling of the newest event, the
+        same span as pandas' date_range(min.floor(), max.ceil()).
+        bucket_starts are local wall-clock ms.
+        """
+        with self._lock:
+            if self.head is None:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            first = self.head - self.size + 1
+            if since_ms is not None:
+                first = max(first, int(self.local_ms([since_ms])[0]) // self.bucket_ms)
+            # A newest event exactly on a boundary ends the span there; otherwise one bucket later
+            last = self.head + (self.max_local_ms % self.bucket_ms != 0)
+            ids = np.arange(first, last + 1, dtype=np.int64)
+            slots = ids % self.size
+            counts = np.where(self.buckets[slots] == ids, self.counts[slots], 0)
+
+        nonzero = np.flatnonzero(counts)
+        if not len(nonzero):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        ids, counts = ids[nonzero[0]:], counts[nonzero[0]:]
+        return ids * self.bucket_ms, counts
+
+    def labels(self, since_ms=None, fmt='%H:%M'):
+        """([strftime(fmt) of each local bucket start, ...], [count, ...]) for the dashboard chart."""
+        starts, counts = self.series(since_ms)
+        return [datetime.fromtimestamp(s / 1000, timezone.utc).strftime(fmt) for s in starts.tolist()], counts.tolist()
+
+
+def timeline_labels(epoch_ms, bucket_seconds=3600, since_ms=None, tz=None, fmt='%H:%M'):
+    """One-off timeline over a column of timestamps (e.g. a 7d history query)."""
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    epoch_ms = epoch_ms[epoch_ms != MISSING_TS]
+    if not len(epoch_ms):
+        return [], []
+    if since_ms is not None:
+        epoch_ms = epoch_ms[epoch_ms >= since_ms]  # the first bucket only counts events in range
+        if not len(epoch_ms):
+            return [], []
+    first = since_ms if since_ms is not None else int(epoch_ms.min())
+    ring = TimelineRing(bucket_seconds, (int(epoch_ms.max()) - first) // (bucket_seconds * 1000) + 3, tz)
+    ring.add(epoch_ms)
+    return ring.labels(since_ms, fmt)
@@ -1,28 +1,61 @@
 # utils.py (final, with prompt extracted to ai_prompts.py + other polishes)
 import os
 import base64
-import requests
+import hashlib
 import json
-import re
-from collections import Counter
+import math
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from app.normalizer import normalize_logs
-from app.ai_prompt import get_summary_prompt  # New import for extracted prompt
-from datetime import datetime
+from app.drop_parser import ENGINES
+from app.events import DEFAULT_SITE, DropEventBatch, DropEventBatchBuilder, subnet24_label
+from app.stats import compute_stats
+from app.sketch import DropSketch
+from app.ai_prompt import SUMMARY_PROMPT_VERSION, get_summary_prompt  # New import for extracted prompt
+from app.cache import SingleFlight, TTLCache
+from app.log_writer import BufferedJsonLog
+from app.metrics import AI_COST, AI_TOKENS, stage
+from app.tokens import estimate_tokens
+from datetime import datetime, timezone
 
 
-def fetch_firewall_drops(range_seconds=86400, limit=1000):
+def __getattr__(name):
+    # requests is imported on first use (it is a good share of start-up time);
+    # app.utils.requests still resolves, e.g. for mock.patch
+    if name == 'requests':
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Graylog query matching UXG "WAN to Gateway" drops
+DROP_QUERY = 'message:WAN_LOCAL-D OR message:"Log WAN to Gateway Drops"'
+
+
+def _graylog_get(endpoint, params, source=None):
     """
-    Fetch recent firewall drop logs from Graylog.
-    Returns list of dicts: [{'timestamp': str, 'source': str, 'message': str}, ...]
+    GET one Graylog search endpoint and return (normalized messages, total_results).
+    `source` (app.sources.GraylogSource) picks the server, token and stream;
+    without one GRAYLOG_URL / GRAYLOG_API_TOKEN are used.
+    Raises on missing config or request errors (callers decide how to degrade).
     """
-    load_dotenv()
-    graylog_url = os.getenv('GRAYLOG_URL')
-    graylog_token = os.getenv('GRAYLOG_API_TOKEN')
+    import requests
+
+    if source is not None:
+        graylog_url, graylog_token = source.url, source.token
+        if not graylog_url or not graylog_token:
+            raise RuntimeError(f"Missing url or token for Graylog source {source.label!r}")
+        if source.stream_id:
+            params = {**params, "filter": f"streams:{source.stream_id}"}
+    else:
+        load_dotenv()
+        graylog_url = os.getenv('GRAYLOG_URL')
+        graylog_token = os.getenv('GRAYLOG_API_TOKEN')
 
-    if not graylog_url or not graylog_token:
-        print("Error: Missing GRAYLOG_URL or GRAYLOG_API_TOKEN in .env")
-        return []
+        if not graylog_url or not graylog_token:
+            raise RuntimeError("Missing GRAYLOG_URL or GRAYLOG_API_TOKEN in .env")
 
     auth_str = f"{graylog_token}:token"
     b64_auth = base64.b64encode(auth_str.encode('utf-8')).decode('utf-8')
@@ -32,36 +65,135 @@ def fetch_firewall_drops(range_seconds=86400, limit=1000):
         "Accept": "application/json"
     }
 
+    url = f"{graylog_url.rstrip('/')}/api/search/universal/{endpoint}"
+
+    with stage('fetch'):
+        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response.raise_for_status()
+
+    with stage('json_decode'):
+        data = response.json()
+    messages = data.get('messages', [])
+
+    normalized = []
+    for item in messages:
+        # Real Graylog: item = {'message': {actual fields}}
+        # Mock/simple: item = {actual fields}
+        msg = item.get('message', item)  # fallback to item itself if no nested 'message'
+        normalized.append({
+            'id': msg.get('_id') or msg.get('id'),
+            'timestamp': msg.get('timestamp'),
+            'source': msg.get('source'),
+            'message': msg.get('message')   # real nested message text
+        })
+    return normalized, data.get('total_results', len(normalized))
+
+
+def _graylog_search(range_seconds, limit, query=DROP_QUERY, source=None):
+    """Run one relative search against Graylog and return the normalized messages."""
     params = {
-        "query": 'message:WAN_LOCAL-D OR message:"Log WAN to Gateway Drops"',
+        "query": query,
         "range": range_seconds,
         "limit": limit,
         "sort": "timestamp:desc"
     }
+    normalized, _ = _graylog_get("relative", params, source)
+    return normalized
 
-    url = f"{graylog_url.rstrip('/')}/api/search/universal/relative"
 
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        response.raise_for_status()
+def _graylog_time(epoch):
+    """Epoch seconds -> Graylog absolute-range timestamp ('2026-01-22T21:44:47.000Z')."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
 
-        data = response.json()
-        messages = data.get('messages', [])
-
-        normalized = []
-        for item in messages:
-            # Real Graylog: item = {'message': {actual fields}}
-            # Mock/simple: item = {actual fields}
-            msg = item.get('message', item)  # fallback to item itself if no nested 'message'
-            normalized.append({
-                'timestamp': msg.get('timestamp'),
-                'source': msg.get('source'),
-                'message': msg.get('message')   # real nested message text
-            })
 
+# Elasticsearch/OpenSearch refuse offset + limit beyond this (index.max_result_window)
+MAX_RESULT_WINDOW = 10000
+
+
+def _fetch_slice_pages(start, end, page_size, query, source=None):
+    """
+    Fetch every message in [start, end) with offset paging; returns a list of pages.
+    A slice holding more than MAX_RESULT_WINDOW messages is split in half.
+    """
+    pages = []
+    offset = 0
+    while True:
+        params = {
+            "query": query,
+            "from": _graylog_time(start),
+            "to": _graylog_time(end - 0.001),  # 'to' is inclusive in Graylog
+            "limit": page_size,
+            "offset": offset,
+            "sort": "timestamp:desc"
+        }
+        page, total = _graylog_get("absolute", params, source)
+
+        if offset == 0 and total > MAX_RESULT_WINDOW and end - start > 1:
+            mid = start + (end - start) / 2
+            return (_fetch_slice_pages(mid, end, page_size, query, source) +
+                    _fetch_slice_pages(start, mid, page_size, query, source))
+
+        if page:
+            pages.append(page)
+        offset += len(page)
+        if len(page) < page_size or offset >= total or offset + page_size > MAX_RESULT_WINDOW:
+            return pages
+
+
+def iter_firewall_drop_pages(range_seconds=86400, slice_seconds=3600, page_size=1000,
+                             max_workers=4, query=DROP_QUERY, now=None, source=None):
+    """
+    Paged, parallel fetch of the whole range (no `limit` cap).
+    Splits the range into time slices fetched concurrently by a bounded thread pool
+    and yields pages (lists of normalized messages), newest first. At most
+    `max_workers` slices are in flight, so memory stays bounded by a few pages.
+    Raises on Graylog errors, like _graylog_search.
+    """
+    now = now if now is not None else datetime.now(timezone.utc).timestamp()
+    start = now - range_seconds
+    slices = []
+    end = now
+    while end > start:
+        slices.append((max(start, end - slice_seconds), end))
+        end -= slice_seconds
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = deque()
+        slices = iter(slices)
+        for _ in range(max_workers):
+            s = next(slices, None)
+            if s is not None:
+                in_flight.append(pool.submit(_fetch_slice_pages, *s, page_size, query, source))
+        while in_flight:
+            pages = in_flight.popleft().result()
+            s = next(slices, None)
+            if s is not None:
+                in_flight.append(pool.submit(_fetch_slice_pages, *s, page_size, query, source))
+            yield from pages
+
+
+def iter_firewall_drops(range_seconds=86400, **kwargs):
+    """Flattened iter_firewall_drop_pages: yields one normalized message at a time."""
+    for page in iter_firewall_drop_pages(range_seconds, **kwargs):
+        yield from page
+
+
+def fetch_firewall_drops(range_seconds=86400, limit=1000, query=DROP_QUERY, source=None):
+    """
+    Fetch recent firewall drop logs from Graylog.
+    Returns list of dicts: [{'id': str, 'timestamp': str, 'source': str, 'message': str}, ...]
+    """
+    import requests
+
+    try:
+        normalized = _graylog_search(range_seconds, limit, query, source)
         print(f"Fetched {len(normalized)} firewall drop logs")
         return normalized
 
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return []
+
     except requests.exceptions.HTTPError as e:
         print(f"Graylog HTTP error: {e.response.status_code} - {e.response.text[:500]}")
         return []
@@ -72,59 +204,179 @@ def fetch_firewall_drops(range_seconds=86400, limit=1000):
         print(f"Unexpected error: {e}")
         return []
 
-def parse_firewall_drops(raw_logs):
+def _log_epoch(log):
+    """Graylog ISO timestamp ('2026-01-22T21:44:47.000Z') -> epoch seconds, or None."""
+    ts = log.get('timestamp')
+    if not ts:
+        return None
+    try:
+        dt = datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class IncrementalDropFetcher:
+    """
+    Incremental Graylog ingestion with a high-water-mark cursor.
+
+    The first refresh() pulls the whole window. Later calls only ask Graylog for
+    the seconds since the newest message seen (plus a small overlap for indexing
+    lag), drop messages already held (by Graylog message id) and evict events
+    that have aged out of the rolling window.
+
+    Only (epoch, id) per event is kept for dedupe and eviction: callers parse
+    what poll() returns (DropDataAccess holds the window columnar). With
+    keep_logs=True the raw dicts are kept too, for window() / refresh().
+    """
+
+    def __init__(self, range_seconds=86400, limit=2000, query=DROP_QUERY, overlap_seconds=60,
+                 paged=False, max_workers=4, source=None, keep_logs=False):
+        self.range_seconds = range_seconds
+        self.limit = limit              # per-request cap (page size when paged)
+        self.query = query
+        self.source = source            # GraylogSource, or None for GRAYLOG_URL
+        self.overlap_seconds = overlap_seconds
+        self.paged = paged              # use iter_firewall_drops: no cap on the window
+        self.max_workers = max_workers
+        self.cursor = None          # epoch seconds of the newest message seen
+        self.cutoff = None          # epoch seconds; events older than this were evicted
+        self._events = deque()      # (epoch, key), oldest first
+        self._keys = set()          # dedupe keys of everything in the window
+        self._logs = {} if keep_logs else None  # key -> raw log, for window()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(log):
+        return log.get('id') or (log.get('timestamp'), log.get('message'))
+
+    def poll(self, now=None):
+        """
+        Pull new messages into the window and return only those, newest first.
+        Afterwards `cutoff` is the epoch second below which events were evicted.
+        Graylog errors keep the old window (and return []).
+        """
+        import requests
+
+        with self._lock:
+            now = now if now is not None else datetime.now(timezone.utc).timestamp()
+
+            if self.cursor is None:
+                range_seconds = self.range_seconds
+            else:
+                since = max(0, now - self.cursor)
+                range_seconds = min(self.range_seconds, math.ceil(since) + self.overlap_seconds)
+
+            try:
+                if self.paged:
+                    fetched = list(iter_firewall_drops(range_seconds, page_size=self.limit,
+                                                       max_workers=self.max_workers,
+                                                       query=self.query, now=now, source=self.source))
+                else:
+                    fetched = _graylog_search(range_seconds, self.limit, self.query, self.source)
+            except (RuntimeError, requests.exceptions.RequestException) as e:
+                print(f"Incremental fetch failed, keeping previous window: {e}")
+                fetched = []
+
+            if not self.paged and self.cursor is not None and len(fetched) >= self.limit:
+                print(f"Warning: incremental fetch hit limit={self.limit}; older part of the delta was truncated")
+
+            new_events = []
+            for log in fetched:
+                key = self._key(log)
+                epoch = _log_epoch(log)
+                if key in self._keys or epoch is None:
+                    continue
+                self._keys.add(key)
+                if self._logs is not None:
+                    self._logs[key] = log
+                new_events.append((epoch, key, log))
+
+            if new_events:
+                new_events.sort(key=lambda e: e[0])
+                held = [(epoch, key) for epoch, key, _ in new_events]
+                if self._events and held[0][0] < self._events[-1][0]:
+                    # Late arrivals inside the overlap: keep the window ordered
+                    self._events = deque(sorted([*self._events, *held], key=lambda e: e[0]))
+                else:
+                    self._events.extend(held)
+                self.cursor = self._events[-1][0]
+
+            self.cutoff = now - self.range_seconds
+            while self._events and self._events[0][0] < self.cutoff:
+                _, key = self._events.popleft()
+                self._keys.discard(key)
+                if self._logs is not None:
+                    del self._logs[key]
+
+            print(f"Incremental fetch: {len(new_events)} new, {len(self._events)} in window")
+            return [log for epoch, _, log in reversed(new_events) if epoch >= self.cutoff]
+
+    def resume(self, cursor):
+        """
+        Continue from `cursor` (epoch seconds, e.g. the newest event kept on disk):
+        the next poll() only asks Graylog for what came after it.
+        """
+        with self._lock:
+            if self.cursor is None or cursor > self.cursor:
+                self.cursor = cursor
+
+    def window(self):
+        """Current window, newest first (same shape as fetch_firewall_drops). Needs keep_logs=True."""
+        if self._logs is None:
+            raise RuntimeError("IncrementalDropFetcher(keep_logs=False) keeps no raw logs")
+        with self._lock:
+            return [self._logs[key] for _, key in reversed(self._events)]
+
+    def refresh(self, now=None):
+        """poll() and return the whole window."""
+        self.poll(now)
+        return self.window()
+
+
+def parse_firewall_drops(raw_logs, engine='fast'):
     """
     Parse raw Graylog messages into structured drop events + stats.
+    raw_logs may be any iterable (e.g. iter_firewall_drops), it is consumed once.
+    engine: 'fast' (tag-anchored single pass, default) or 'regex' (original pattern);
+    both produce identical events, see app/drop_parser.py.
     Returns (parsed_list, stats_dict)
     """
+    match = ENGINES[engine]
     parsed = []
-
-    # Extremely permissive pattern: match the core signature + loose field capture
-    pattern = re.compile(
-        r'\[WAN_LOCAL-D-(?P<rule_id>\d+)\].*?'
-        r'DESCR="(?P<descr>[^"]+)"\s*'
-        r'IN=\S*\s*OUT=\S*\s*'
-        r'(?:MAC=[^ ]+\s*)?'  # optional MAC
-        r'(?:.*?)'            # skip any junk
-        r'SRC=(?P<src_ip>[^ ]+)\s*'
-        r'DST=(?P<dst_ip>[^ ]+)\s*'
-        r'(?:LEN=\d+\s+TOS=\S+\s+PREC=\S+\s+TTL=\d+\s+ID=\d+\s+DF\s+)?'  # optional fixed block
-        r'(?:PROTO=(?P<proto>\S+)\s*)?'
-        r'(?:SPT=(?P<src_port>\d+)\s*)?'
-        r'(?:DPT=(?P<dst_port>\d+)\s*)?'
-    )
+    first_log = None
 
     for log in raw_logs:
-        message = log.get('message', '')
-        match = pattern.search(message)
-        if match and match.group('src_ip') and match.group('dst_ip'):
+        if first_log is None:
+            first_log = log
+        message = log.get('message') or ''
+        fields = match(message)
+        if fields:
+            rule_id, descr, src_ip, dst_ip, proto, src_port, dst_port = fields
             parsed.append({
                 'timestamp': log.get('timestamp'),
-                'rule_id': match.group('rule_id'),
-                'descr': match.group('descr'),
-                'src_ip': match.group('src_ip'),
-                'dst_ip': match.group('dst_ip'),
-                'proto': match.group('proto') or 'UNKNOWN',
-                'src_port': int(match.group('src_port')) if match.group('src_port') else None,
-                'dst_port': int(match.group('dst_port')) if match.group('dst_port') else None,
+                'rule_id': rule_id,
+                'descr': descr,
+                'src_ip': src_ip,
+                'dst_ip': dst_ip,
+                'proto': proto or 'UNKNOWN',
+                'src_port': src_port,
+                'dst_port': dst_port,
                 'raw_message': message
             })
 
     if not parsed:
         print("No logs matched the regex pattern. Sample message:")
-        if raw_logs:
-            print(raw_logs[0].get('message', 'No message field'))
+        if first_log is not None:
+            print(first_log.get('message', 'No message field'))
         return [], {'total_blocks': 0, 'top_src_subnets': {}, 'top_dst_ports': {}}
 
     # Stats
     total_blocks = len(parsed)
 
-    src_subnets = Counter()
-    for p in parsed:
-        ip = p['src_ip']
-        if ip:
-            subnet = '.'.join(ip.split('.')[:3]) + '.0/24'
-            src_subnets[subnet] += 1
+    src_subnets = Counter(subnet24_label(p['src_ip']) for p in parsed)
 
     dst_ports = Counter(p['dst_port'] for p in parsed if p['dst_port'] is not None)
 
@@ -136,65 +388,74 @@ def parse_firewall_drops(raw_logs):
 
     return parsed, stats
 
-def log_tokens(input_tokens, output_tokens, cost_est):
-    """Log AI token usage to console and file."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"{timestamp} | Input: {input_tokens} | Output: {output_tokens} | Est cost: ${cost_est:.6f}\n"
-    
-    # Console
-    print(f"AI tokens logged: {line.strip()}")
-    
-    # File (append mode)
-    try:
-        with open("ai_token_log.txt", "a") as f:
-            f.write(line)
-    except Exception as e:
-        print(f"Warning: Could not write to ai_token_log.txt: {e}")
-
-
-def generate_ai_summary(parsed_logs, use_normalizer=True, log_to_file=True, max_logs=100):
+def build_drop_batch(raw_logs, engine='fast', keys=None):
     """
-    Generate AI summary from parsed logs (with optional normalizer).
-    Returns {'summary': str, 'input_tokens': int, 'output_tokens': int, 'cost_est': float}
+    Columnar variant of parse_firewall_drops: same matching, but events go straight
+    into a DropEventBatch (no per-event dicts, no raw_message copies).
+    Logs tagged with a 'site' (MultiSourceFetcher) keep it in the site column.
+    If `keys` is a list, the Graylog id of every matched log is appended to it
+    (row-aligned with the batch; ids of tagged logs are prefixed with the site).
     """
-    if not parsed_logs:
-        print("No parsed logs; returning default summary.")
-        return {'summary': 'No recent threats.', 'input_tokens': 0, 'output_tokens': 0, 'cost_est': 0.0}
+    match = ENGINES[engine]
+    builder = DropEventBatchBuilder()
 
-    load_dotenv()
-    grok_api_key = os.getenv('GROK_API_KEY')
+    for log in raw_logs:
+        message = log.get('message') or ''
+        fields = match(message)
+        if fields:
+            rule_id, descr, src_ip, dst_ip, proto, src_port, dst_port = fields
+            site = log.get('site')
+            builder.append(log.get('timestamp'), rule_id, descr, src_ip, dst_ip,
+                           proto or 'UNKNOWN', src_port, dst_port, len(message), site or DEFAULT_SITE)
+            if keys is not None:
+                key = IncrementalDropFetcher._key(log)
+                keys.append(key if site is None else (site, key))
 
-    if not grok_api_key:
-        print("Error: Missing GROK_API_KEY in .env")
-        return {'summary': '', 'input_tokens': 0, 'output_tokens': 0, 'cost_est': 0.0}
+    return builder.build()
 
-    if use_normalizer:
-        batch_text = normalize_logs(parsed_logs)
-        approx_tokens_before = sum(len(p['raw_message']) for p in parsed_logs) // 4  # rough char-to-token
-        approx_tokens_after = len(batch_text) // 4
-        print(f"[Token Opt] Before norm: ~{approx_tokens_before} tokens; After: ~{approx_tokens_after} ({(approx_tokens_after / approx_tokens_before * 100) if approx_tokens_before else 0:.1f}% of original)")
-    else:
-        batch = [p['raw_message'] for p in parsed_logs[:max_logs]]
-        batch_text = '\n'.join(batch)
 
-    prompt = get_summary_prompt(batch_text)  # Extracted to ai_prompts.py
+def parse_drop_batch(raw_logs, engine='fast'):
+    """build_drop_batch plus stats. Returns (batch, stats_dict)"""
+    batch = build_drop_batch(raw_logs, engine)
+    return batch, compute_stats(batch)
 
-    url = "https://api.x.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {grok_api_key}",
-        "Content-Type": "application/json"
-    }
+# Token usage, one JSON object per AI call, written by a background thread
+token_log = BufferedJsonLog("ai_token_log.jsonl")
+
+
+def log_tokens(input_tokens, output_tokens, cost_est, note=None):
+    """Log AI token usage to console and (buffered) file."""
+    print(f"AI tokens logged: Input: {input_tokens} | Output: {output_tokens} | Est cost: ${cost_est:.6f}"
+          + (f" | {note}" if note else ""))
+    fields = {'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost_est': cost_est}
+    if note:
+        fields['note'] = note
+    token_log.log('ai_tokens', **fields)
 
-    data = {
-        "model": "grok-4-1-fast-reasoning",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.7,
-        "max_tokens": 300
-    }
+
+# Content-addressed summary cache: identical normalized data + prompt version + request
+# parameters give the same key, so repeated clicks / several tabs cost one Grok call.
+summary_cache = TTLCache(ttl=3600, max_entries=128)
+_summary_flight = SingleFlight()
+
+# Prompt tokens per summary (template + data), overridable with SUMMARY_TOKEN_BUDGET
+SUMMARY_TOKEN_BUDGET = 1500
+
+
+def summary_cache_key(request_body):
+    """sha256 over the prompt version and the exact chat-completions request body."""
+    payload = json.dumps(request_body, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"v{SUMMARY_PROMPT_VERSION}\n{payload}".encode('utf-8')).hexdigest()
+
+
+def _request_summary(url, headers, data, use_normalizer, log_to_file):
+    """POST one chat completion. Returns the generate_ai_summary result dict."""
+    import requests
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
+        with stage('ai_call'):
+            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response.raise_for_status()
 
         result = response.json()
         summary = result['choices'][0]['message']['content'].strip()
@@ -203,6 +464,9 @@ def generate_ai_summary(parsed_logs, use_normalizer=True, log_to_file=True, max_
         output_tokens = usage.get('completion_tokens', 0)
 
         cost_est = (input_tokens / 1_000_000 * 0.20) + (output_tokens / 1_000_000 * 0.50)
+        AI_TOKENS.inc(input_tokens, kind='input')
+        AI_TOKENS.inc(output_tokens, kind='output')
+        AI_COST.inc(cost_est)
 
         if log_to_file:
             log_tokens(input_tokens, output_tokens, cost_est)
@@ -226,6 +490,96 @@ def generate_ai_summary(parsed_logs, use_normalizer=True, log_to_file=True, max_
         print(f"Unexpected error: {e}")
         return {'summary': '', 'input_tokens': 0, 'output_tokens': 0, 'cost_est': 0.0}
 
+
+def generate_ai_summary(parsed_logs, use_normalizer=True, log_to_file=True, max_logs=100, use_cache=True,
+                        token_budget=None):
+    """
+    Generate AI summary from parsed logs (list of dicts or DropEventBatch, with optional normalizer).
+    The prompt stays within `token_budget` tokens (default SUMMARY_TOKEN_BUDGET): the normalizer
+    packs its most threatening groups into what the template leaves, the raw path sends at most
+    `max_logs` messages that fit.
+    Returns {'summary': str, 'input_tokens': int, 'output_tokens': int, 'cost_est': float}
+    Results are cached by content (see summary_cache_key); a cache hit, or waiting on
+    an identical in-flight call, costs nothing and returns 'cached': True.
+    """
+    if not parsed_logs:
+        print("No parsed logs; returning default summary.")
+        return {'summary': 'No recent threats.', 'input_tokens': 0, 'output_tokens': 0, 'cost_est': 0.0}
+
+    load_dotenv()
+    grok_api_key = os.getenv('GROK_API_KEY')
+
+    if not grok_api_key:
+        print("Error: Missing GROK_API_KEY in .env")
+        return {'summary': '', 'input_tokens': 0, 'output_tokens': 0, 'cost_est': 0.0}
+
+    if token_budget is None:
+        token_budget = int(os.getenv('SUMMARY_TOKEN_BUDGET', SUMMARY_TOKEN_BUDGET))
+    data_budget = max(0, token_budget - estimate_tokens(get_summary_prompt('')))
+
+    if isinstance(parsed_logs, (DropEventBatch, DropSketch)) and not use_normalizer:
+        print("Columnar batches and sketches keep no raw messages; using the normalizer")
+        use_normalizer = True
+
+    if use_normalizer:
+        with stage('normalize'):
+            batch_text = normalize_logs(parsed_logs, max_groups=None, token_budget=data_budget)
+        if isinstance(parsed_logs, DropSketch):
+            approx_tokens_before = 0  # message lengths are not sketched
+        elif isinstance(parsed_logs, DropEventBatch):
+            approx_tokens_before = int(parsed_logs.raw_len.sum()) // 4
+        else:
+            approx_tokens_before = sum(len(p['raw_message']) for p in parsed_logs) // 4  # rough char-to-token
+        approx_tokens_after = estimate_tokens(batch_text)
+        print(f"[Token Opt] Before norm: ~{approx_tokens_before} tokens; After: ~{approx_tokens_after} ({(approx_tokens_after / approx_tokens_before * 100) if approx_tokens_before else 0:.1f}% of original)")
+    else:
+        batch = []
+        for p in parsed_logs[:max_logs]:
+            data_budget -= estimate_tokens(p['raw_message']) + 1
+            if data_budget < 0:
+                break
+            batch.append(p['raw_message'])
+        batch_text = '\n'.join(batch)
+
+    prompt = get_summary_prompt(batch_text)  # Extracted to ai_prompts.py
+
+    url = "https://api.x.ai/v1/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {grok_api_key}",
+        "Content-Type": "application/json"
+    }
+
+    data = {
+        "model": "grok-4-1-fast-reasoning",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "max_tokens": 300
+    }
+
+    if not use_cache:
+        return _request_summary(url, headers, data, use_normalizer, log_to_file)
+
+    key = summary_cache_key(data)
+    cached = summary_cache.get(key)
+    if cached is None:
+        called = []
+
+        def call():
+            called.append(True)
+            result = _request_summary(url, headers, data, use_normalizer, log_to_file)
+            if result['summary']:  # never cache failures
+                summary_cache.set(key, result)
+            return result
+
+        cached = _summary_flight.do(key, call)
+        if called or not cached['summary']:
+            return cached  # we made the call (or shared a failed one)
+
+    print(f"AI summary cache hit ({key[:12]})")
+    if log_to_file:
+        log_tokens(0, 0, 0.0, note=f"cache hit {key[:12]}")
+    return dict(cached, input_tokens=0, output_tokens=0, cost_est=0.0, cached=True)
+
 # Test block
 if __name__ == "__main__":
     print("Running baseline (no normalizer)...")
@@ -0,0 +1,120 @@
+# app/voice_cache.py
+"""
+Disk cache of generated Ara voice briefings.
+
+A briefing is the sequence of frames the voice server forwarded to the client
+(decoded audio deltas as bytes, other xAI events as JSON text), each with its
+offset in seconds from the first frame. It is keyed by a hash of the prompt and
+the realtime session settings, so an unchanged briefing is replayed with its
+original pacing instead of opening a new xAI session.
+
+One file per briefing, `<key>.briefing`, of records
+    <offset float64> <kind uint8: 0 audio, 1 json> <length uint32> <payload>
+File mtime is the last use; beyond `max_bytes` the least recently used files
+are deleted. All methods here do file I/O: call them via asyncio.to_thread.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+
+AUDIO, JSON = 0, 1
+_RECORD = struct.Struct('<dBI')
+
+
+def briefing_key(prompt, session):
+    """sha256 of the prompt plus the session.update settings that shape the audio."""
+    payload = json.dumps({'prompt': prompt, 'session': session}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BriefingRecorder:
+    """Collects the frames of one live briefing; nothing is stored until save()."""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.frames = []
+        self._started = None
+
+    def add(self, payload):
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        kind = AUDIO if isinstance(payload, bytes) else JSON
+        data = payload if kind == AUDIO else payload.encode('utf-8')
+        self.frames.append((now - self._started, kind, data))
+
+    def save(self):
+        """Store the briefing if it produced any audio. Returns True if stored."""
+        if not any(kind == AUDIO for _, kind, _ in self.frames):
+            return False
+        return self.cache.store(self.key, self.frames)
+
+
+class VoiceBriefingCache:
+    def __init__(self, directory='voice_cache', max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.briefing")
+
+    def recorder(self, key):
+        return BriefingRecorder(self, key)
+
+    def load(self, key):
+        """[(offset_s, payload bytes|str), ...] or None; marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+
+        frames, pos = [], 0
+        while pos < len(blob):
+            offset, kind, length = _RECORD.unpack_from(blob, pos)
+            pos += _RECORD.size
+            data = blob[pos:pos + length]
+            pos += length
+            frames.append((offset, data if kind == AUDIO else data.decode('utf-8')))
+        return frames
+
+    def store(self, key, frames):
+        """Write one briefing atomically, then evict down to max_bytes. Returns False if too big."""
+        blob = b''.join(_RECORD.pack(offset, kind, len(data)) + data for offset, kind, data in frames)
+        if not frames or len(blob) > self.max_bytes:
+            return False
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, self._path(key))
+            self._evict()
+        return True
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.briefing'):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime_ns, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):  # least recently used first
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def total_bytes(self):
+        try:
+            return sum(os.path.getsize(os.path.join(self.directory, name))
+                       for name in os.listdir(self.directory) if name.endswith('.briefing'))
+        except OSError:
+            return 0
@@ -0,0 +1,93 @@
+# benchmarks/generator.py
+"""
+Synthetic UXG "WAN to Gateway" drop logs in Graylog's message shape.
+
+    UXG Pro Pro [WAN_LOCAL-D-40000] DESCR="Log WAN to Gateway Drops" IN=eth0 OUT=
+    MAC=... SRC=173.249.19.73 DST=70.24.240.148 LEN=125 TOS=00 PREC=0x00 TTL=55
+    ID=15036 DF PROTO=UDP SPT=12023 DPT=51413 LEN=105 MARK=1c0000
+
+Sources are drawn from `subnets` random public /24s with Zipf(`zipf_a`) weights
+by rank (a few scanners send most of the traffic, a long tail sends a few
+probes each); the host octet is uniform. Destination ports follow `port_mix`
+(None = a random port), protocols `proto_mix` (ICMP lines carry no ports).
+`mac_ratio` / `len_ratio` control the optional MAC= and LEN..DF blocks, and
+`malformed_ratio` of the lines are damaged (truncated, missing DESCR, garbled
+SRC, or not a drop at all). Timestamps are spread over `span_seconds` ending at
+`end` (epoch seconds), newest first like Graylog's answers.
+
+Field draws are vectorized, so a million lines take a few seconds.
+"""
+import time
+
+import numpy as np
+
+DEFAULT_PORT_MIX = {22: 0.18, 23: 0.08, 3389: 0.10, 443: 0.08, 8443: 0.05, 445: 0.06,
+                    5060: 0.04, 51413: 0.16, None: 0.25}
+DEFAULT_PROTO_MIX = {'TCP': 0.72, 'UDP': 0.24, 'ICMP': 0.04}
+
+_MALFORMED = ('truncated', 'no_descr', 'bad_src', 'not_a_drop')
+
+
+def _pick(rng, mix, n):
+    keys = list(mix)
+    weights = np.array([mix[k] for k in keys], dtype=float)
+    return keys, rng.choice(len(keys), size=n, p=weights / weights.sum())
+
+
+def zipf_weights(n, a):
+    """Bounded Zipf: P(rank k) proportional to 1 / k**a, k = 1..n."""
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return weights / weights.sum()
+
+
+def generate_logs(n, seed=0, subnets=5000, zipf_a=1.2, port_mix=None, proto_mix=None, mac_ratio=0.8,
+                  len_ratio=0.6, malformed_ratio=0.01, span_seconds=86400, end=None,
+                  rule_id='40000', descr='Log WAN to Gateway Drops', dst_ip='70.24.240.148'):
+    """List of n Graylog-style dicts {'id', 'timestamp', 'source', 'message'}, newest first."""
+    rng = np.random.default_rng(seed)
+    end = time.time() if end is None else end
+
+    bases = rng.integers(1, 224, subnets) << 24 | rng.integers(0, 1 << 16, subnets) << 8
+    src = bases[rng.choice(subnets, size=n, p=zipf_weights(subnets, zipf_a))] | rng.integers(1, 255, n)
+    src_text = [f"{ip >> 24}.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}" for ip in src.tolist()]
+
+    port_keys, port_idx = _pick(rng, port_mix or DEFAULT_PORT_MIX, n)
+    fixed = np.array([-1 if k is None else k for k in port_keys])[port_idx]
+    ports = np.where(fixed < 0, rng.integers(1, 65536, n), fixed).tolist()
+    proto_keys, proto_idx = _pick(rng, proto_mix or DEFAULT_PROTO_MIX, n)
+    spt = rng.integers(1024, 65536, n).tolist()
+    has_mac = (rng.random(n) < mac_ratio).tolist()
+    has_len = (rng.random(n) < len_ratio).tolist()
+    ttl = rng.integers(30, 128, n).tolist()
+    ip_id = rng.integers(0, 65536, n).tolist()
+
+    offsets_ms = np.sort(rng.integers(0, int(span_seconds * 1000), n))
+    stamps = np.datetime_as_string((int(end * 1000) - offsets_ms).astype('datetime64[ms]'), unit='ms')
+
+    head = f'UXG Pro Pro [WAN_LOCAL-D-{rule_id}] DESCR="{descr}" IN=eth0 OUT= '
+    mac = 'MAC=e4:38:83:9a:f0:63:0c:ac:8a:e5:fe:54:08:00 '
+    logs = []
+    for i, proto_i in enumerate(proto_idx.tolist()):
+        proto = proto_keys[proto_i]
+        message = (f"{head}{mac if has_mac[i] else ''}SRC={src_text[i]} DST={dst_ip} "
+                   f"{f'LEN=60 TOS=00 PREC=0x00 TTL={ttl[i]} ID={ip_id[i]} DF ' if has_len[i] else ''}"
+                   f"PROTO={proto}")
+        if proto != 'ICMP':
+            message += f" SPT={spt[i]} DPT={ports[i]}"
+        if proto == 'UDP':
+            message += " LEN=105 MARK=1c0000"
+        logs.append({'id': f"bench-{seed}-{i}", 'timestamp': stamps[i] + 'Z', 'source': 'UXG', 'message': message})
+
+    for i in np.flatnonzero(rng.random(n) < malformed_ratio).tolist():
+        logs[i]['message'] = _malform(logs[i]['message'], _MALFORMED[i % len(_MALFORMED)], rng)
+    return logs
+
+
+def _malform(message, kind, rng):
+    if kind == 'truncated':
+        return message[:int(rng.integers(10, message.index('SRC=') + 4))]
+    if kind == 'no_descr':
+        return message.replace(' DESCR="', ' DSCR="', 1)
+    if kind == 'bad_src':
+        return message.replace('SRC=', 'SRC=::ffff:', 1)
+    return 'UXG Pro Pro kernel: [UFW AUDIT] connection tracking table full, dropping packet'
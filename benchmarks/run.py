@@ -0,0 +1,165 @@
+# benchmarks/run.py
+"""
+Throughput benchmarks of the dashboard's hot paths on synthetic drop logs.
+
+    python -m benchmarks.run                      # 1k, 10k, 100k and 1M events
+    python -m benchmarks.run --sizes 1000 10000 --output /tmp/bench.json
+    python -m benchmarks.run --baseline old.json  # also fail if >1.5x slower than old.json
+
+Stages (each timed best-of-`repeat` on the same generated logs):
+  parse_dicts      parse_firewall_drops: per-event dicts + stats (legacy path)
+  parse_batch      parse_drop_batch: columnar DropEventBatch + stats (dashboard path)
+  normalize_dicts  normalize_logs over the parsed dicts
+  normalize_batch  normalize_logs over the batch
+  timeline         get_dashboard_data's timelines: DropWindow ingest + hourly
+                   labels (24h view) and the ranged/per-site timeline_labels
+  prompt           what an AI summary / voice briefing costs before the API call:
+                   budgeted normalize, get_summary_prompt, request body + cache
+                   key, get_ara_voice_prompt
+
+Results are written as JSON (seconds and µs/event per stage and size).
+thresholds.json holds a wall-clock budget in ms per stage and size, about 3x
+what a one-core dev box measures; any stage over its budget (or over
+`tolerance` x a --baseline run) is reported and the exit status is 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from app.ai_prompt import get_summary_prompt
+from app.ara_prompt import get_ara_voice_prompt
+from app.data_access import DropWindow
+from app.normalizer import normalize_logs
+from app.stats import compute_stats
+from app.timeline import timeline_labels
+from app.tokens import estimate_tokens
+from app.utils import SUMMARY_TOKEN_BUDGET, parse_drop_batch, parse_firewall_drops, summary_cache_key
+from benchmarks.generator import generate_logs
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+STAGES = ('parse_dicts', 'parse_batch', 'normalize_dicts', 'normalize_batch', 'timeline', 'prompt')
+THRESHOLDS = os.path.join(os.path.dirname(__file__), 'thresholds.json')
+END = 1769118287.0  # fixed "now", so runs are comparable
+
+
+def _quiet(fn, *args):
+    # normalize_logs and the parsers report to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def _timeline(batch):
+    cutoff_ms = int((END - 86400) * 1000)
+    window = DropWindow(86400)
+    window.ingest(batch, cutoff_ms)
+    window.timeline('hour')
+    timeline_labels(batch.timestamp, 3600, cutoff_ms, fmt='%m-%d %H:%M')
+
+
+def _prompt(batch):
+    text = normalize_logs(batch, max_groups=None,
+                          token_budget=SUMMARY_TOKEN_BUDGET - estimate_tokens(get_summary_prompt('')))
+    body = {"model": "grok-4-1-fast-reasoning", "messages": [{"role": "user", "content": get_summary_prompt(text)}],
+            "temperature": 0.7, "max_tokens": 300}
+    summary_cache_key(body)
+    stats = compute_stats(batch)
+    get_ara_voice_prompt({
+        'status': {'level': 'High Threat Level'}, 'total_blocks': stats['total_blocks'],
+        'top_subnets': [{'subnet': s, 'count': c} for s, c in stats['top_src_subnets'].items()],
+        'top_ports': stats['top_dst_ports'],
+    })
+
+
+def _best(fn, args, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _quiet(fn, *args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, seed=0, stages=STAGES, generator_options=None):
+    """{'meta': {...}, 'results': {stage: {size: {'seconds', 'us_per_event', 'events'}}}}"""
+    results = {stage: {} for stage in stages}
+    for n in sizes:
+        logs = generate_logs(n, seed=seed, end=END, **(generator_options or {}))
+        dicts, _ = _quiet(parse_firewall_drops, logs)
+        batch, _ = _quiet(parse_drop_batch, logs)
+        inputs = {'parse_dicts': (parse_firewall_drops, logs), 'parse_batch': (parse_drop_batch, logs),
+                  'normalize_dicts': (normalize_logs, dicts), 'normalize_batch': (normalize_logs, batch),
+                  'timeline': (_timeline, batch), 'prompt': (_prompt, batch)}
+        rounds = repeat if n < 1_000_000 else 1
+        for stage in stages:
+            fn, data = inputs[stage]
+            seconds = _best(fn, (data,), rounds)
+            results[stage][str(n)] = {'seconds': round(seconds, 6), 'us_per_event': round(seconds * 1e6 / n, 3),
+                                      'events': len(batch)}
+        del logs, dicts, batch
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'seed': seed, 'repeat': repeat, 'created': int(time.time())}
+    return {'meta': meta, 'results': results}
+
+
+def check(report, thresholds=None, baseline=None, tolerance=1.5):
+    """Regression messages: stages over their thresholds.json budget or `tolerance` x the baseline."""
+    failures = []
+    for stage, by_size in report['results'].items():
+        for size, result in by_size.items():
+            ms = result['seconds'] * 1000
+            budget = (thresholds or {}).get(stage, {}).get(size)
+            if budget is not None and ms > budget:
+                failures.append(f"{stage} @ {size}: {ms:.1f}ms > budget {budget}ms")
+            before = (baseline or {}).get('results', {}).get(stage, {}).get(size)
+            if before is not None and result['seconds'] > before['seconds'] * tolerance:
+                failures.append(f"{stage} @ {size}: {ms:.1f}ms > {tolerance}x baseline "
+                                f"{before['seconds'] * 1000:.1f}ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, normalizing, timelines and prompts")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help="best of N (1M runs once)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--thresholds', default=THRESHOLDS, help="budget file ('' to skip)")
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.seed, args.stages)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<16}" + ''.join(f"{n:>14,}" for n in args.sizes) + "   (ms, µs/event)")
+    for stage, by_size in report['results'].items():
+        cells = ''.join(f"{r['seconds'] * 1000:>8.1f} {r['us_per_event']:>5.2f}" for r in by_size.values())
+        print(f"{stage:<16}{cells}")
+
+    thresholds = None
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = check(report, thresholds, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print(f"Results written to {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react'
-import type { DashboardData } from './types'
+import type { DashboardData, LiveDelta, LiveState } from './types'
 import ThreatBanner from './components/ThreatBanner'
 import StatsCard from './components/StatsCard'
 import AISummaryCard from './components/AISummaryCard'
@@ -29,6 +29,29 @@ function App() {
     }
   }, [])
 
+  // Live push: a full 'state' on connect (and after falling behind), then compact deltas
+  useEffect(() => {
+    const source = new EventSource('/api/live')
+    source.addEventListener('state', (event) => {
+      const { seq: _seq, ...state } = JSON.parse((event as MessageEvent).data) as LiveState
+      setData(prev => prev && { ...prev, ...state })
+    })
+    source.addEventListener('delta', (event) => {
+      const delta = JSON.parse((event as MessageEvent).data) as LiveDelta
+      setData(prev => {
+        if (!prev) return prev
+        const next = { ...prev, ...delta.changed }
+        if (delta.timeline) {
+          const { drop, keep, labels, data } = delta.timeline
+          next.timeline_labels = prev.timeline_labels.slice(drop, drop + keep).concat(labels)
+          next.timeline_data = prev.timeline_data.slice(drop, drop + keep).concat(data)
+        }
+        return next
+      })
+    })
+    return () => source.close()
+  }, [])
+
   const handleSummaryUpdate = (summary: string, tokens: { input: number; output: number }) => {
     if (data) {
       setData({ ...data, ai_summary: summary, tokens })
@@ -92,6 +115,14 @@ function App() {
             items={data.top_subnets.map(item => `${item.subnet}: ${item.count}`)}
           />
 
+          {/* Per-site totals (several Graylog sources) */}
+          {data.sites && data.sites.length > 0 && (
+            <StatsCard
+              title="Blocks per Site"
+              items={data.sites.map(s => `${s.site}: ${s.total_blocks}${s.top_port != null ? ` (top port ${s.top_port})` : ''}`)}
+            />
+          )}
+
           {/* Top Ports Chart */}
           <div className="md:col-span-2">
             <PortsChart data={data.top_ports} />
@@ -17,4 +17,37 @@ export interface DashboardData {
     output: number;
   };
   error?: string;
-}
\ No newline at end of file
+  // Multi-site setups (GRAYLOG_SOURCES): the site this view is filtered to, and per-site totals
+  site?: string | null;
+  sites?: SiteSummary[];
+  // Background snapshot metadata (set when served from the refresher)
+  version?: number;
+  built_at?: string | null;
+  stale_since?: string | null;
+}
+
+export interface SiteSummary {
+  site: string;
+  total_blocks: number;
+  top_subnet: string | null;
+  top_port: number | null;
+}
+
+// /api/live Server-Sent Events
+export type LiveState = Pick<DashboardData, 'total_blocks' | 'top_subnets' | 'top_ports' | 'timeline_labels' | 'timeline_data'> & {
+  seq: number;
+};
+
+export interface LiveDelta {
+  seq: number;
+  since: number;
+  ts: number;
+  changed: Partial<LiveState>;
+  // New timeline = old[drop:drop + keep] followed by labels / data
+  timeline?: {
+    drop: number;
+    keep: number;
+    labels: string[];
+    data: number[];
+  };
+}
@@ -0,0 +1,163 @@
+"""Log factories, fakes and fixtures shared by several test modules."""
+import base64
+import json
+import time
+import numpy as np
+import pytest
+from benchmarks.generator import generate_logs
+from app.events import COLUMNS, DropEventBatch, epoch_ms_to_iso
+
+NOW = 1769100000.0  # fixed clock (epoch seconds)
+
+# Sample raw log from your real output
+SAMPLE_RAW_LOG = {
+    "timestamp": "2026-01-22T21:44:47.000Z",
+    "source": "UXG",
+    "message": 'UXG Pro Pro [WAN_LOCAL-D-40000] DESCR="Log WAN to Gateway Drops" IN=eth0 OUT= MAC=e4:38:83:9a:f0:63:0c:ac:8a:e5:fe:54:08:00 SRC=173.249.19.73 DST=70.24.240.148 LEN=125 TOS=00 PREC=0x00 TTL=55 ID=15036 DF PROTO=UDP SPT=12023 DPT=51413 LEN=105 MARK=1c0000'
+}
+
+SAMPLE_RESPONSE = {
+    "messages": [
+        {
+            "message": SAMPLE_RAW_LOG  # nested like real Graylog
+        },
+        {
+            "message": SAMPLE_RAW_LOG
+        }
+    ]
+}
+
+CANONICAL = [
+    'UXG', 'Pro', 'Pro', '[WAN_LOCAL-D-40000]', 'DESCR="Log', 'WAN', 'to', 'Gateway', 'Drops"',
+    'IN=eth0', 'OUT=', 'MAC=e4:38:83:9a:f0:63:0c:ac:8a:e5:fe:54:08:00',
+    'SRC=173.249.19.73', 'DST=70.24.240.148',
+    'LEN=125', 'TOS=00', 'PREC=0x00', 'TTL=55', 'ID=15036', 'DF',
+    'PROTO=UDP', 'SPT=12023', 'DPT=51413', 'LEN=105', 'MARK=1c0000',
+]
+
+ODD_VALUES = ['', 'x', '12a', '٣', 'SRC=9.9.9.9', 'DST=8.8.8.8', 'DPT=22', 'é']
+SEPARATORS = ['', '  ', '\t', '\n', '\xa0', ' \t ']
+
+FETCH_SECONDS = 0.3  # how long voice_env's stubbed Graylog fetch takes
+
+
+def mutate(rnd):
+    """A near-canonical UXG line with 0-3 random defects."""
+    tokens = list(CANONICAL)
+    for _ in range(rnd.randint(0, 3)):
+        op = rnd.random()
+        k = rnd.randrange(len(tokens))
+        if op < 0.3:
+            del tokens[k]
+        elif op < 0.6:
+            key = tokens[k].split('=', 1)[0]
+            tokens[k] = f"{key}={rnd.choice(ODD_VALUES)}" if '=' in tokens[k] else rnd.choice(ODD_VALUES)
+        elif op < 0.75:
+            tokens.insert(k, rnd.choice(['junk', 'PROTO=ICMP', 'TYPE=3', 'XSRC=7.7.7.7', 'DF']))
+        else:
+            tokens[k] += rnd.choice(SEPARATORS)
+    return ' '.join(tokens)
+
+
+def uxg_logs(n, seed=0):
+    """n well-formed drop logs over one day: a few /24s on five ports, TCP and UDP only."""
+    return generate_logs(n, seed=seed, subnets=200, end=NOW, malformed_ratio=0,
+                         port_mix={22: 1, 3389: 1, 8443: 1, 51413: 1, 443: 1}, proto_mix={'TCP': 1, 'UDP': 1})
+
+
+def stamped_logs(n, newest_ms, step_ms=60000, seed=0, prefix='id'):
+    """Newest-first Graylog-style logs with ids, one every `step_ms`."""
+    logs = uxg_logs(n, seed)
+    for i, log in enumerate(logs):
+        log['id'] = f"{prefix}{i}"
+        log['timestamp'] = epoch_ms_to_iso(newest_ms - i * step_ms)
+    return logs
+
+
+def zipf_batch(n, seed=0, subnets=100000, ports=5000, a=1.3):
+    """Scan-like traffic: Zipf-distributed source /24s and dst ports (most scanners are rare)."""
+    rng = np.random.default_rng(seed)
+    subnet_rank = np.minimum(rng.zipf(a, n), subnets) - 1
+    port_rank = np.minimum(rng.zipf(a, n), ports) - 1
+    subnet_ids = rng.permutation(subnets).astype(np.uint32)
+    port_ids = rng.permutation(np.arange(1, 65536, dtype=np.uint32))[:ports]
+    columns = {name: np.zeros(n, dtype=np.uint32) for name in COLUMNS}
+    columns.update({
+        'timestamp': np.arange(n, dtype=np.int64)[::-1] * 1000,
+        'src_ip': (np.uint32(0x0A000000) + (subnet_ids[subnet_rank] << np.uint32(8)) + np.uint32(7)),
+        'dst_port': port_ids[port_rank].astype(np.uint16),
+        'src_port': np.full(n, 40000, dtype=np.uint16),
+        'has_src_port': np.ones(n, dtype=bool),
+        'has_src_ip': np.ones(n, dtype=bool),
+        'has_dst_port': np.ones(n, dtype=bool),
+        'proto': (rng.random(n) < 0.3).astype(np.uint8),
+        'rule_id': np.zeros(n, dtype=np.uint8),
+        'descr': np.zeros(n, dtype=np.uint8),
+    })
+    return DropEventBatch(columns, ('TCP', 'UDP'), ('WAN_LOCAL-D-40000',), ('d',))
+
+
+class OutageFeed:
+    """Graylog stand-in: returns `logs` once (or never, when down)."""
+
+    def __init__(self, logs=(), **kwargs):
+        self.logs = list(logs)
+        self.cutoff = None
+        self.resumed = None
+
+    def poll(self):
+        logs, self.logs = self.logs, []
+        return logs
+
+    def resume(self, cursor):
+        self.resumed = cursor
+
+
+class FakeRealtime:
+    """Stand-in for the xAI realtime socket: one audio delta, then response.done."""
+    connects = 0
+
+    def __init__(self, url, additional_headers=None):
+        FakeRealtime.connects += 1
+        self.sent = []
+
+    def __await__(self):
+        yield from []
+        return self
+
+    async def close(self):
+        pass
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def __aiter__(self):
+        yield json.dumps({'type': 'response.output_audio.delta', 'delta': base64.b64encode(b'pcm').decode()})
+        yield json.dumps({'type': 'response.done'})
+
+
+class FakeClient:
+    def __init__(self):
+        self.received = []
+
+    async def send(self, message):
+        self.received.append(message)
+
+
+@pytest.fixture
+def voice_env(monkeypatch, tmp_path):
+    import websockets
+    import app.__main__ as server
+    from app.utils import parse_drop_batch
+    from app.voice_cache import VoiceBriefingCache
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GROK_API_KEY', 'test-key')
+    monkeypatch.setattr(websockets, 'connect', FakeRealtime)
+    monkeypatch.setattr(server, 'voice_cache', VoiceBriefingCache(str(tmp_path / 'voice_cache')))
+
+    def slow_get_drops(range_seconds):
+        time.sleep(FETCH_SECONDS)  # a Graylog request that takes a while
+        return parse_drop_batch([SAMPLE_RAW_LOG])
+    monkeypatch.setattr(server.drop_data, 'get_drops', slow_get_drops)
+    return tmp_path
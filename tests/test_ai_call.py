@@ -33,4 +33,22 @@ def test_generate_ai_summary_empty_input(mock_post):
     assert result['input_tokens'] == 0
     assert result['output_tokens'] == 0
     assert result['cost_est'] == 0.0
-    mock_post.assert_not_called()  # no API call on empty
\ No newline at end of file
+    mock_post.assert_not_called()  # no API call on empty
+
+@pytest.mark.parametrize("use_normalizer", [True, False])
+@patch('app.utils.requests.post')
+def test_prompt_stays_within_the_token_budget(mock_post, mock_grok_response, use_normalizer, monkeypatch):
+    from app.tokens import estimate_tokens
+    from app.utils import parse_firewall_drops
+    from tests.conftest import uxg_logs
+    monkeypatch.setenv('GROK_API_KEY', 'test')
+    mock_post.return_value = Mock(json=Mock(return_value=mock_grok_response), raise_for_status=Mock())
+    parsed, _ = parse_firewall_drops(uxg_logs(5000, seed=1))
+
+    sizes = []
+    for budget in (300, 900):
+        generate_ai_summary(parsed, use_normalizer=use_normalizer, log_to_file=False, use_cache=False,
+                            token_budget=budget)
+        sizes.append(estimate_tokens(mock_post.call_args.kwargs['json']['messages'][0]['content']))
+        assert sizes[-1] <= budget
+    assert 200 < sizes[0] < sizes[1]
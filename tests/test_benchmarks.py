@@ -0,0 +1,78 @@
+import json
+import pytest
+from collections import Counter
+from benchmarks.generator import generate_logs
+from benchmarks.run import STAGES, THRESHOLDS, check, main, run
+from app.drop_parser import match_fast, match_regex
+from app.utils import build_drop_batch, parse_firewall_drops
+
+
+def test_generator_is_deterministic_and_parses_like_uxg_logs():
+    logs = generate_logs(5000, seed=3, end=1769118287.0)
+    assert logs == generate_logs(5000, seed=3, end=1769118287.0)
+    assert [log['timestamp'] for log in logs] == sorted((log['timestamp'] for log in logs), reverse=True)
+    assert logs[0]['timestamp'] <= '2026-01-22T21:44:47.000Z'
+
+    messages = [log['message'] for log in logs]
+    assert all(match_fast(m) == match_regex(m) for m in messages)
+    malformed = sum(match_fast(m) is None for m in messages)
+    assert 0 < malformed < 5000 * 0.02
+
+    parsed, stats = parse_firewall_drops(logs)
+    assert stats['total_blocks'] == len(build_drop_batch(logs)) == len(parsed)
+    assert {p['proto'] for p in parsed} == {'TCP', 'UDP', 'ICMP'}
+    assert any('MAC=' in m for m in messages) and any('MAC=' not in m for m in messages)
+
+
+def test_generator_mixes_are_configurable():
+    logs = generate_logs(4000, seed=1, subnets=1000, zipf_a=1.5, port_mix={22: 3, 3389: 1},
+                         proto_mix={'TCP': 1}, malformed_ratio=0)
+    parsed, stats = parse_firewall_drops(logs)
+    assert len(parsed) == 4000 and {p['proto'] for p in parsed} == {'TCP'}
+    ports = Counter(p['dst_port'] for p in parsed)
+    assert set(ports) == {22, 3389} and 2.5 < ports[22] / ports[3389] < 3.5
+
+    # Zipf over /24s: the top subnet alone sends far more than a uniform share
+    top_subnet_count = next(iter(stats['top_src_subnets'].values()))
+    assert top_subnet_count > 4000 / 1000 * 50
+
+
+def test_run_reports_every_stage_and_flags_regressions(tmp_path):
+    report = run(sizes=(500,), repeat=1)
+    assert set(report['results']) == set(STAGES)
+    assert all(r['500']['seconds'] > 0 and r['500']['events'] > 480 for r in report['results'].values())
+
+    assert check(report, {'parse_batch': {'500': 1e9}}) == []
+    assert check(report, {'parse_batch': {'500': 0}})[0].startswith('parse_batch @ 500')
+    before = json.loads(json.dumps(report))
+    before['results']['prompt']['500']['seconds'] /= 10
+    assert [f.split(':')[0] for f in check(report, baseline=before)] == ['prompt @ 500']
+
+    with open(THRESHOLDS) as f:
+        assert set(json.load(f)) == set(STAGES)
+
+    out = tmp_path / 'bench.json'
+    assert main(['--sizes', '1000', '--repeat', '1', '--output', str(out), '--thresholds', '']) == 0
+    assert json.loads(out.read_text())['results']['timeline']['1000']['us_per_event'] > 0
+    budget = tmp_path / 'tight.json'
+    budget.write_text(json.dumps({'parse_dicts': {'1000': 0}}))
+    assert main(['--sizes', '1000', '--repeat', '1', '--stages', 'parse_dicts',
+                 '--output', str(out), '--thresholds', str(budget)]) == 1
+
+
+@pytest.mark.benchmark
+def test_within_thresholds_and_columnar_parse_keeps_up(tmp_path):
+    # Wall-clock checks: opt-in with `pytest -m benchmark` (machine dependent)
+    out = tmp_path / 'bench.json'
+    assert main(['--sizes', '10000', '--output', str(out)]) == 0
+    results = json.loads(out.read_text())['results']
+    assert results['parse_batch']['10000']['seconds'] < 1.5 * results['parse_dicts']['10000']['seconds']
+
+
+@pytest.mark.benchmark
+def test_columnar_parse_is_no_slower_than_dicts_at_100k(tmp_path):
+    # The batch also decodes timestamps and packs IPs, in one pass per column in build()
+    out = tmp_path / 'bench.json'
+    main(['--sizes', '100000', '--stages', 'parse_dicts', 'parse_batch', '--output', str(out), '--thresholds', ''])
+    results = json.loads(out.read_text())['results']
+    assert results['parse_batch']['100000']['seconds'] < 1.1 * results['parse_dicts']['100000']['seconds']
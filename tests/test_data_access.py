@@ -0,0 +1,96 @@
+import threading
+import time
+import pytest
+from app.data_access import SingleFlight, TTLCache, DropDataAccess
+from tests.conftest import SAMPLE_RAW_LOG
+
+
+class FakeFeed:
+    calls = 0
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.cutoff = None
+
+    def poll(self):
+        FakeFeed.calls += 1
+        time.sleep(0.05)  # long enough for every thread to pile up on the flight
+        return [SAMPLE_RAW_LOG]
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_feed():
+    FakeFeed.calls = 0
+
+
+def test_single_flight_coalesces_concurrent_callers():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 8
+
+
+def test_single_flight_shares_errors_and_does_not_remember_them():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("graylog down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_ttl_cache_expires():
+    now = [100.0]
+    cache = TTLCache(ttl=15, clock=lambda: now[0])
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    now[0] += 15
+    assert cache.get("k") is None
+
+
+def test_get_drops_joins_one_fetch_and_caches():
+    access = DropDataAccess(ttl=60, fetcher_factory=FakeFeed)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(access.get_drops(86400))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert FakeFeed.calls == 1
+    assert all(r is results[0] for r in results)
+    parsed, stats = results[0]
+    assert stats["total_blocks"] == 1
+
+    access.get_drops(86400)
+    assert FakeFeed.calls == 1  # TTL hit
+
+    access.get_drops(3600)
+    assert FakeFeed.calls == 2  # different range, different key
+
+
+def test_refresh_polls_despite_ttl_and_updates_cache():
+    access = DropDataAccess(ttl=60, fetcher_factory=FakeFeed)
+    access.get_drops(86400)
+    fresh = access.refresh(86400)
+    assert FakeFeed.calls == 2
+    assert access.get_drops(86400) is fresh
+    assert FakeFeed.calls == 2
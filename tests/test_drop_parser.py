@@ -0,0 +1,45 @@
+import random
+import pytest
+from app.drop_parser import match_fast, match_regex, benchmark
+from app.utils import parse_firewall_drops
+from tests.conftest import SAMPLE_RAW_LOG, mutate
+
+
+def test_fast_engine_matches_regex_on_sample():
+    message = SAMPLE_RAW_LOG['message']
+    assert match_fast(message) == match_regex(message)
+    assert match_fast(message) == ('40000', 'Log WAN to Gateway Drops', '173.249.19.73',
+                                   '70.24.240.148', 'UDP', 12023, 51413)
+
+
+@pytest.mark.parametrize("message", [
+    'x [WAN_LOCAL-D-1] DESCR="d" IN=eth0 OUT= SRC=1.2.3.4 DST=5.6.7.8 PROTO=ICMP TYPE=3 CODE=3',
+    'x [WAN_LOCAL-D-1] DESCR="d" IN=eth0 OUT= SRC=1.2.3.4 DST=5.6.7.8 LEN=60 TOS=00 PREC=0x00 TTL=5 ID=1 PROTO=TCP SPT=1 DPT=2',
+    'x [WAN_LOCAL-D-1] DESCR="d" IN=eth0 OUT= SRC=1.2.3.4 DST=5.6.7.8 PROTO=UDP  SPT=1 DPT=2',
+    'x [WAN_LOCAL-D-1] DESCR="d" IN=eth0 OUT= SRC=1.2.3.4 DST=5.6.7.8 PROTO=TCP SPT=12DPT=80',
+    'x [WAN_LOCAL-D-1] DESCR="d" IN=eth0 OUT= SRC=1.2.3.4DST=5.6.7.8 PROTO=TCP',
+    'x [WAN_LOCAL-D-x] [WAN_LOCAL-D-2] DESCR="d" IN= OUT= SRC=1.2.3.4 DST=5.6.7.8',
+    'Log WAN to Gateway Drops without a rule tag',
+])
+def test_fast_engine_matches_regex_on_edge_cases(message):
+    assert match_fast(message) == match_regex(message)
+
+
+def test_fast_engine_matches_regex_on_mutated_corpus():
+    rnd = random.Random(40000)
+    for _ in range(20000):
+        message = mutate(rnd)
+        assert match_fast(message) == match_regex(message), message
+
+
+def test_parse_engines_produce_identical_events():
+    rnd = random.Random(1)
+    raw_logs = [{'timestamp': '2026-01-22T21:44:47.000Z', 'message': mutate(rnd)} for _ in range(2000)]
+    assert parse_firewall_drops(raw_logs, engine='fast') == parse_firewall_drops(raw_logs, engine='regex')
+
+
+def test_benchmark_reports_both_engines():
+    rnd = random.Random(2)
+    rates = benchmark([mutate(rnd) for _ in range(500)], repeat=1)
+    assert set(rates) == {'fast', 'regex'}
+    assert all(rate > 0 for rate in rates.values())
@@ -0,0 +1,133 @@
+import time
+import numpy as np
+import pytest
+from app.data_access import DropDataAccess
+from app.event_store import DropEventStore
+from app.events import DropEventBatch
+from app.timeline import timeline_labels
+from app.utils import build_drop_batch
+from tests.conftest import NOW, stamped_logs, OutageFeed
+
+
+def _batch(logs):
+    keys = []
+    return build_drop_batch(logs, keys=keys), keys
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DropEventStore(str(tmp_path / "drops.db"), clock=lambda: NOW)
+    yield store
+    store.close()
+
+
+def test_add_query_round_trip_and_dedupe(store):
+    logs = stamped_logs(500, int(NOW * 1000))
+    batch, keys = _batch(logs)
+
+    # Two overlapping deltas (oldest first), plus a duplicate inside one batch
+    assert store.add(batch[200:], keys[200:]).all()
+    mask = store.add(batch[:250], keys[:250])
+    assert mask.tolist() == [True] * 200 + [False] * 50
+    dup = store.add(DropEventBatch.concat([batch[:1], batch[:1]]), [keys[0], keys[0]])
+    assert not dup.any()
+
+    stored = store.query(int(NOW * 1000) - 86400 * 1000)
+    assert stored.to_events() == batch.to_events()
+    assert store.latest_ts() == int(NOW * 1000)
+
+
+def test_query_filters_by_range_subnet_and_port(store):
+    batch, keys = _batch(stamped_logs(400, int(NOW * 1000)))
+    for i in range(0, 400, 100):
+        store.add(batch[i:i + 100], keys[i:i + 100])
+
+    since = int(NOW * 1000) - 3600 * 1000
+    assert store.query(since).to_events() == batch[batch.timestamp >= since].to_events()
+
+    subnet = int(batch.src_subnet24[7])
+    expected = batch[batch.src_subnet24 == subnet]
+    assert store.query(0, src24=subnet).to_events() == expected.to_events()
+
+    expected = batch[batch.has_dst_port & (batch.dst_port == 3389)]
+    assert len(expected) and store.query(0, dst_port=3389).to_events() == expected.to_events()
+
+
+def test_compaction_applies_retention_and_merges_segments(tmp_path):
+    now = [NOW - 2 * 86400]  # nothing has expired yet while writing
+    store = DropEventStore(str(tmp_path / "drops.db"), retention_days=1, segment_events=250,
+                           merge_after=3600, compact_interval=10 ** 9, clock=lambda: now[0])
+    # 40 hours of events, one per minute, written in 24 small segments
+    batch, keys = _batch(stamped_logs(2400, int(NOW * 1000), step_ms=60000))
+    for i in range(2300, -1, -100):
+        store.add(batch[i:i + 100], keys[i:i + 100])
+    segments = lambda: store._db().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+    assert segments() == 24
+
+    now[0] = NOW
+    deleted = store.compact()
+    cutoff = int((NOW - 86400) * 1000)
+    assert deleted == int((batch.timestamp < cutoff).sum())
+    assert segments() < 24
+    assert store.query(0).to_events() == batch[batch.timestamp >= cutoff].to_events()
+    store.close()
+
+
+def test_restart_during_outage_serves_stored_events(tmp_path):
+    now_ms = int(time.time() * 1000)
+    logs = stamped_logs(300, now_ms - 60000)
+
+    store = DropEventStore(str(tmp_path / "drops.db"))
+    first = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(logs, **kw), store=store)
+    batch, stats = first.get_drops(86400)
+    assert stats['total_blocks'] == 300
+    store.close()
+
+    # "Restart" with Graylog unreachable: everything comes from disk
+    store = DropEventStore(str(tmp_path / "drops.db"))
+    feeds = []
+    second = DropDataAccess(fetcher_factory=lambda **kw: feeds.append(OutageFeed(**kw)) or feeds[-1], store=store)
+    seeded, seeded_stats = second.get_drops(86400)
+    assert seeded.to_events() == batch.to_events()
+    assert seeded_stats == stats
+    assert feeds[0].resumed == (now_ms - 60000) / 1000
+
+    history, history_stats = second.history(7 * 86400)
+    assert history_stats == stats
+    store.close()
+
+
+def test_large_history_stats_come_from_sketch(tmp_path):
+    now_ms = int(time.time() * 1000)
+    logs = stamped_logs(300, now_ms - 60000)
+    store = DropEventStore(str(tmp_path / "drops.db"))
+    exact = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(logs, **kw), store=store)
+    _, stats = exact.get_drops(86400)
+
+    sketched = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(**kw), store=store, sketch_threshold=100)
+    _, history_stats = sketched.history(7 * 86400)
+    # Few distinct keys: the sketch is exact (only tie order may differ)
+    assert history_stats['total_blocks'] == 300
+    assert history_stats['top_src_subnets'] == stats['top_src_subnets']
+    assert sorted(history_stats['top_dst_ports'].values()) == sorted(stats['top_dst_ports'].values())
+    store.close()
+
+
+def test_sketched_history_streams_segments_and_keeps_timelines(tmp_path):
+    now_ms = int(time.time() * 1000)
+    batch, keys = _batch(stamped_logs(600, now_ms - 60000, step_ms=900000))  # a week, every 15 minutes
+    store = DropEventStore(str(tmp_path / "drops.db"))
+    for i in range(0, 600, 100):
+        store.add(batch[i:i + 100], keys[i:i + 100])
+    since_ms = now_ms - 3 * 86400 * 1000
+    assert store.count(0) == 600 and store.count(since_ms) >= len(store.query(since_ms))
+    scanned = DropEventBatch.concat(list(store.scan(since_ms)))
+    assert scanned[np.argsort(-scanned.timestamp)].to_events() == store.query(since_ms).to_events()
+
+    access = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(**kw), store=store, sketch_threshold=100)
+    history, stats = access.history(7 * 86400)
+    assert len(history) == stats['total_blocks'] == 600 and history.site_values == ('default',)
+    assert history.for_site('default').stats() == stats and len(history.for_site('nowhere')) == 0
+    for bucket_seconds, fmt in ((3600, '%m-%d %H:%M'), (86400, '%m-%d')):
+        assert history.timeline(bucket_seconds, fmt=fmt) == timeline_labels(batch.timestamp, bucket_seconds, fmt=fmt)
+    store.close()
@@ -0,0 +1,118 @@
+import random
+import sys
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks.generator import generate_logs
+from app.events import DEFAULT_SITE, DropEventBatch, DropEventBatchBuilder, MISSING_TS, iso_to_epoch_ms, iso_to_epoch_ms_array
+from app.normalizer import normalize_logs
+from app.utils import parse_firewall_drops, parse_drop_batch
+from tests.conftest import mutate, uxg_logs
+
+
+def _without_raw(events):
+    return [{k: v for k, v in e.items() if k != 'raw_message'} for e in events]
+
+
+def test_batch_round_trips_parsed_events():
+    raw_logs = uxg_logs(500)
+    parsed, stats = parse_firewall_drops(raw_logs)
+    batch, batch_stats = parse_drop_batch(raw_logs)
+
+    assert len(batch) == len(parsed)
+    assert batch.to_events() == _without_raw(parsed)
+    assert batch_stats == stats
+
+
+def test_batch_keeps_odd_lines_but_drops_non_ipv4_addresses():
+    rnd = random.Random(3)
+    raw_logs = [{'timestamp': '2026-01-22T21:44:47.000Z', 'message': mutate(rnd)} for _ in range(500)]
+    parsed, _ = parse_firewall_drops(raw_logs)
+    batch, _ = parse_drop_batch(raw_logs)
+
+    assert len(batch) == len(parsed)
+    for event, expected in zip(batch.iter_events(), parsed):
+        assert event['dst_port'] == expected['dst_port'] and event['proto'] == expected['proto']
+        assert event['src_ip'] in (expected['src_ip'], None)
+
+
+def test_batch_consumers_match_dict_consumers():
+    raw_logs = uxg_logs(1000)
+    parsed, _ = parse_firewall_drops(raw_logs)
+    batch, _ = parse_drop_batch(raw_logs)
+    assert normalize_logs(batch, exclude_ports=set()) == normalize_logs(parsed, exclude_ports=set())
+    assert normalize_logs(batch) == normalize_logs(parsed)
+
+
+def test_non_ipv4_sources_count_under_unknown_on_both_paths():
+    raw_logs = generate_logs(3000, seed=5, end=1769118287.0, malformed_ratio=0.3)
+    raw_logs += [{'timestamp': '2026-01-22T21:44:47.000Z',
+                  'message': f'[WAN_LOCAL-D-40000] SRC=::ffff:5.1.2.{i} DST=70.24.240.148 PROTO=TCP SPT=4000 DPT=22'}
+                 for i in range(50)]
+    parsed, dict_stats = parse_firewall_drops(raw_logs)
+    batch, batch_stats = parse_drop_batch(raw_logs)
+
+    assert batch_stats == dict_stats
+    assert 'unknown' in batch_stats['top_src_subnets'] and '0.0.0.0/24' not in batch_stats['top_src_subnets']
+    assert normalize_logs(batch) == normalize_logs(parsed)
+
+
+def test_builder_converts_each_column_in_one_pass():
+    builder = DropEventBatchBuilder()
+    assert len(builder.build()) == 0 and builder.build().site_values == (DEFAULT_SITE,)
+    for src, sport, proto in (('5.1.2.3', 40000, 'TCP'), ('::ffff:5.1.2.3', None, 'ICMP'), ('5.1.2.3', 0, 'TCP'),
+                              ('256.1.1.1', 22, 'UDP')):
+        builder.append('2026-01-22T21:44:47.000Z', '40000', 'd', src, '70.24.240.148', proto, sport, 22)
+    batch = builder.build()
+    assert [e['src_ip'] for e in batch.iter_events()] == ['5.1.2.3', None, '5.1.2.3', None]
+    assert [e['src_port'] for e in batch.iter_events()] == [40000, None, 0, 22]
+    assert batch.proto_values == ('TCP', 'ICMP', 'UDP') and batch.proto.tolist() == [0, 1, 0, 2]
+    assert batch.rule_id_values == ('40000',) and (batch.dst_ip == 0x4618F094).all()
+
+
+def test_slice_and_concat_remap_dictionaries():
+    a = DropEventBatch.from_events([
+        {'timestamp': '2026-01-22T21:00:00.000Z', 'rule_id': '40000', 'descr': 'd', 'src_ip': '1.2.3.4',
+         'dst_ip': '5.6.7.8', 'proto': 'UDP', 'src_port': 1, 'dst_port': 2},
+    ])
+    b = DropEventBatch.from_events([
+        {'timestamp': None, 'rule_id': '40001', 'descr': 'd', 'src_ip': '9.9.9.9',
+         'dst_ip': '5.6.7.8', 'proto': 'TCP', 'src_port': None, 'dst_port': 22},
+        {'timestamp': '2026-01-22T22:00:00.000Z', 'rule_id': '40000', 'descr': 'd', 'src_ip': '1.2.3.5',
+         'dst_ip': '5.6.7.8', 'proto': 'UDP', 'src_port': 3, 'dst_port': 4},
+    ])
+    merged = DropEventBatch.concat([a, b])
+    assert [e['proto'] for e in merged.iter_events()] == ['UDP', 'TCP', 'UDP']
+    assert [e['rule_id'] for e in merged.iter_events()] == ['40000', '40001', '40000']
+    assert merged.timestamp[1] == MISSING_TS
+    assert merged[1:].to_events() == b.to_events()
+    assert merged[merged.has_src_port].src_ip.tolist() == [0x01020304, 0x01020305]
+    assert np.shares_memory(merged[1:].src_ip, merged.src_ip)  # slices are views
+
+
+def test_iso_to_epoch_ms():
+    assert iso_to_epoch_ms('2026-01-22T21:44:47.123Z') == 1769118287123
+    assert iso_to_epoch_ms('not a time') == MISSING_TS
+
+
+def test_batch_is_an_order_of_magnitude_smaller():
+    raw_logs = uxg_logs(2000)
+    parsed, _ = parse_firewall_drops(raw_logs)
+    batch, _ = parse_drop_batch(raw_logs)
+
+    dict_bytes = sum(sys.getsizeof(e) + sum(sys.getsizeof(v) for v in e.values()) for e in parsed)
+    print(f"dicts: {dict_bytes / len(parsed):.0f} B/event, batch: {batch.nbytes / len(batch):.0f} B/event")
+    assert dict_bytes >= 10 * batch.nbytes
+
+
+def test_vectorized_iso_parsing_matches_scalar():
+    rnd = random.Random(7)
+    values = [datetime.fromtimestamp(rnd.randrange(0, 4 * 10**12) / 1000, timezone.utc)
+              .strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z' for _ in range(2000)]
+    assert iso_to_epoch_ms_array(values).tolist() == [iso_to_epoch_ms(v) for v in values]
+
+    odd = ['2024-02-29T00:00:00.000Z', '2026-02-29T00:00:00.000Z', '2026-01-22T24:00:00.000Z',
+           '2026-01-22T21:44:60.000Z', '2026-01-22T21:44:47.000+00:00', '2026-01-22 21:44:47.000Z',
+           '2026-01-22T21:44:4é.000Z', None, '', 1769118287000]
+    expected = [v if isinstance(v, int) else iso_to_epoch_ms(v) for v in odd]
+    assert iso_to_epoch_ms_array(odd).tolist() == expected
+    assert expected[0] != MISSING_TS and expected[1] == MISSING_TS
@@ -0,0 +1,121 @@
+import json
+import time
+import pytest
+from app.live_feed import LiveDropFeed
+
+
+def _state(total, labels=('10:00', '11:00'), data=None, ports=None):
+    return {'total_blocks': total, 'top_subnets': [{'subnet': '1.2.3.0/24', 'count': total}],
+            'top_ports': ports or {22: total}, 'timeline_labels': list(labels),
+            'timeline_data': list(data or [0, total])}
+
+
+def _parse(message):
+    fields = dict(line.split(': ', 1) for line in message.decode().strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_state_then_compact_deltas():
+    feed = LiveDropFeed(None)
+    sub = feed.subscribe(start=False)
+    assert feed.publish(_state(5)) is None   # no base yet: everyone gets the full state
+    event, data = _parse(sub.next(0))
+    assert event == 'state' and data['seq'] == 1 and data['total_blocks'] == 5
+
+    delta = feed.publish(_state(7))
+    event, data = _parse(sub.next(0))
+    assert event == 'delta' and data == json.loads(json.dumps(delta))
+    assert (data['seq'], data['since']) == (2, 1)
+    assert data['changed'] == {'total_blocks': 7, 'top_subnets': [{'subnet': '1.2.3.0/24', 'count': 7}],
+                               'top_ports': {'22': 7}}
+    assert data['timeline'] == {'drop': 0, 'keep': 1, 'labels': ['11:00'], 'data': [7]}
+
+    assert feed.publish(_state(7)) is None   # nothing new: nothing sent
+    assert sub.next(0) is None
+
+    late = feed.subscribe(start=False)      # joins with the current state
+    assert _parse(late.next(0)) == ('state', {'seq': 2, **json.loads(json.dumps(_state(7)))})
+
+
+def test_fan_out_encodes_once_per_tick():
+    feed = LiveDropFeed(None)
+    subs = [feed.subscribe(start=False) for _ in range(2000)]
+    feed.publish(_state(1))
+    for sub in subs:
+        sub.next(0)
+
+    feed.publish(_state(2))
+    messages = [sub.next(0) for sub in subs]
+    assert all(m is messages[0] for m in messages)   # the same encoded bytes for every viewer
+
+
+def test_slow_consumer_is_coalesced_and_stalled_one_dropped():
+    clock = FakeClock()
+    feed = LiveDropFeed(None, max_queue=4, stall_timeout=60, clock=clock)
+    slow = feed.subscribe(start=False)
+    for total in range(1, 11):
+        feed.publish(_state(total, labels=[f"{h:02d}:00" for h in range(total, total + 2)]))
+    assert len(slow.queue) <= 4
+    assert feed.stats['coalesced'] >= 1
+    # Reading the backlog still ends at the latest state
+    messages = [_parse(slow.next(0)) for _ in range(len(slow.queue))]
+    state = next(data for event, data in messages if event == 'state')
+    for event, data in messages[messages.index(('state', state)) + 1:]:
+        state.update(data['changed'])
+    assert state['total_blocks'] == 10
+
+    stalled = feed.subscribe(start=False)
+    clock.now = 120
+    slow.next(0)
+    for total in range(11, 20):
+        feed.publish(_state(total))
+    assert stalled.closed and feed.stats['dropped'] == 1
+    assert list(stalled) == []
+    assert not slow.closed and len(feed) == 1
+
+
+def test_producer_pushes_deltas_and_stops_when_idle():
+    totals = iter(range(1, 1000))
+    feed = LiveDropFeed(lambda: _state(next(totals)), interval=0.05)
+    stream = iter(feed.subscribe())
+    assert _parse(next(stream))[0] == 'state'
+    event, data = _parse(next(stream))
+    assert event == 'delta' and data['changed']['total_blocks'] == 2
+    stream.close()
+    assert len(feed) == 0
+    time.sleep(0.15)
+    assert feed._thread is None
+
+
+@pytest.mark.benchmark
+def test_producer_pushes_within_one_poll_interval():
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    totals = iter(range(1, 1000))
+    feed = LiveDropFeed(lambda: _state(next(totals)), interval=0.05)
+    stream = iter(feed.subscribe())
+    started = time.monotonic()
+    next(stream)
+    next(stream)
+    assert time.monotonic() - started < 1
+    stream.close()
+
+
+def test_live_endpoint_streams_events(monkeypatch):
+    import app.__main__ as server
+    feed = LiveDropFeed(lambda: _state(3), interval=0.05)
+    monkeypatch.setattr(server, 'live_feed', feed)
+    response = server.app.test_client().get('/api/live', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    event, data = _parse(next(iter(response.response)))
+    assert event == 'state' and data['total_blocks'] == 3
+    response.close()
+    assert len(feed) == 0
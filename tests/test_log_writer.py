@@ -0,0 +1,89 @@
+import json
+import time
+import pytest
+from app import log_writer
+from app.log_writer import BufferedJsonLog
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_are_batched_json_lines(tmp_path):
+    log = BufferedJsonLog(str(tmp_path / 'events.jsonl'), flush_interval=60)
+    log.log('audio_delta', bytes=960)
+    log.log('xai_json', message='{"type": "response.done"}')
+    assert not (tmp_path / 'events.jsonl').exists()
+
+    assert log.flush() == 2
+    records = _records(tmp_path / 'events.jsonl')
+    assert [r['event'] for r in records] == ['audio_delta', 'xai_json']
+    assert records[0]['bytes'] == 960 and records[1]['message'] == '{"type": "response.done"}'
+    assert 'T' in records[0]['ts']
+    log.close()
+
+
+def test_background_thread_flushes(tmp_path):
+    log = BufferedJsonLog(str(tmp_path / 'events.jsonl'), flush_interval=0.01)
+    log.log('client_connected')
+    deadline = time.time() + 2
+    while not (tmp_path / 'events.jsonl').exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert _records(tmp_path / 'events.jsonl')[0]['event'] == 'client_connected'
+    log.close()
+    assert log._thread is None
+
+
+def test_size_rotation_keeps_backups(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    log = BufferedJsonLog(str(path), max_bytes=400, backups=2, flush_interval=60)
+    for i in range(12):
+        log.log('tick', i=i, pad='x' * 60)
+        log.flush()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['events.jsonl', 'events.jsonl.1', 'events.jsonl.2']
+    assert all(p.stat().st_size <= 400 for p in tmp_path.iterdir())
+    assert _records(path)[-1]['i'] == 11
+    log.close()
+
+
+def test_backlog_is_bounded(tmp_path):
+    log = BufferedJsonLog(str(tmp_path / 'events.jsonl'), flush_interval=60, max_pending=5)
+    for i in range(8):
+        log.log('tick', i=i)
+    assert log.dropped == 3
+    log.flush()
+    assert [r['i'] for r in _records(tmp_path / 'events.jsonl')] == [0, 1, 2, 3, 4]
+    log.close()
+
+
+def test_log_does_no_io_and_flush_opens_the_file_once(tmp_path, monkeypatch):
+    opened = []
+    monkeypatch.setattr(log_writer, 'open', lambda *a, **kw: opened.append(a) or open(*a, **kw), raising=False)
+    log = BufferedJsonLog(str(tmp_path / 'events.jsonl'), flush_interval=60)
+    for _ in range(1000):
+        log.log('audio_delta', bytes=960)
+    assert opened == []
+    assert log.flush() == 1000 and len(opened) == 1
+    log.close()
+
+
+@pytest.mark.benchmark
+def test_per_event_overhead(tmp_path):
+    """Wall-clock check (opt-in with `pytest -m benchmark`): log() stays far below a file append."""
+    n = 50000
+    log = BufferedJsonLog(str(tmp_path / 'events.jsonl'), flush_interval=60, max_pending=n)
+    log.log('warmup')
+    log.flush()
+
+    started = time.perf_counter()
+    for _ in range(n):
+        log.log('audio_delta', bytes=960)
+    buffered_us = (time.perf_counter() - started) / n * 1e6
+
+    started = time.perf_counter()
+    for _ in range(2000):
+        with open(tmp_path / 'direct.txt', 'a') as f:
+            f.write("[2026-01-22 10:00:00] xAI audio delta decoded (960 bytes)\n")
+    direct_us = (time.perf_counter() - started) / 2000 * 1e6
+    assert buffered_us < direct_us
+    log.close()
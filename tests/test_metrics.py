@@ -0,0 +1,90 @@
+import time
+import pytest
+from app.metrics import MetricsRegistry, STAGE_SECONDS, stage
+from app.data_access import DropDataAccess
+from tests.conftest import stamped_logs
+
+
+def test_text_format():
+    registry = MetricsRegistry()
+    requests_total = registry.counter('requests_total', "Requests served", ['route'])
+    ratio = registry.gauge('match_ratio', "Matched share")
+    latency = registry.histogram('latency_seconds', "Latency", ['stage'], buckets=(0.1, 1))
+    requests_total.inc(route='/')
+    requests_total.inc(2, route='/api/"x"')
+    ratio.set(0.5)
+    for seconds in (0.05, 0.1, 0.7, 3):
+        latency.observe(seconds, stage='parse')
+
+    assert registry.render() == '\n'.join([
+        '# HELP requests_total Requests served',
+        '# TYPE requests_total counter',
+        'requests_total{route="/"} 1',
+        'requests_total{route="/api/\\"x\\""} 2',
+        '# HELP match_ratio Matched share',
+        '# TYPE match_ratio gauge',
+        'match_ratio 0.5',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{stage="parse",le="0.1"} 2',
+        'latency_seconds_bucket{stage="parse",le="1"} 3',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'latency_seconds_sum{stage="parse"} 3.85',
+        'latency_seconds_count{stage="parse"} 4',
+    ]) + '\n'
+
+    with pytest.raises(ValueError):
+        requests_total.inc(path='/')
+    with pytest.raises(ValueError):
+        registry.counter('requests_total', "again")
+
+
+def test_stage_records_failures_too():
+    before = STAGE_SECONDS.count(stage='test_failing')
+    with pytest.raises(RuntimeError):
+        with stage('test_failing'):
+            raise RuntimeError("boom")
+    assert STAGE_SECONDS.count(stage='test_failing') == before + 1
+
+
+def test_stage_records_one_observation_per_block():
+    before = STAGE_SECONDS.count(stage='test_counted')
+    for _ in range(1000):
+        with stage('test_counted'):
+            pass
+    assert STAGE_SECONDS.count(stage='test_counted') == before + 1000
+
+
+@pytest.mark.benchmark
+def test_recording_overhead():
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    n = 100_000
+    started = time.perf_counter()
+    for _ in range(n):
+        with stage('test_overhead'):
+            pass
+    assert (time.perf_counter() - started) / n < 20e-6
+
+
+def test_metrics_endpoint_after_a_dashboard_build(monkeypatch):
+    import app.__main__ as server
+    logs = stamped_logs(300, int(time.time() * 1000), seed=2)
+    logs.append({'id': 'x', 'timestamp': logs[0]['timestamp'], 'message': 'not a drop'})
+
+    class Feed:
+        def __init__(self, **kwargs):
+            self.cutoff = None
+
+        def poll(self):
+            return logs
+
+    monkeypatch.setattr(server, 'drop_data', DropDataAccess(fetcher_factory=Feed))
+    server.build_dashboard_data()
+
+    response = server.app.test_client().get('/metrics')
+    assert response.status_code == 200 and response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.text
+    for name in ('parse', 'stats', 'timeline'):
+        assert f'dashboard_stage_seconds_count{{stage="{name}"}}' in text
+    assert f"drop_parse_match_ratio {300 / 301!r}" in text
+    assert '# TYPE ai_tokens_total counter' in text
@@ -1,5 +1,11 @@
+import re
 import pytest
-from app.normalizer import normalize_logs
+from benchmarks.generator import generate_logs
+from app.normalizer import StreamingNormalizer, normalize_logs
+from app.tokens import estimate_tokens
+from app.utils import build_drop_batch, parse_firewall_drops
+from tests.conftest import NOW, uxg_logs
+
 
 @pytest.fixture
 def sample_parsed_logs():
@@ -43,4 +49,92 @@ def test_normalize_logs_threat_level():
 def test_normalize_logs_empty_input():
     condensed = normalize_logs([])
     assert "Total normalized events: 0 (from 0 raw)" in condensed
-    assert "Threat score total: 0" in condensed
\ No newline at end of file
+    assert "Threat score total: 0" in condensed
+
+def _events(n, seed=0, **mix):
+    """Parsed drop events from the benchmark generator (some ICMP, some unreadable sources)."""
+    return parse_firewall_drops(generate_logs(n, seed=seed, end=NOW, **mix))[0]
+
+
+@pytest.mark.parametrize("exclude_ports", [{51413}, set()])
+def test_streaming_normalizer_matches_normalize_logs(exclude_ports):
+    events = _events(3000, seed=7)
+    expected = normalize_logs(events, max_groups=30, exclude_ports=exclude_ports)
+
+    streamed = StreamingNormalizer(exclude_ports).update(e for e in events)  # a generator
+    assert streamed.render(max_groups=30) == expected
+
+    # Per-worker partials, merged in stream order
+    parts = [StreamingNormalizer(exclude_ports).update(events[i:i + 700]) for i in range(0, len(events), 700)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.render(max_groups=30) == expected
+    assert merged.render(max_groups=3) == normalize_logs(events, max_groups=3, exclude_ports=exclude_ports)
+
+
+def test_streaming_normalizer_accepts_batches_and_mixed_partials():
+    raw_logs = uxg_logs(1200, seed=2)
+    parsed, _ = parse_firewall_drops(raw_logs)
+    batch = build_drop_batch(raw_logs)
+    expected = normalize_logs(parsed)
+
+    assert normalize_logs(batch) == expected
+    assert StreamingNormalizer().update(batch).render() == expected
+
+    mixed = StreamingNormalizer().update(batch[:500]).merge(StreamingNormalizer().update(parsed[500:]))
+    assert mixed.render() == expected
+
+
+def test_streaming_normalizer_keeps_counts_not_events():
+    n = StreamingNormalizer(exclude_ports=set())
+    n.update({'src_ip': '10.0.0.1', 'dst_port': 22, 'proto': 'TCP'} for _ in range(100000))
+    assert n.group_counts == {(22, 'TCP'): 100000}
+    assert n.subnet_counts == {(22, 'TCP'): {'10.0.0.0/24': 100000}}
+    assert n.render().startswith("100000 TCP probes on DPT=22 (MEDIUM)\n  └─ 100000 from 10.0.0.0/24")
+
+
+def test_streaming_normalizer_empty():
+    assert StreamingNormalizer().render() == normalize_logs([])
+
+
+@pytest.fixture(scope='module')
+def attack_day():
+    # Scanners hitting every port: thousands of small groups plus a few big ones
+    return _events(10000, seed=3) + _events(10000, seed=4, port_mix={None: 1}, proto_mix={'TCP': 1})
+
+
+@pytest.mark.parametrize("budget", [60, 200, 800, 3000])
+def test_token_budget_bounds_the_output(attack_day, budget):
+    text = normalize_logs(attack_day, max_groups=None, token_budget=budget)
+    assert estimate_tokens(text) <= budget
+
+    total = int(re.search(r"Total normalized events: (\d+)", text).group(1))
+    shown = sum(int(m) for m in re.findall(r"^(\d+) \w+ probes on", text, re.M))
+    folded = re.search(r"^(\d+) other ports: (\d+) probes", text, re.M)
+    assert folded and shown + int(folded.group(2)) == total
+
+
+def test_budget_ranks_by_threat_and_grows_with_the_budget(attack_day):
+    events = ([{'src_ip': '1.1.1.1', 'dst_port': 8080, 'proto': 'TCP'}] * 50
+              + [{'src_ip': '2.2.2.2', 'dst_port': 3389, 'proto': 'TCP'}] * 10
+              + [{'src_ip': '3.3.3.3', 'dst_port': 80, 'proto': 'TCP'}] * 20)
+    text = normalize_logs(events, token_budget=1000)
+    # 10 x weight 10 outranks 50 x 1; nothing folded when everything fits
+    assert text.index("DPT=3389") < text.index("DPT=8080") < text.index("DPT=80 ")
+    assert "other ports" not in text
+
+    sizes = [len(normalize_logs(attack_day, max_groups=None, token_budget=b).splitlines()) for b in (100, 400, 1600)]
+    assert sizes == sorted(sizes) and sizes[0] < sizes[-1]
+    capped = normalize_logs(attack_day, max_groups=2, token_budget=5000)
+    assert len(re.findall(r"probes on DPT", capped)) == 2 and "other ports" in capped
+
+
+def test_budget_is_the_same_for_dicts_batches_and_streams():
+    raw_logs = uxg_logs(1500, seed=5)
+    parsed, _ = parse_firewall_drops(raw_logs)
+    expected = normalize_logs(parsed, max_groups=None, token_budget=150)
+    assert normalize_logs(build_drop_batch(raw_logs), max_groups=None, token_budget=150) == expected
+    assert StreamingNormalizer().update(parsed).render(max_groups=None, token_budget=150) == expected
+    # A budget too small for any line still returns the totals
+    assert normalize_logs(parsed, token_budget=5).startswith("\nTotal normalized events")
@@ -0,0 +1,76 @@
+import random
+import pytest
+import app.parallel_parse as parallel_parse
+from app.parallel_parse import benchmark, build_drop_batch_parallel, parse_drop_batch_parallel
+from app.stats import compute_stats
+from app.utils import build_drop_batch, parse_drop_batch
+from tests.conftest import mutate, uxg_logs
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pools():
+    yield
+    parallel_parse.shutdown_pools()
+
+
+def _corpus(n):
+    logs = uxg_logs(n, seed=4)
+    rnd = random.Random(4)
+    for i, log in enumerate(logs):
+        log['id'] = f"m{i}"
+        if i % 7 == 0:
+            log['message'] = mutate(rnd)   # odd layouts take the regex path
+        if i % 11 == 0:
+            log['message'] = 'unrelated line'
+        if i % 2:
+            log['site'] = 'lab'
+    return logs
+
+
+def test_parallel_parse_matches_serial_in_order():
+    logs = _corpus(5000)
+    serial_keys, parallel_keys = [], []
+    expected = build_drop_batch(logs, keys=serial_keys)
+    batch, stats = parse_drop_batch_parallel(logs, workers=2, keys=parallel_keys, chunk_size=700, serial_below=0)
+
+    assert batch.to_events() == expected.to_events()
+    assert [batch.site_values[c] for c in batch.site.tolist()] == [expected.site_values[c] for c in expected.site.tolist()]
+    assert (batch.raw_len == expected.raw_len).all()
+    assert parallel_keys == serial_keys
+    assert stats == compute_stats(expected)
+
+
+def test_small_inputs_stay_serial(monkeypatch):
+    def no_pool(workers):
+        raise AssertionError("pool used below the threshold")
+
+    monkeypatch.setattr(parallel_parse, '_pool', no_pool)
+    logs = _corpus(500)
+    assert build_drop_batch_parallel(logs, workers=8, serial_below=1000).to_events() == build_drop_batch(logs).to_events()
+    assert parse_drop_batch_parallel(logs, workers=1, serial_below=0)[1] == parse_drop_batch(logs)[1]
+
+
+def test_speedup_report():
+    logs = _corpus(40_000)
+    timings = benchmark(logs, (1, 2, 4), repeat=1, chunk_size=10_000)
+    assert set(timings) == {1, 2, 4} and all(s > 0 for s in timings.values())
+
+
+def test_data_access_parses_large_deltas_in_workers(monkeypatch):
+    from app.data_access import DropDataAccess
+    calls = []
+    real = parallel_parse._parse_chunks
+    monkeypatch.setattr(parallel_parse, '_parse_chunks', lambda *a: calls.append(a[1]) or real(*a))
+    logs = _corpus(3000)
+
+    class Feed:
+        def __init__(self, **kwargs):
+            self.cutoff = None
+
+        def poll(self):
+            return logs
+
+    access = DropDataAccess(fetcher_factory=Feed, parse_workers=2, parse_serial_below=1000)
+    batch, stats = access.get_drops()
+    assert calls == [2]
+    assert stats == compute_stats(build_drop_batch(logs)) and len(batch) == stats['total_blocks']
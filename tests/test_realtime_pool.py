@@ -0,0 +1,132 @@
+import asyncio
+import base64
+import json
+import time
+import pytest
+import websockets
+from app.realtime_pool import RealtimeSessionPool
+
+HANDSHAKE_DELAY = 0.1  # stands in for the TLS + WebSocket handshake to api.x.ai
+SESSION = {"voice": "ara"}
+
+
+async def _stand_in(ws):
+    """Local realtime server: acknowledges session.update, speaks one delta per response.create."""
+    ws.server.accepted.append(ws)
+    async for msg in ws:
+        event = json.loads(msg)
+        if event['type'] == 'session.update':
+            await asyncio.sleep(0.02)
+            await ws.send(json.dumps({'type': 'session.updated', 'session': event['session']}))
+        elif event['type'] == 'response.create':
+            await ws.send(json.dumps({'type': 'response.output_audio.delta',
+                                      'delta': base64.b64encode(b'\x00' * 960).decode()}))
+            await ws.send(json.dumps({'type': 'response.done'}))
+
+
+async def _slow_handshake(connection, request):
+    await asyncio.sleep(HANDSHAKE_DELAY)
+
+
+class StandIn:
+    async def __aenter__(self):
+        self.server = await websockets.serve(_stand_in, '127.0.0.1', 0, process_request=_slow_handshake)
+        self.server.accepted = []
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _time_to_first_audio(pool):
+    started = time.perf_counter()
+    ws = await pool.acquire()
+    try:
+        await ws.send(json.dumps({'type': 'conversation.item.create', 'item': {'type': 'message'}}))
+        await ws.send(json.dumps({'type': 'response.create'}))
+        async for msg in ws:
+            if json.loads(msg)['type'] == 'response.output_audio.delta':
+                return time.perf_counter() - started
+    finally:
+        await ws.close()
+
+
+async def _wait_filled(pool, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while len(pool) < pool.size and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    assert len(pool) == pool.size
+
+
+async def _cold_then_warm(runs=3):
+    """Time to first audio for `runs` cold acquires, then `runs` from the filled pool."""
+    async with StandIn() as stand_in:
+        pool = RealtimeSessionPool(stand_in.url, SESSION, lambda: 'test-key', size=2)
+        cold = [await _time_to_first_audio(pool) for _ in range(runs)]
+
+        pool.start()
+        warm = []
+        for _ in range(runs):
+            await _wait_filled(pool)
+            warm.append(await _time_to_first_audio(pool))
+        await pool.close()
+        return cold, warm, pool.stats
+
+
+def test_started_pool_serves_warm_sessions():
+    _, _, stats = asyncio.run(_cold_then_warm())
+    assert stats['cold'] == 3 and stats['warm'] == 3
+
+
+@pytest.mark.benchmark
+def test_warm_session_cuts_time_to_first_audio():
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    cold, warm, _ = asyncio.run(_cold_then_warm())
+    assert max(warm) < min(cold) - HANDSHAKE_DELAY / 2
+
+
+def test_health_check_replaces_dead_and_expired_sessions():
+    async def run():
+        async with StandIn() as stand_in:
+            now = [0.0]
+            pool = RealtimeSessionPool(stand_in.url, SESSION, lambda: 'test-key', size=2,
+                                       max_age=60, clock=lambda: now[0])
+            await pool._fill()
+            assert len(pool) == 2
+
+            await stand_in.server.accepted[0].close()  # server drops one idle session
+            await asyncio.sleep(0.05)
+            await pool.check()
+            assert (len(pool), pool.stats['replaced']) == (1, 1)
+
+            await pool._fill()
+            now[0] = 61                                # every idle session has expired
+            await pool.check()
+            assert (len(pool), pool.stats['replaced']) == (0, 3)
+
+            await pool._fill()
+            ws = await pool.acquire()
+            assert json.loads(await ws.recv()) == {'type': 'session.updated', 'session': SESSION}
+            await ws.close()
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_acquire_falls_back_to_fresh_connection_and_skips_expired():
+    async def run():
+        async with StandIn() as stand_in:
+            now = [0.0]
+            pool = RealtimeSessionPool(stand_in.url, SESSION, lambda: 'test-key', size=1,
+                                       max_age=60, clock=lambda: now[0])
+            await pool._fill()
+            now[0] = 120
+            ws = await pool.acquire()
+            await ws.close()
+            await pool.close()
+            return pool.stats
+
+    stats = asyncio.run(run())
+    assert (stats['warm'], stats['cold'], stats['replaced']) == (0, 1, 1)
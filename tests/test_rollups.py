@@ -0,0 +1,127 @@
+import time
+from datetime import timezone
+import numpy as np
+import pytest
+from benchmarks.generator import generate_logs
+import app.__main__ as server
+from app.data_access import DropDataAccess
+from app.event_store import DropEventStore
+from app.rollups import DropRollups, parse_range
+from app.utils import build_drop_batch
+from tests.conftest import stamped_logs, OutageFeed
+
+DAY_MS = 86400 * 1000
+NOW_MS = 1769100000000 // DAY_MS * DAY_MS + DAY_MS // 2  # midday UTC
+
+
+def _month_batch(n, seed=0):
+    logs = generate_logs(n, seed=seed, subnets=20000, span_seconds=30 * 86400, end=NOW_MS / 1000, malformed_ratio=0)
+    return build_drop_batch(logs)
+
+
+def test_parse_range():
+    assert [parse_range(r) for r in ('90m', '24h', '30d', '3600')] == [5400, 86400, 30 * 86400, 3600]
+    for bad in ('', '0h', '1w', 'abc'):
+        with pytest.raises(ValueError):
+            parse_range(bad)
+
+
+def test_daily_split_by_top_ports_matches_raw_events():
+    batch = _month_batch(50000)
+    rollups = DropRollups(tz=timezone.utc)
+    for i in range(0, len(batch), 5000):  # incremental deltas
+        rollups.add(batch[i:i + 5000])
+
+    result = rollups.timeline(30 * 86400, bucket='day', group_by='dst_port', top=5, now_ms=NOW_MS)
+    # Served from at most 31 pre-aggregated day buckets, not by rescanning the events
+    day_buckets = rollups.tiers['day'].buckets
+    assert len(day_buckets) <= 31 and sum(len(keys) for keys, _ in day_buckets.values()) < len(batch)
+
+    days = (batch.timestamp // DAY_MS).astype(np.int64)
+    first_day = (NOW_MS - 30 * DAY_MS) // DAY_MS
+    assert result['bucket_start_ms'][0] == first_day * DAY_MS
+    assert result['total'] == [int((days == d).sum()) for d in range(first_day, NOW_MS // DAY_MS + 1)]
+
+    ports, counts = np.unique(batch.dst_port, return_counts=True)
+    top_ports = ports[np.lexsort((ports, -counts))[:5]]
+    assert [s['key'] for s in result['series']] == [str(p) for p in top_ports] + ['other']
+    for series, port in zip(result['series'], top_ports):
+        assert series['data'] == [int(((days == d) & (batch.dst_port == port)).sum())
+                                  for d in range(first_day, NOW_MS // DAY_MS + 1)]
+    assert [sum(column) for column in zip(*(s['data'] for s in result['series']))] == result['total']
+
+
+@pytest.mark.benchmark
+def test_month_timeline_query_is_fast():
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    rollups = DropRollups(tz=timezone.utc)
+    rollups.add(_month_batch(200000))
+    started = time.perf_counter()
+    rollups.timeline(30 * 86400, bucket='day', group_by='dst_port', top=5, now_ms=NOW_MS)
+    assert (time.perf_counter() - started) * 1000 < 100
+
+
+def test_group_by_proto_and_subnet_labels():
+    batch = _month_batch(5000, seed=1)
+    rollups = DropRollups(tz=timezone.utc)
+    rollups.add(batch)
+    by_proto = rollups.timeline(7 * 86400, group_by='proto', now_ms=NOW_MS)
+    assert by_proto['bucket'] == 'hour'
+    assert {s['key'] for s in by_proto['series']} == {'TCP', 'UDP', 'ICMP'}
+
+    by_subnet = rollups.timeline(86400, bucket='hour', group_by='src24', top=1, now_ms=NOW_MS)
+    subnets, counts = np.unique(batch.src_subnet24[batch.timestamp >= NOW_MS - DAY_MS], return_counts=True)
+    top = int(subnets[np.lexsort((subnets, -counts))[0]])
+    assert by_subnet['series'][0]['key'] == f"{top >> 24}.{(top >> 16) & 255}.{(top >> 8) & 255}.0/24"
+
+
+def test_values_past_the_vocabulary_limit_share_an_other_id():
+    batch = _month_batch(2000, seed=3)
+    rollups = DropRollups(tz=timezone.utc, vocab_limits=(1, 0x7FFF))
+    rollups.add(batch)
+    assert rollups.protos == {batch.proto_values[0]: 0}
+    series = rollups.timeline(7 * 86400, group_by='proto', now_ms=NOW_MS)['series']
+    overflow = [p for p in batch.proto_values if p not in rollups.protos]
+    assert overflow and {s['key'] for s in series} == {batch.proto_values[0], 'other proto'}
+
+
+def test_tiers_drop_old_buckets_and_refuse_uncovered_ranges():
+    batch = _month_batch(3000, seed=2)
+    rollups = DropRollups(tz=timezone.utc)
+    rollups.add(batch)
+    assert len(rollups.tiers['minute'].buckets) <= 25 * 60
+    hours = rollups.tiers['hour']
+    assert min(hours.buckets) > hours.head - hours.retention and len(hours.buckets) <= hours.retention
+    assert rollups.pick_tier(2 * 3600) == 'minute'
+    assert rollups.pick_tier(30 * 86400) == 'day'
+    with pytest.raises(ValueError):
+        rollups.pick_tier(30 * 86400, 'hour')
+    with pytest.raises(ValueError):
+        rollups.timeline(86400, group_by='dst_ip')
+
+
+def test_timeline_endpoint_serves_rollups_seeded_from_store(tmp_path, monkeypatch):
+    now_ms = int(time.time() * 1000)
+    store = DropEventStore(str(tmp_path / "drops.db"))
+    logs = stamped_logs(300, now_ms - 60000, step_ms=3600000)
+    first = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(logs, **kw), store=store)
+    first.get_drops(86400)
+    first.get_drops(86400)  # no double counting of the same events
+
+    # A restart: the rollups are rebuilt from disk, including events older than the live 24h
+    restarted = DropDataAccess(fetcher_factory=lambda **kw: OutageFeed(**kw), store=store)
+    monkeypatch.setattr(server, 'drop_data', restarted)
+    client = server.app.test_client()
+
+    response = client.get('/api/timeline?range=30d&bucket=day&group_by=dst_port&top=2')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['bucket'] == 'day' and sum(body['total']) == 300
+    assert len(body['series']) == 3 and body['series'][-1]['key'] == 'other'
+
+    assert sum(client.get('/api/timeline?range=24h').get_json()['total']) in (24, 25)  # whole buckets
+    assert client.get('/api/timeline?range=30d&bucket=minute').status_code == 400
+    assert client.get('/api/timeline?range=soon').status_code == 400
+    assert client.get('/api/timeline?range=24h&group_by=dst_port&top=-1').status_code == 400
+    assert client.get('/api/timeline?range=24h&top=0').status_code == 400
+    store.close()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from app.sketch import CountMinSketch, DropSketch, SpaceSaving
+from app.normalizer import normalize_logs
+from app.stats import compute_stats, port_subnet_breakdown, threat_score, top_counts
+from tests.conftest import zipf_batch
+
+
+def _report(name, estimated, exact, total, capacity):
+    errors = [estimated[k] - exact.get(k, 0) for k in estimated]
+    print(f"\n{name}: max over-estimate {max(errors)} ({max(errors) / total:.4%} of N), "
+          f"bound N/capacity = {total / capacity:.0f}")
+    return errors
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_space_saving_error_on_zipf_scans(seed):
+    batch = zipf_batch(200000, seed)
+    capacity = 512
+    sketch = DropSketch(capacity=capacity)
+    for hour in np.array_split(np.arange(len(batch)), 24):  # per-hour sketches, merged
+        sketch.merge(DropSketch(capacity=capacity).update(batch[hour]))
+    assert len(sketch.subnets) <= capacity and len(sketch.ports) <= capacity  # fixed memory
+
+    subnets, counts = top_counts(batch.src_subnet24)
+    exact_subnets = dict(zip(subnets.tolist(), counts.tolist()))
+    estimated = dict(zip(sketch.subnets.keys.tolist(), sketch.subnets.counts.tolist()))
+    errors = _report("top /24s", estimated, exact_subnets, len(batch), capacity)
+    assert min(errors) >= 0 and max(errors) <= len(batch) / capacity
+
+    exact = compute_stats(batch)
+    approx = sketch.stats()
+    assert approx['total_blocks'] == exact['total_blocks']
+    assert set(approx['top_src_subnets']) == set(exact['top_src_subnets'])
+    assert list(approx['top_dst_ports'])[:5] == list(exact['top_dst_ports'])[:5]
+    for port, count in approx['top_dst_ports'].items():
+        assert 0 <= count - np.count_nonzero(batch.dst_port == port) <= len(batch) / capacity
+
+
+def test_breakdown_matches_exact_heavy_groups():
+    batch = zipf_batch(100000, seed=3, subnets=2000, ports=300)
+    sketch = DropSketch(capacity=512).update(batch)
+
+    exact, exact_total = port_subnet_breakdown(batch, exclude_ports=(), max_groups=5)
+    approx, approx_total = sketch.breakdown(max_groups=5)
+    assert approx_total == exact_total
+    assert [(port, proto) for port, proto, _, _ in approx] == [(port, proto) for port, proto, _, _ in exact]
+    for (_, _, count, subnets), (_, _, exact_count, exact_subnets) in zip(approx, exact):
+        assert 0 <= count - exact_count <= len(batch) / 512
+        assert subnets[0][0] == exact_subnets[0][0]
+
+    excluded_port = approx[0][0]
+    groups, considered = sketch.breakdown(exclude_ports={excluded_port}, max_groups=5)
+    assert excluded_port not in [port for port, _, _, _ in groups]
+    assert considered == len(batch) - np.count_nonzero(batch.dst_port == excluded_port)
+
+
+def test_space_saving_is_exact_below_capacity_and_merges():
+    a = SpaceSaving(10).update([1, 1, 2, 3, 3, 3])
+    b = SpaceSaving(10).update([3, 4])
+    a.merge(b)
+    assert a.top()[0].tolist() == [3, 1, 2, 4]
+    assert a.top()[1].tolist() == [4, 2, 1, 1]
+    assert a.errors.tolist() == [0, 0, 0, 0] and a.total == 8
+    assert a.estimate([3, 99]).tolist() == [4, 0]
+
+
+def test_count_min_bounds_and_merge():
+    rng = np.random.default_rng(5)
+    values = np.minimum(rng.zipf(1.2, 50000), 100000)
+    epsilon, delta = 0.001, 0.01
+    left = CountMinSketch.from_error(epsilon, delta).update(values[:25000])
+    right = CountMinSketch.from_error(epsilon, delta).update(values[25000:])
+    sketch = left.merge(right)
+
+    keys, counts = np.unique(values, return_counts=True)
+    over = sketch.estimate(keys) - counts
+    print(f"\nCount-Min: max over-estimate {over.max()} (bound epsilon*N = {epsilon * len(values):.0f}), "
+          f"{np.mean(over > epsilon * len(values)):.4%} of keys above it")
+    assert over.min() >= 0
+    assert np.mean(over > epsilon * len(values)) <= delta
+
+    with pytest.raises(ValueError):
+        sketch.merge(CountMinSketch(width=64, depth=2))
+
+
+def test_normalizer_condenses_a_sketch_like_the_batch():
+    batch = zipf_batch(20000, seed=5, subnets=50, ports=20)  # few keys: the sketch is exact
+    sketch = DropSketch(capacity=512).update(batch)
+    threat_ports = {22: 5, 3389: 10}
+    assert sketch.threat_score(threat_ports, {51413}) == threat_score(batch, threat_ports, {51413})
+
+    assert normalize_logs(sketch, max_groups=5) == normalize_logs(batch, max_groups=5)
@@ -0,0 +1,122 @@
+from app.snapshot import SnapshotRefresher, payload_delta
+
+
+def test_refresh_publishes_versioned_snapshot():
+    results = [{'total_blocks': 5}, {'total_blocks': 5}, {'total_blocks': 6}]
+    refresher = SnapshotRefresher(lambda: results.pop(0))
+    assert refresher.latest() is None
+
+    snap = refresher.refresh_once()
+    assert snap.version == 1
+    assert snap.payload()['total_blocks'] == 5
+    assert snap.payload()['stale_since'] is None
+
+    assert refresher.refresh_once() is snap  # unchanged data keeps its version (and ETag)
+    assert refresher.refresh_once().version == 2
+
+
+def test_failed_refresh_keeps_last_good_data_marked_stale():
+    results = [{'total_blocks': 5}, RuntimeError("graylog down"), RuntimeError("still down"), {'total_blocks': 7}]
+
+    def build():
+        r = results.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+    refresher = SnapshotRefresher(build)
+    refresher.refresh_once()
+
+    stale = refresher.refresh_once()
+    assert stale.version == 1
+    assert stale.payload()['total_blocks'] == 5
+    assert stale.payload()['stale_since'] is not None
+    assert stale.error == "graylog down"
+
+    # stale_since marks the first failure, not the latest
+    assert refresher.refresh_once().stale_since == stale.stale_since
+
+    fresh = refresher.refresh_once()
+    assert fresh.version == 2
+    assert fresh.stale_since is None
+
+
+def test_first_failure_publishes_fallback_view():
+    def build():
+        raise ValueError("No logs returned from Graylog")
+
+    refresher = SnapshotRefresher(build, fallback_fn=lambda e: {'error': str(e)})
+    snap = refresher.refresh_once()
+    assert snap.payload()['error'] == "No logs returned from Graylog"
+    assert snap.payload()['built_at'] is None
+
+
+def test_background_thread_builds_on_start():
+    refresher = SnapshotRefresher(lambda: {'total_blocks': 1}, interval=60).start()
+    try:
+        snap = refresher.wait_first(timeout=5)
+        assert snap is not None and snap.version == 1
+    finally:
+        refresher.stop(timeout=5)
+
+
+def _dashboard(total, labels, data):
+    return {'total_blocks': total, 'status': {'level': 'Low Activity'},
+            'timeline_labels': labels, 'timeline_data': data}
+
+
+def test_payload_delta_sends_changed_fields_and_timeline_tail():
+    old = _dashboard(10, ['09:00', '10:00', '11:00'], [4, 5, 1])
+    new = _dashboard(14, ['10:00', '11:00', '12:00'], [5, 3, 2])
+    delta = payload_delta(old, new)
+    assert delta['changed'] == {'total_blocks': 14}
+    assert delta['timeline'] == {'drop': 1, 'keep': 1, 'labels': ['11:00', '12:00'], 'data': [3, 2]}
+
+    # Applying it reproduces the new timeline
+    t = delta['timeline']
+    assert old['timeline_labels'][t['drop']:t['drop'] + t['keep']] + t['labels'] == new['timeline_labels']
+    assert old['timeline_data'][t['drop']:t['drop'] + t['keep']] + t['data'] == new['timeline_data']
+
+    assert payload_delta(new, new) == {'changed': {}}
+    unrelated = payload_delta(old, _dashboard(10, ['01-05'], [7]))
+    assert unrelated['changed'] == {'timeline_labels': ['01-05'], 'timeline_data': [7]}
+
+
+def test_delta_since_known_and_expired_versions():
+    results = [_dashboard(1, ['10:00'], [1]), _dashboard(2, ['10:00'], [2]), _dashboard(3, ['10:00', '11:00'], [2, 1])]
+    refresher = SnapshotRefresher(lambda: results.pop(0), history=2)
+    for _ in range(3):
+        refresher.refresh_once()
+
+    delta = refresher.delta_since(2)
+    assert (delta['version'], delta['since']) == (3, 2)
+    assert delta['changed']['total_blocks'] == 3
+    assert delta['timeline'] == {'drop': 0, 'keep': 1, 'labels': ['11:00'], 'data': [1]}
+    assert refresher.delta_since(1) is None   # fell out of the history: client gets a full payload
+    assert refresher.delta_since(3)['changed'] == {}
+
+
+def test_dashboard_endpoint_etag_304_and_since(monkeypatch):
+    import app.__main__ as server
+    results = [_dashboard(5, ['10:00'], [5]), _dashboard(5, ['10:00'], [5]), _dashboard(7, ['10:00', '11:00'], [5, 2])]
+    refresher = SnapshotRefresher(lambda: results.pop(0))
+    monkeypatch.setattr(server, 'dashboard_snapshots', refresher)
+    client = server.app.test_client()
+
+    refresher.refresh_once()
+    first = client.get('/api/dashboard')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.get_json()['version'] == 1 and etag == '"v1"'
+
+    refresher.refresh_once()  # same data: still v1
+    assert client.get('/api/dashboard', headers={'If-None-Match': etag}).status_code == 304
+
+    refresher.refresh_once()
+    changed = client.get('/api/dashboard?since=1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] == '"v2"'
+    body = changed.get_json()
+    assert body['since'] == 1 and body['changed']['total_blocks'] == 7
+    assert body['timeline'] == {'drop': 0, 'keep': 1, 'labels': ['11:00'], 'data': [2]}
+    assert 'top_subnets' not in body['changed']
+
+    assert client.get('/api/dashboard?since=99').get_json()['total_blocks'] == 7  # unknown: full payload
@@ -0,0 +1,219 @@
+import json
+import sqlite3
+import time
+import pytest
+from app.data_access import DropDataAccess
+from app.event_store import DropEventStore
+from app.events import DEFAULT_SITE
+from app.sketch import DropSketch
+from app.sources import GraylogSource, MultiSourceFetcher, load_sources, parse_sources
+from app.stats import compute_stats, site_stats
+from app.utils import IncrementalDropFetcher, build_drop_batch
+from tests.conftest import NOW, SAMPLE_RESPONSE, stamped_logs
+
+SAMPLE_EPOCH = 1769118287.0  # SAMPLE_RAW_LOG's timestamp
+
+
+class ShardFeed:
+    """Per-source stand-in for IncrementalDropFetcher: serves its source's logs once, after `delay` s."""
+    logs = {}
+    delay = {}
+
+    def __init__(self, source, **kwargs):
+        self.source = source
+        self.kwargs = kwargs
+        self.cutoff = None
+        self.resumed = None
+        self._served = False
+
+    def poll(self, now=None):
+        time.sleep(self.delay.get(self.source.label, 0))
+        self.cutoff = NOW - 86400
+        if self._served:
+            return []
+        self._served = True
+        return [dict(log) for log in self.logs[self.source.label]]
+
+    def resume(self, cursor):
+        self.resumed = cursor
+
+    def window(self):
+        return [dict(log) for log in self.logs[self.source.label]]
+
+
+SITES = [GraylogSource('hq', 'http://hq:9000', 't1'), GraylogSource('lab', 'http://lab:9000', 't2', 'stream-7')]
+
+
+@pytest.fixture
+def shards():
+    ShardFeed.logs = {'hq': stamped_logs(300, int(NOW * 1000), step_ms=60000, seed=1, prefix='hq'),
+                      'lab': stamped_logs(100, int(NOW * 1000) - 30000, step_ms=120000, seed=2, prefix='lab')}
+    ShardFeed.delay = {}
+    yield ShardFeed
+
+
+def test_parse_and_load_sources(tmp_path, monkeypatch):
+    monkeypatch.setenv('LAB_TOKEN', 'secret')
+    entries = [{'label': 'hq', 'url': 'http://hq:9000', 'token': 't', 'stream_id': 's1', 'query': 'message:X'},
+               {'label': 'lab', 'url': 'http://lab:9000', 'token_env': 'LAB_TOKEN'}]
+    hq, lab = parse_sources(entries)
+    assert (hq.stream_id, hq.query) == ('s1', 'message:X')
+    assert lab.token == 'secret' and lab.stream_id is None and 'secret' not in repr(lab)
+
+    for bad, match in (([], 'non-empty'), ([{'url': 'u', 'token': 't'}], 'label'),
+                       ([{'label': 'x', 'url': 'u'}], 'token'), ([entries[0], entries[0]], 'unique')):
+        with pytest.raises(ValueError, match=match):
+            parse_sources(bad)
+
+    monkeypatch.delenv('GRAYLOG_SOURCES', raising=False)
+    assert load_sources() is None
+    path = tmp_path / 'sources.json'
+    path.write_text(json.dumps(entries))
+    monkeypatch.setenv('GRAYLOG_SOURCES', str(path))
+    assert [s.label for s in load_sources()] == ['hq', 'lab']
+    monkeypatch.setenv('GRAYLOG_SOURCES', json.dumps(entries[:1]))
+    assert load_sources() == [hq]
+
+
+def test_source_picks_server_token_and_stream(requests_mock, monkeypatch):
+    monkeypatch.delenv('GRAYLOG_URL', raising=False)
+    route = requests_mock.get('http://lab:9000/api/search/universal/relative', json=SAMPLE_RESPONSE)
+    feed = IncrementalDropFetcher(range_seconds=3600, limit=10, source=SITES[1])
+    assert len(feed.poll(now=SAMPLE_EPOCH + 60)) == 1  # the two sample messages share one id
+    assert route.last_request.qs['filter'] == ['streams:stream-7']
+    assert route.last_request.headers['Authorization'].startswith('Basic ')
+
+
+def test_slow_source_only_delays_its_own_events(shards):
+    shards.delay = {'lab': 0.5}
+    fetcher = MultiSourceFetcher(SITES, shard_wait=0.05, fetcher_factory=ShardFeed)
+    assert {label: f.kwargs['query'] for label, f in fetcher.fetchers.items()} == {'hq': SITES[0].query, 'lab': SITES[1].query}
+
+    first = fetcher.poll()
+    assert {log['site'] for log in first} == {'hq'} and fetcher.lagging == {'lab'}
+
+    time.sleep(0.5)
+    second = fetcher.poll()
+    assert len(second) == 100 and {log['site'] for log in second} == {'lab'} and not fetcher.lagging
+
+    fetcher.resume(123.0)
+    assert all(f.resumed == 123.0 for f in fetcher.fetchers.values())
+    window = fetcher.window()
+    assert len(window) == 400
+    assert [log['timestamp'] for log in window] == sorted((log['timestamp'] for log in window), reverse=True)
+
+
+@pytest.mark.benchmark
+def test_slow_source_does_not_hold_up_the_poll(shards):
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    shards.delay = {'lab': 0.5}
+    fetcher = MultiSourceFetcher(SITES, shard_wait=0.05, fetcher_factory=ShardFeed)
+    started = time.monotonic()
+    fetcher.poll()
+    assert time.monotonic() - started < 0.3
+
+
+def test_sites_are_tagged_merged_and_persisted(shards, tmp_path):
+    store = DropEventStore(str(tmp_path / 'drops.db'), clock=lambda: NOW)
+    access = DropDataAccess(ttl=60, store=store,
+                            fetcher_factory=lambda **kw: MultiSourceFetcher(SITES, fetcher_factory=ShardFeed, **kw))
+    batch, stats = access.get_drops(86400)
+    assert len(batch) == 400 and set(batch.site_values) == {'hq', 'lab'}
+    assert (batch.timestamp[:-1] >= batch.timestamp[1:]).all()
+
+    per_site = site_stats(batch)
+    assert list(per_site) == ['hq', 'lab']
+    assert per_site['lab'] == compute_stats(build_drop_batch(shards.logs['lab']))
+    assert sum(s['total_blocks'] for s in per_site.values()) == stats['total_blocks']
+    assert len(batch.for_site('lab')) == 100 and len(batch.for_site('nowhere')) == 0
+
+    stored = store.query(0)
+    assert sorted(stored.site_values) == ['hq', 'lab']
+    assert len(stored.for_site('hq')) == 300
+    store.close()
+
+
+def test_restart_resumes_each_site_from_its_own_newest_event(shards, tmp_path):
+    now_ms = int(time.time() * 1000)
+    # lab was an hour behind hq when the dashboard stopped
+    shards.logs = {'hq': stamped_logs(50, now_ms, seed=1, prefix='hq'), 'lab': stamped_logs(50, now_ms - 3600000, seed=2, prefix='lab')}
+    store = DropEventStore(str(tmp_path / 'drops.db'))
+    first = DropDataAccess(store=store, fetcher_factory=lambda **kw: MultiSourceFetcher(SITES, fetcher_factory=ShardFeed, **kw))
+    first.get_drops(86400)
+    assert store.latest_ts() == store.latest_ts('hq') == now_ms
+    assert store.latest_ts('lab') == now_ms - 3600000 and store.latest_ts('nowhere') is None
+
+    feeds = []
+    second = DropDataAccess(store=store, fetcher_factory=lambda **kw: feeds.append(
+        MultiSourceFetcher(SITES, fetcher_factory=ShardFeed, **kw)) or feeds[-1])
+    second.get_drops(86400)
+    resumed = {label: f.resumed for label, f in feeds[0].fetchers.items()}
+    assert resumed == {'hq': now_ms / 1000, 'lab': (now_ms - 3600000) / 1000}
+    store.close()
+
+
+def test_segments_written_before_sites_read_as_default_site(tmp_path):
+    logs = stamped_logs(50, int(NOW * 1000))
+    keys = []
+    batch = build_drop_batch(logs, keys=keys)
+    store = DropEventStore(str(tmp_path / 'drops.db'), clock=lambda: NOW)
+    store.add(batch, keys)
+    store.close()
+
+    # Strip the site and has_src_ip columns the way an older version wrote the segment
+    db = sqlite3.connect(str(tmp_path / 'drops.db'))
+    vocab, blob, events = db.execute("SELECT vocab, columns, events FROM segments").fetchone()
+    vocab = json.loads(vocab)
+    del vocab['site']
+    db.execute("UPDATE segments SET vocab = ?, columns = ?", (json.dumps(vocab), blob[:-5 * events]))
+    db.commit()
+    db.close()
+
+    legacy = DropEventStore(str(tmp_path / 'drops.db'), clock=lambda: NOW).query(0)
+    assert legacy.site_values == (DEFAULT_SITE,) and (legacy.site == 0).all()
+    assert legacy.to_events() == batch.to_events()
+
+
+def test_dashboard_per_site_view(shards, monkeypatch):
+    import app.__main__ as server
+    now_ms = int(time.time() * 1000)
+    shards.logs = {'hq': stamped_logs(300, now_ms, seed=1, prefix='hq'), 'lab': stamped_logs(100, now_ms - 30000, step_ms=120000, seed=2, prefix='lab')}
+    access = DropDataAccess(ttl=60, fetcher_factory=lambda **kw: MultiSourceFetcher(SITES, fetcher_factory=ShardFeed, **kw))
+    monkeypatch.setattr(server, 'drop_data', access)
+    combined = server.build_dashboard_data()
+    assert [s['site'] for s in combined['sites']] == ['hq', 'lab']
+    assert combined['total_blocks'] == 400
+
+    lab = server.app.test_client().get('/api/dashboard?site=lab').get_json()
+    assert lab['site'] == 'lab' and lab['total_blocks'] == 100
+    assert sum(lab['timeline_data']) == 100 and len(lab['timeline_labels']) == len(lab['timeline_data'])
+
+
+def test_dashboard_sketched_history_per_site(shards, tmp_path, monkeypatch):
+    import app.__main__ as server
+    now_ms = int(time.time() * 1000)
+    shards.logs = {'hq': stamped_logs(300, now_ms, step_ms=1800000, seed=1, prefix='hq'),
+                   'lab': stamped_logs(100, now_ms - 30000, step_ms=3600000, seed=2, prefix='lab')}
+    store = DropEventStore(str(tmp_path / 'drops.db'))
+    access = DropDataAccess(ttl=60, store=store, sketch_threshold=100,
+                            fetcher_factory=lambda **kw: MultiSourceFetcher(SITES, fetcher_factory=ShardFeed, **kw))
+    monkeypatch.setattr(server, 'drop_data', access)
+    access.get_drops(86400)
+
+    week = server.build_dashboard_data(7 * 86400)
+    assert week['total_blocks'] == 400 and sum(week['timeline_data']) == 400
+    assert [(s['site'], s['total_blocks']) for s in week['sites']] == [('hq', 300), ('lab', 100)]
+
+    lab = server.app.test_client().get('/api/dashboard?range=30d&site=lab').get_json()
+    assert lab['total_blocks'] == 100 and sum(lab['timeline_data']) == 100
+    assert lab['top_subnets'][0]['count'] == compute_stats(build_drop_batch(shards.logs['lab']))['top_src_subnets'][
+        lab['top_subnets'][0]['subnet']]
+
+    summarized = []
+    monkeypatch.setattr(server, 'generate_ai_summary', lambda logs, **kw: summarized.append(logs) or {
+        'summary': 's', 'input_tokens': 1, 'output_tokens': 1})
+    client = server.app.test_client()
+    assert client.post('/api/ai-summary?range=7d').get_json()['summary'] == 's'
+    assert isinstance(summarized[0], DropSketch) and len(summarized[0]) == 400
+    assert client.post('/api/ai-summary?range=1y').status_code == 400
+    store.close()
@@ -0,0 +1,27 @@
+import os
+from app.startup_profile import parse_importtime, profile_startup
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |      45000 | site
+import time:       500 |       9000 |     numpy._core
+import time:      3000 |      80000 |   app.utils
+import time:      6000 |     300000 | app.__main__
+"""
+
+
+def test_parse_importtime_keeps_top_two_levels_slowest_first():
+    assert parse_importtime(IMPORTTIME) == [
+        ('app.__main__', 0, 300.0), ('app.utils', 1, 80.0), ('site', 0, 45.0), ('_io', 1, 0.12),
+    ]
+
+
+def test_startup_profile_serves_first_request_without_heavy_imports():
+    env = {k: v for k, v in os.environ.items() if not k.startswith('GRAYLOG')}
+    profile = profile_startup('/no-such-page', env=env)  # 404: no Graylog round trip
+
+    assert profile['status'] == 404
+    assert profile['heavy_modules_loaded_at_import'] == []
+    assert profile['time_to_first_response_ms'] >= profile['app_import_ms'] > 0
+    assert any(name == 'app.__main__' for name, _, _ in profile['imports'])
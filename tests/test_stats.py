@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+import numpy as np
+import pytest
+from app.normalizer import normalize_logs
+from app.stats import top_counts, compute_stats, port_subnet_breakdown
+from app.utils import parse_firewall_drops, parse_drop_batch
+
+
+def _tied_raw_logs(n, seed):
+    """Few subnets/ports so most_common has lots of ties at the cut-off."""
+    rnd = random.Random(seed)
+    logs = []
+    for _ in range(n):
+        src = f"10.{rnd.randint(0, 2)}.{rnd.randint(0, 4)}.{rnd.randint(1, 254)}"
+        port = rnd.choice([22, 23, 80, 443, 445, 3389, 8443, 51413, 1433, 3306, 5060, 8080])
+        proto = rnd.choice(['TCP', 'UDP'])
+        logs.append({
+            'timestamp': '2026-01-22T21:44:47.000Z',
+            'message': f'[WAN_LOCAL-D-40000] DESCR="d" IN=eth0 OUT= SRC={src} DST=1.1.1.1 '
+                       f'PROTO={proto} SPT=1 DPT={port}'
+        })
+    return logs
+
+
+def test_top_counts_breaks_ties_by_first_occurrence():
+    values = np.array([5, 3, 3, 5, 7, 9, 9, 1])
+    top, counts = top_counts(values, 3)
+    assert list(zip(top.tolist(), counts.tolist())) == Counter(values.tolist()).most_common(3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n", [1, 7, 60, 800])
+def test_vectorized_stats_match_counter_stats(seed, n):
+    raw_logs = _tied_raw_logs(n, seed)
+    _, dict_stats = parse_firewall_drops(raw_logs)
+    batch, batch_stats = parse_drop_batch(raw_logs)
+
+    assert batch_stats == dict_stats
+    assert list(batch_stats['top_src_subnets']) == list(dict_stats['top_src_subnets'])  # same order
+    assert compute_stats(batch[:0])['total_blocks'] == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_groups", [1, 3, 30])
+@pytest.mark.parametrize("exclude_ports", [set(), {51413}, {22, 23}])
+def test_vectorized_normalizer_matches_dict_normalizer(seed, max_groups, exclude_ports):
+    raw_logs = _tied_raw_logs(500, seed)
+    parsed, _ = parse_firewall_drops(raw_logs)
+    batch, _ = parse_drop_batch(raw_logs)
+
+    expected = normalize_logs(parsed, max_groups=max_groups, exclude_ports=exclude_ports)
+    assert normalize_logs(batch, max_groups=max_groups, exclude_ports=exclude_ports) == expected
+
+
+def test_port_subnet_breakdown_all_excluded():
+    batch, _ = parse_drop_batch(_tied_raw_logs(10, 0))
+    assert port_subnet_breakdown(batch, exclude_ports=set(range(65536))) == ([], 0)
@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from unittest.mock import Mock, patch
+import pytest
+from app import utils
+from app.cache import TTLCache
+from app.log_writer import BufferedJsonLog
+from app.utils import generate_ai_summary, summary_cache, summary_cache_key
+
+
+def _grok_response(text="Cached summary."):
+    response = Mock()
+    response.json.return_value = {
+        "choices": [{"message": {"content": text}}],
+        "usage": {"prompt_tokens": 800, "completion_tokens": 120},
+    }
+    response.raise_for_status.return_value = None
+    return response
+
+
+LOGS = [{'raw_message': 'summary cache test log'}]
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv('GROK_API_KEY', 'test-key')
+    monkeypatch.setattr(utils, 'token_log', BufferedJsonLog(str(tmp_path / 'ai_token_log.jsonl')))
+    summary_cache.clear()
+    yield
+    summary_cache.clear()
+
+
+@patch('app.utils.requests.post')
+def test_identical_batch_hits_cache_at_zero_cost(mock_post, tmp_path):
+    mock_post.return_value = _grok_response()
+
+    first = generate_ai_summary(LOGS, use_normalizer=False)
+    second = generate_ai_summary(LOGS, use_normalizer=False)
+
+    assert mock_post.call_count == 1
+    assert first['input_tokens'] == 800 and 'cached' not in first
+    assert second == {'summary': 'Cached summary.', 'input_tokens': 0, 'output_tokens': 0,
+                      'cost_est': 0.0, 'cached': True}
+    utils.token_log.flush()
+    records = [json.loads(line) for line in (tmp_path / 'ai_token_log.jsonl').read_text().splitlines()]
+    assert [(r['input_tokens'], r['cost_est']) for r in records] == [(800, first['cost_est']), (0, 0.0)]
+    key = summary_cache_key(mock_post.call_args.kwargs['json'])
+    assert records[1]['note'] == f"cache hit {key[:12]}"
+
+
+@patch('app.utils.requests.post')
+def test_key_covers_content_prompt_version_and_bypass(mock_post, monkeypatch):
+    mock_post.return_value = _grok_response()
+
+    generate_ai_summary(LOGS, use_normalizer=False)
+    generate_ai_summary([{'raw_message': 'a different log'}], use_normalizer=False)
+    assert mock_post.call_count == 2
+
+    monkeypatch.setattr(utils, 'SUMMARY_PROMPT_VERSION', 2)
+    generate_ai_summary(LOGS, use_normalizer=False)
+    assert mock_post.call_count == 3
+
+    generate_ai_summary(LOGS, use_normalizer=False, use_cache=False)
+    assert mock_post.call_count == 4
+
+
+@patch('app.utils.requests.post')
+def test_failures_are_not_cached(mock_post):
+    import requests
+    mock_post.side_effect = requests.exceptions.ConnectionError("down")
+    assert generate_ai_summary(LOGS, use_normalizer=False)['summary'] == ''
+
+    mock_post.side_effect = None
+    mock_post.return_value = _grok_response()
+    assert generate_ai_summary(LOGS, use_normalizer=False)['summary'] == 'Cached summary.'
+    assert mock_post.call_count == 2
+
+
+@patch('app.utils.requests.post')
+def test_concurrent_identical_requests_make_one_call(mock_post):
+    def slow_post(*args, **kwargs):
+        time.sleep(0.05)
+        return _grok_response()
+    mock_post.side_effect = slow_post
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(generate_ai_summary(LOGS, use_normalizer=False)))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert mock_post.call_count == 1
+    assert {r['summary'] for r in results} == {'Cached summary.'}
+    assert sum(1 for r in results if r.get('cached')) == 5
+    assert sum(r['input_tokens'] for r in results) == 800
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1   # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+def test_ttl_cache_expiry():
+    now = [0.0]
+    cache = TTLCache(ttl=10, clock=lambda: now[0])
+    cache.set('k', 'v')
+    now[0] = 9.9
+    assert cache.get('k') == 'v'
+    now[0] = 10.1
+    assert cache.get('k') is None
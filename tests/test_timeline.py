@@ -0,0 +1,119 @@
+import random
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+import pytest
+from app.data_access import DropWindow
+from app.events import MISSING_TS
+from app.timeline import TimelineRing
+from app.utils import build_drop_batch, parse_drop_batch
+from tests.conftest import uxg_logs
+
+HOUR_MS = 3600 * 1000
+
+
+def _pandas_timeline(epoch_ms, tz):
+    """The dashboard's previous pandas implementation."""
+    df = pd.DataFrame({'timestamp': pd.to_datetime(epoch_ms, unit='ms', utc=True)})
+    df['timestamp'] = df['timestamp'].dt.tz_convert(tz)
+    df['hour'] = df['timestamp'].dt.floor('h')
+    timeline_range = pd.date_range(df['timestamp'].min().floor('h'), df['timestamp'].max().ceil('h'), freq='h')
+    timeline = df.groupby('hour').size().reindex(timeline_range, fill_value=0).to_dict()
+    return [dt.strftime('%H:%M') for dt in timeline.keys()], list(timeline.values())
+
+
+def _epoch_ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@pytest.mark.parametrize("tz", ["UTC", "Asia/Kolkata", "America/New_York"])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_ring_matches_pandas_timeline(tz, seed):
+    rnd = random.Random(seed)
+    start = _epoch_ms(2026, 1, 22, 0, 0)
+    epoch_ms = np.array([start + rnd.randrange(24 * HOUR_MS) for _ in range(5000)], dtype=np.int64)
+
+    ring = TimelineRing(3600, 26, tz=ZoneInfo(tz))
+    for chunk in np.array_split(epoch_ms, 7):  # ingested incrementally, out of order
+        ring.add(chunk)
+
+    assert ring.labels() == _pandas_timeline(epoch_ms, tz)
+
+
+def test_ring_ceil_on_exact_boundary_and_missing_timestamps():
+    ring = TimelineRing(3600, 24, tz=timezone.utc)
+    ring.add([_epoch_ms(2026, 1, 22, 10, 30), _epoch_ms(2026, 1, 22, 12, 0), MISSING_TS])
+    assert ring.labels() == (['10:00', '11:00', '12:00'], [1, 0, 1])
+
+
+def test_ring_wraps_and_honours_since():
+    ring = TimelineRing(60, 10, tz=timezone.utc)
+    base = _epoch_ms(2026, 1, 22, 10, 0)
+    ring.add([base + m * 60000 for m in range(5)])
+    ring.add([base + m * 60000 + 1 for m in range(5, 20)])  # head moves 10 minutes on
+    ring.add([base])                                        # older than the ring: ignored
+
+    labels, counts = ring.labels()
+    assert labels[0] == '10:10' and labels[-1] == '10:20'
+    assert counts == [1] * 10 + [0]
+
+    labels, counts = ring.labels(since_ms=base + 15 * 60000)
+    assert labels == ['10:15', '10:16', '10:17', '10:18', '10:19', '10:20']
+
+
+def test_ring_buckets_follow_dst_changes():
+    ring = TimelineRing(3600, 48, tz=ZoneInfo("America/New_York"))
+    # 2026-03-08 02:00 EST -> 03:00 EDT (07:00 UTC)
+    ring.add([_epoch_ms(2026, 3, 8, 6, 30), _epoch_ms(2026, 3, 8, 7, 30)])
+    labels, counts = ring.labels()
+    assert (labels[0], counts[0]) == ('01:00', 1)
+    assert ('03:00', 1) in list(zip(labels, counts))
+
+
+def test_drop_window_incremental_matches_full_parse():
+    raw_logs = sorted(uxg_logs(600, seed=4), key=lambda log: log['timestamp'], reverse=True)
+    window = DropWindow(86400, tz=timezone.utc)
+    # Newest-first deltas, as IncrementalDropFetcher.poll() returns them
+    window.ingest(build_drop_batch(raw_logs[300:]))
+    batch = window.ingest(build_drop_batch(raw_logs[:300]))
+
+    full, _ = parse_drop_batch(raw_logs)
+    assert batch.to_events() == full.to_events()
+
+    labels, counts = window.timeline('hour')
+    assert sum(counts) == len(raw_logs)
+    assert (labels, counts) == _pandas_timeline(full.timestamp, 'UTC')
+
+
+def test_drop_window_evicts_and_reorders_late_arrivals():
+    window = DropWindow(3600, tz=timezone.utc)
+    log = uxg_logs(1)[0]
+    older = dict(log, timestamp='2026-01-22T10:00:00.000Z')
+    newer = dict(log, timestamp='2026-01-22T10:30:00.000Z')
+    late = dict(log, timestamp='2026-01-22T10:10:00.000Z')
+
+    window.ingest(build_drop_batch([newer, older]))
+    batch = window.ingest(build_drop_batch([late]), cutoff_ms=_epoch_ms(2026, 1, 22, 10, 5))
+    assert batch.to_events() == build_drop_batch([newer, late]).to_events()
+
+
+def test_evicted_events_leave_the_timeline():
+    window = DropWindow(3600, tz=timezone.utc)
+    log = uxg_logs(1)[0]
+    stamps = ['2026-01-22T10:00:00.000Z', '2026-01-22T10:20:00.000Z', '2026-01-22T10:40:00.000Z',
+              '2026-01-22T11:10:00.000Z']
+    window.ingest(build_drop_batch([dict(log, timestamp=ts) for ts in reversed(stamps)]))
+    # The cutoff falls inside the 10:00 bucket: only 10:40 of it stays in the window
+    batch = window.ingest(build_drop_batch([]), cutoff_ms=_epoch_ms(2026, 1, 22, 10, 30))
+    for resolution in ('hour', 'minute'):
+        labels, counts = window.timeline(resolution)
+        assert sum(counts) == len(batch) == 2
+    assert window.timeline('hour') == (['10:00', '11:00', '12:00'], [1, 1, 0])
+
+
+def test_one_off_timeline_first_bucket_only_counts_events_in_range():
+    from app.timeline import timeline_labels
+    stamps = [_epoch_ms(2026, 1, 22, 10, m) for m in (0, 20, 40)]
+    assert timeline_labels(stamps, 3600, since_ms=_epoch_ms(2026, 1, 22, 10, 30), tz=timezone.utc) == \
+        (['10:00', '11:00'], [1, 0])
@@ -0,0 +1,24 @@
+import pytest
+from app.tokens import _PIECES, estimate_tokens
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("", 0),
+    ("37 TCP probes on DPT=3389 (HIGH)", 11),
+    ("Provide a concise plain-English summary", 7),
+    ("  └─ 12 from 45.148.10.0/24", 16),
+    ("it's", 2),
+])
+def test_known_counts(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+def test_pieces_cover_the_text():
+    text = 'UXG [WAN_LOCAL-D-40000] DESCR="Log WAN" SRC=173.249.19.73 DPT=51413\n\t  └─ ünïcode 12345678'
+    assert ''.join(_PIECES.findall(text)) == text
+
+
+def test_digit_heavy_lines_cost_more_than_a_quarter_of_their_length():
+    line = "  └─ 1234 from 173.249.19.0/24"
+    assert estimate_tokens(line) > 2 * (len(line) // 4)
+    assert estimate_tokens("internationalization") > estimate_tokens("summary") == 1
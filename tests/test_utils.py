@@ -1,25 +1,13 @@
 import pytest
 from unittest.mock import Mock
 import requests_mock
-from app.utils import fetch_firewall_drops, parse_firewall_drops
-
-# Sample raw log from your real output
-SAMPLE_RAW_LOG = {
-    "timestamp": "2026-01-22T21:44:47.000Z",
-    "source": "UXG",
-    "message": 'UXG Pro Pro [WAN_LOCAL-D-40000] DESCR="Log WAN to Gateway Drops" IN=eth0 OUT= MAC=e4:38:83:9a:f0:63:0c:ac:8a:e5:fe:54:08:00 SRC=173.249.19.73 DST=70.24.240.148 LEN=125 TOS=00 PREC=0x00 TTL=55 ID=15036 DF PROTO=UDP SPT=12023 DPT=51413 LEN=105 MARK=1c0000'
-}
-
-SAMPLE_RESPONSE = {
-    "messages": [
-        {
-            "message": SAMPLE_RAW_LOG  # nested like real Graylog
-        },
-        {
-            "message": SAMPLE_RAW_LOG
-        }
-    ]
-}
+from datetime import datetime, timezone
+from app.utils import (
+    fetch_firewall_drops, parse_firewall_drops, IncrementalDropFetcher,
+    iter_firewall_drop_pages, iter_firewall_drops,
+)
+from tests.conftest import SAMPLE_RAW_LOG, SAMPLE_RESPONSE
+
 
 @pytest.fixture
 def mock_env(monkeypatch):
@@ -68,4 +56,90 @@ def test_parse_no_match():
     parsed, stats = parse_firewall_drops(raw_logs)
 
     assert len(parsed) == 0
-    assert stats["total_blocks"] == 0
\ No newline at end of file
+    assert stats["total_blocks"] == 0
+
+def _graylog_msg(msg_id, timestamp):
+    return {"message": dict(SAMPLE_RAW_LOG, _id=msg_id, timestamp=timestamp)}
+
+def test_incremental_fetch_dedupes_and_narrows_range(mock_env, requests_mock):
+    url = "http://fake.graylog:9000/api/search/universal/relative"
+    requests_mock.get(url, [
+        {"json": {"messages": [_graylog_msg("b", "2026-01-22T21:44:47.000Z"),
+                               _graylog_msg("a", "2026-01-22T21:40:00.000Z")]}},
+        {"json": {"messages": [_graylog_msg("c", "2026-01-22T21:50:00.000Z"),
+                               _graylog_msg("b", "2026-01-22T21:44:47.000Z")]}},
+    ])
+    now = datetime(2026, 1, 22, 22, 0, tzinfo=timezone.utc).timestamp()
+    feed = IncrementalDropFetcher(range_seconds=86400, limit=10, overlap_seconds=60, keep_logs=True)
+
+    first = feed.refresh(now=now)
+    assert [log["id"] for log in first] == ["b", "a"]
+    assert requests_mock.request_history[0].qs["range"] == ["86400"]
+
+    second = feed.refresh(now=now)
+    assert [log["id"] for log in second] == ["c", "b", "a"]  # "b" not duplicated
+    # Only the ~15 min since the cursor (+ overlap) is requested the second time
+    assert requests_mock.request_history[1].qs["range"] == [str(913 + 60)]
+
+def test_incremental_fetch_evicts_aged_out_events(mock_env, requests_mock):
+    requests_mock.get(
+        "http://fake.graylog:9000/api/search/universal/relative",
+        json={"messages": [_graylog_msg("new", "2026-01-22T21:00:00.000Z"),
+                           _graylog_msg("old", "2026-01-22T19:00:00.000Z")]}
+    )
+    feed = IncrementalDropFetcher(range_seconds=3600, keep_logs=True)
+    now = datetime(2026, 1, 22, 21, 30, tzinfo=timezone.utc).timestamp()
+
+    logs = feed.refresh(now=now)
+    assert [log["id"] for log in logs] == ["new"]
+
+def test_incremental_fetch_holds_no_raw_logs_by_default(mock_env, requests_mock):
+    requests_mock.get("http://fake.graylog:9000/api/search/universal/relative",
+                      json={"messages": [_graylog_msg("a", "2026-01-22T21:40:00.000Z")]})
+    feed = IncrementalDropFetcher()
+    now = datetime(2026, 1, 22, 22, 0, tzinfo=timezone.utc).timestamp()
+
+    assert [log["id"] for log in feed.poll(now=now)] == ["a"]
+    assert feed.poll(now=now) == []  # still deduped
+    assert list(feed._events) == [(feed.cursor, "a")] and feed._logs is None
+    with pytest.raises(RuntimeError):
+        feed.window()
+
+def test_incremental_fetch_keeps_window_on_error(mock_env, requests_mock):
+    url = "http://fake.graylog:9000/api/search/universal/relative"
+    requests_mock.get(url, [
+        {"json": {"messages": [_graylog_msg("a", "2026-01-22T21:40:00.000Z")]}},
+        {"status_code": 503},
+    ])
+    feed = IncrementalDropFetcher(keep_logs=True)
+    now = datetime(2026, 1, 22, 22, 0, tzinfo=timezone.utc).timestamp()
+
+    feed.refresh(now=now)
+    assert [log["id"] for log in feed.refresh(now=now)] == ["a"]
+
+def test_iter_firewall_drop_pages_slices_and_pages(mock_env, requests_mock):
+    def respond(request, context):
+        offset = int(request.qs["offset"][0])
+        # Every slice holds 3 messages, served 2 per page
+        msgs = [_graylog_msg(f"{request.qs['from'][0]}-{i}", request.qs["to"][0]) for i in range(3)]
+        return {"messages": msgs[offset:offset + 2], "total_results": 3}
+
+    requests_mock.get("http://fake.graylog:9000/api/search/universal/absolute", json=respond)
+    now = datetime(2026, 1, 22, 22, 0, tzinfo=timezone.utc).timestamp()
+
+    pages = list(iter_firewall_drop_pages(range_seconds=3 * 3600, slice_seconds=3600,
+                                          page_size=2, max_workers=2, now=now))
+
+    assert [len(p) for p in pages] == [2, 1, 2, 1, 2, 1]
+    assert len(requests_mock.request_history) == 6
+    # Newest slice first, even though slices are fetched concurrently
+    assert pages[0][0]["timestamp"] == "2026-01-22t21:59:59.999z"  # requests_mock lower-cases qs
+    assert pages[-1][0]["timestamp"] == "2026-01-22t19:59:59.999z"
+
+def test_parse_firewall_drops_consumes_generator(mock_env, requests_mock):
+    requests_mock.get(
+        "http://fake.graylog:9000/api/search/universal/absolute",
+        json={"messages": [{"message": SAMPLE_RAW_LOG}], "total_results": 1}
+    )
+    parsed, stats = parse_firewall_drops(iter_firewall_drops(range_seconds=7200, slice_seconds=3600))
+    assert stats["total_blocks"] == 2  # one message per slice
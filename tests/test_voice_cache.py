@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+import pytest
+import websockets
+import app.__main__ as server
+from app.utils import parse_drop_batch
+from app.voice_cache import VoiceBriefingCache, briefing_key
+from tests.conftest import SAMPLE_RAW_LOG, FakeClient
+
+
+def test_recorded_briefing_round_trips_with_offsets(tmp_path):
+    cache = VoiceBriefingCache(str(tmp_path))
+    recorder = cache.recorder('k')
+    recorder.add(b'\x00\x01')
+    time.sleep(0.02)
+    recorder.add('{"type": "response.done"}')
+    assert recorder.save()
+
+    frames = cache.load('k')
+    assert [payload for _, payload in frames] == [b'\x00\x01', '{"type": "response.done"}']
+    assert frames[0][0] == 0.0 and frames[1][0] >= 0.02
+    assert cache.load('missing') is None
+
+
+def test_briefings_without_audio_are_not_stored(tmp_path):
+    cache = VoiceBriefingCache(str(tmp_path))
+    recorder = cache.recorder('k')
+    recorder.add('{"type": "error"}')
+    assert not recorder.save()
+    assert cache.load('k') is None
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = VoiceBriefingCache(str(tmp_path), max_bytes=2500)
+    for i, key in enumerate(['a', 'b']):
+        cache.store(key, [(0.0, 0, b'x' * 1000)])
+        os.utime(tmp_path / f'{key}.briefing', (1000 + i, 1000 + i))
+    cache.load('a')  # 'a' becomes most recently used
+
+    cache.store('c', [(0.0, 0, b'x' * 1000)])
+    assert cache.load('b') is None
+    assert cache.load('a') is not None and cache.load('c') is not None
+    assert cache.total_bytes() <= 2500
+    assert not cache.store('huge', [(0.0, 0, b'x' * 3000)])
+
+
+def test_key_depends_on_prompt_and_session():
+    assert briefing_key('p', {'voice': 'ara'}) == briefing_key('p', {'voice': 'ara'})
+    assert briefing_key('p', {'voice': 'ara'}) != briefing_key('q', {'voice': 'ara'})
+    assert briefing_key('p', {'voice': 'ara'}) != briefing_key('p', {'voice': 'eve'})
+
+
+def test_identical_briefing_is_replayed_without_xai(voice_env, monkeypatch):
+    stats = parse_drop_batch([SAMPLE_RAW_LOG])
+    monkeypatch.setattr(server.drop_data, 'get_drops', lambda range_seconds: stats)  # no slow fetch
+    fake_xai = websockets.connect  # the FakeRealtime voice_env installed
+    fake_xai.connects = 0
+
+    live = FakeClient()
+    asyncio.run(server.ara_voice_handler(live))
+    assert fake_xai.connects == 1
+
+    replayed = FakeClient()
+    asyncio.run(server.ara_voice_handler(replayed))
+    assert fake_xai.connects == 1
+    assert replayed.received == live.received == [b'pcm', json.dumps({'type': 'response.done'})]
+
+
+@pytest.mark.benchmark
+def test_cached_briefing_replays_quickly(voice_env, monkeypatch):
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    stats = parse_drop_batch([SAMPLE_RAW_LOG])
+    monkeypatch.setattr(server.drop_data, 'get_drops', lambda range_seconds: stats)
+    asyncio.run(server.ara_voice_handler(FakeClient()))
+    started = time.perf_counter()
+    asyncio.run(server.ara_voice_handler(FakeClient()))
+    assert time.perf_counter() - started < 0.5
+
+
+def test_replay_keeps_original_pacing():
+    client = FakeClient()
+    frames = [(0.0, b'a'), (0.1, b'b'), (0.2, '{"type": "response.done"}')]
+    started = time.perf_counter()
+    asyncio.run(server.replay_briefing(client, frames))
+    assert time.perf_counter() - started >= 0.2
+    assert client.received == [b'a', b'b', '{"type": "response.done"}']
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+import app.__main__ as server
+from app.log_writer import BufferedJsonLog
+from app.utils import parse_drop_batch
+from tests.conftest import SAMPLE_RAW_LOG, FETCH_SECONDS, FakeClient
+
+
+def test_concurrent_voice_sessions_do_not_block_each_other(voice_env, monkeypatch):
+    sessions = 4
+    # Every fetch waits for all the others: this only completes if they run side by side
+    # and the event loop stays free to start the next session while one is fetching
+    barrier = threading.Barrier(sessions, timeout=5)
+
+    def overlapping_get_drops(range_seconds):
+        barrier.wait()
+        return parse_drop_batch([SAMPLE_RAW_LOG])
+    monkeypatch.setattr(server.drop_data, 'get_drops', overlapping_get_drops)
+
+    async def run():
+        clients = [FakeClient() for _ in range(sessions)]
+        await asyncio.gather(*(server.ara_voice_handler(c) for c in clients))
+        return clients
+
+    for client in asyncio.run(run()):
+        assert client.received == [b'pcm', json.dumps({'type': 'response.done'})]
+
+
+@pytest.mark.benchmark
+def test_concurrent_voice_sessions_keep_the_loop_responsive(voice_env):
+    # Wall-clock check: opt-in with `pytest -m benchmark` (machine dependent)
+    sessions = 4
+
+    async def run():
+        gaps = []
+
+        async def heartbeat(stop):
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        stop = asyncio.Event()
+        beat = asyncio.create_task(heartbeat(stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(server.ara_voice_handler(FakeClient()) for _ in range(sessions)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await beat
+        return elapsed, max(gaps)
+
+    elapsed, max_gap = asyncio.run(run())
+    # Fetches overlap instead of running back to back, and the loop keeps ticking meanwhile
+    assert elapsed < sessions * FETCH_SECONDS / 2
+    assert max_gap < FETCH_SECONDS / 2
+
+
+def test_voice_events_are_buffered_json_lines(voice_env, monkeypatch):
+    events = BufferedJsonLog(str(voice_env / 'voice.jsonl'))
+    monkeypatch.setattr(server, 'voice_events', events)
+    asyncio.run(server.ara_voice_handler(FakeClient()))
+    assert not (voice_env / 'voice.jsonl').exists()  # nothing written on the loop
+
+    events.flush()
+    records = [json.loads(line) for line in (voice_env / 'voice.jsonl').read_text().splitlines()]
+    assert records[0]['event'] == 'client_connected'
+    assert {'event': 'audio_delta', 'bytes': 3} in [{k: v for k, v in r.items() if k != 'ts'} for r in records]
+    assert records[-1]['event'] == 'client_disconnected'
+
+
+def test_time_to_first_audio_is_recorded_once_per_session(voice_env):
+    from app.metrics import STAGE_SECONDS
+    before = STAGE_SECONDS.count(stage='voice_first_audio')
+    asyncio.run(server.ara_voice_handler(FakeClient()))   # live, then cached
+    asyncio.run(server.ara_voice_handler(FakeClient()))   # replayed from the cache
+    assert STAGE_SECONDS.count(stage='voice_first_audio') == before + 2
+    assert 'dashboard_stage_seconds_count{stage="voice_first_audio"}' in server.app.test_client().get('/metrics').text